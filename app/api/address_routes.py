@@ -1,15 +1,18 @@
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.models.address_model import Address
 from app.api.deps import get_db
+from app.db.unit_of_work import transaction
 from app.schemas.address_schema import AddressCreate, AddressOut, AddressReplace, AddressUpdate
+from app.utils.pagination import decode_cursor, encode_cursor
 from app.crud.address_crud import (
     create_address, delete_address, get_address_by_id,
-    get_addresses_by_user_id, update_address_by_id, address_exists_for_user, count_addresses_for_user
+    get_address_page_with_total, get_addresses_by_user_id, update_address_by_id,
+    address_exists_for_user, count_addresses_for_user
 )
 
 ALLOWED_COUNTRIES = set(os.getenv("ALLOWED_COUNTRIES", "").split(","))
@@ -85,7 +88,8 @@ def post_address(
 
     try:
         db_address = Address(**address.model_dump())
-        created = create_address(db, db_address)
+        with transaction(db):
+            created = create_address(db, db_address)
         return created
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -116,23 +120,47 @@ def get_address(address_id: int, db: Session = Depends(get_db)):
     "/user/{user_id}",
     response_model=list[AddressOut],
     summary="List addresses by user",
-    description="Get all addresses for a specific user by user ID.",
+    description=(
+        "Get the addresses of a specific user by user ID, ordered by ID. Results are paginated: "
+        "when more addresses remain, the X-Next-Cursor header holds the cursor for the next page. "
+        "With include_total=true the X-Total-Count header holds the user's number of addresses."
+    ),
     response_description="A list of address objects."
 )
 def get_addresses_by_user(
     user_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of addresses to return"),
+    cursor: str = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    include_total: bool = Query(False, description="Return the total number of addresses in X-Total-Count"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all addresses for a specific user by user ID.
+    Get the addresses of a specific user by user ID, one page at a time.
     """
     if not isinstance(user_id, int) or user_id <= 0:
         raise HTTPException(status_code=422, detail="The 'user_id' parameter must be a positive integer.")
+    after_id = None
+    if cursor:
+        try:
+            after_id, = decode_cursor(cursor, 1)
+        except ValueError:
+            after_id = None
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=422, detail="Invalid cursor.")
     try:
-        addresses = get_addresses_by_user_id(db, user_id)
-        return addresses
+        # One extra row tells whether there is a next page.
+        if include_total:
+            addresses, total = get_address_page_with_total(db, user_id, limit + 1, after_id)
+            response.headers["X-Total-Count"] = str(total)
+        else:
+            addresses = get_addresses_by_user_id(db, user_id, limit + 1, after_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if len(addresses) > limit:
+        addresses = addresses[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(addresses[-1].id)
+    return addresses
 
 @router.put(
     "/{address_id}",
@@ -165,9 +193,10 @@ def update_address(
     validate_address_fields(address)
 
     try:
-        updated_address = update_address_by_id(db, address_id, address.model_dump())
-        if not updated_address:
-            raise HTTPException(status_code=404, detail="Address not found.")
+        with transaction(db):
+            updated_address = update_address_by_id(db, address_id, address.model_dump())
+            if not updated_address:
+                raise HTTPException(status_code=404, detail="Address not found.")
         return updated_address
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -198,9 +227,10 @@ def partial_update_address(
         raise HTTPException(status_code=422, detail="No data provided for update.")
 
     try:
-        updated_address = update_address_by_id(db, address_id, address_dict)
-        if not updated_address:
-            raise HTTPException(status_code=404, detail="Address not found.")
+        with transaction(db):
+            updated_address = update_address_by_id(db, address_id, address_dict)
+            if not updated_address:
+                raise HTTPException(status_code=404, detail="Address not found.")
         return updated_address
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -220,9 +250,10 @@ def delete_one_address(address_id: int, db: Session = Depends(get_db)):
     if not isinstance(address_id, int) or address_id <= 0:
         raise HTTPException(status_code=422, detail="The 'address_id' parameter must be a positive integer.")
     try:
-        address = delete_address(db, address_id)
-        if not address:
-            raise HTTPException(status_code=404, detail="Address not found.")
+        with transaction(db):
+            address = delete_address(db, address_id)
+            if not address:
+                raise HTTPException(status_code=404, detail="Address not found.")
         return address
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -1,24 +1,28 @@
 from datetime import datetime, timezone
 import re
 
-from fastapi import BackgroundTasks
-
 from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app.core.security import decode_access_token, hash_password, verify_password
 from app.crud.user_crud import get_user_by_email, get_user_by_id, update_user_by_id
 from app.models.auth_model import PasswordRestoreToken
 from app.models.user_model import User
-from app.schemas.auth_schema import TokenRequest, TokenReset, TokenVerify, UndoPasswordChangeRequest, UserRegister, UserLogin, AuthResponse
+from app.schemas.auth_schema import (
+    TokenBatchVerify, TokenBatchVerifyResponse, TokenRequest, TokenReset, TokenVerify,
+    UndoPasswordChangeRequest, UserRegister, UserLogin, AuthResponse
+)
 from app.api.deps import get_db
-from app.crud.auth_crud import create_action_token, get_valid_action_token, login, mark_action_token_used, register
-from app.utils.email_utils import load_template, send_email
+from app.db.errors import is_unique_violation
+from app.db.unit_of_work import transaction
+from app.crud.email_outbox_crud import enqueue_email
+from app.crud.auth_crud import (
+    create_action_token, get_valid_action_token, login, mark_action_token_used, register, revoke_token
+)
+from app.utils.email_utils import load_template
 
 router = APIRouter()
-bearer_scheme = HTTPBearer()
 
 def validate_password(password: str):
     if not isinstance(password, str) or not password.strip():
@@ -104,7 +108,6 @@ def login_user(
     response_description="Authentication response with user info and access token."
 )
 def register_user(
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user_in: UserRegister = Body(
         ...,
@@ -123,9 +126,10 @@ def register_user(
     """
     try:
         validate_register_fields(user_in)
-        existing_user = get_user_by_email(db, user_in.email)
-        if existing_user:
-            raise HTTPException(status_code=400, detail="The email is already registered.")
+        # Hashed before the transaction opens, so bcrypt never runs while the new
+        # row's locks are held. The unique index on users.email then decides
+        # whether the email is taken, without a lookup first.
+        hashed_password = hash_password(user_in.password)
 
         db_user = User(
             email=user_in.email,
@@ -133,15 +137,22 @@ def register_user(
             firstname=user_in.firstname,
             lastname=user_in.lastname,
             phone=user_in.phone,
-            hashed_password=hash_password(user_in.password),
+            hashed_password=hashed_password,
             user_rol="customer"
         )
-        result = register(db, db_user)
-        if not result or not result.get("user"):
-            raise HTTPException(status_code=400, detail="User could not be registered.")
-
-        def send_verification_email():
+        # The user, its verification token and the welcome email are written
+        # in one transaction; the outbox worker sends the email afterwards.
+        with transaction(db):
+            try:
+                result = register(db, db_user)
+            except IntegrityError as e:
+                if is_unique_violation(e, "email"):
+                    raise HTTPException(status_code=400, detail="The email is already registered.")
+                raise
+            if not result or not result.get("user"):
+                raise HTTPException(status_code=400, detail="User could not be registered.")
             token_obj = create_action_token(db, result["user"].id, "verification", expires_minutes=30)
+
             confirmation_link = f"https://tu-frontend.com/confirm-email?token={token_obj.token}"
             email_body = load_template(
                 "welcome.html",
@@ -150,12 +161,12 @@ def register_user(
                     "confirmation_link": confirmation_link
                 }
             )
-            send_email(
+            enqueue_email(
+                db,
                 to_email=result["user"].email,
                 subject="Confirm your email for Ghosts-API",
                 body=email_body
             )
-        background_tasks.add_task(send_verification_email)
         return {
             "id": result["user"].id,
             "user_rol": result["user"].user_rol,
@@ -183,21 +194,23 @@ def request_email_verification(
         raise HTTPException(status_code=404, detail="User not found.")
     if getattr(user, "is_verified", False):
         raise HTTPException(status_code=400, detail="User is already verified.")
-    token_obj = create_action_token(db, user.id, "verification", expires_minutes=30)
+    with transaction(db):
+        token_obj = create_action_token(db, user.id, "verification", expires_minutes=30)
 
-    confirmation_link = f"https://tu-frontend.com/confirm-email?token={token_obj.token}"
-    email_body = load_template(
-            "welcome.html",
-            {
-                "username": f"{user.firstname} {user.lastname}",
-                "confirmation_link": confirmation_link
-            }
+        confirmation_link = f"https://tu-frontend.com/confirm-email?token={token_obj.token}"
+        email_body = load_template(
+                "welcome.html",
+                {
+                    "username": f"{user.firstname} {user.lastname}",
+                    "confirmation_link": confirmation_link
+                }
+            )
+        enqueue_email(
+            db,
+            to_email=user.email,
+            subject="Confirm your email for Ghosts-API",
+            body=email_body
         )
-    send_email(
-        to_email=user.email,
-        subject="Confirm your email for Ghosts-API",
-        body=email_body
-    )
     return {"msg": "Verification email sent."}
 
 @router.post(
@@ -212,21 +225,23 @@ def request_password_reset(
     user = get_user_by_email(db, data.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
-    token_obj = create_action_token(db, user.id, "reset", expires_minutes=30)
+    with transaction(db):
+        token_obj = create_action_token(db, user.id, "reset", expires_minutes=30)
 
-    reset_link = f"https://tu-frontend.com/reset-password?token={token_obj.token}"
-    email_body = load_template(
-        "reset_password.html",
-        {
-            "username": f"{user.firstname} {user.lastname}",
-            "reset_link": reset_link
-        }
-    )
-    send_email(
-        to_email=user.email,
-        subject="Reset your password for Ghosts-API",
-        body=email_body
-    )
+        reset_link = f"https://tu-frontend.com/reset-password?token={token_obj.token}"
+        email_body = load_template(
+            "reset_password.html",
+            {
+                "username": f"{user.firstname} {user.lastname}",
+                "reset_link": reset_link
+            }
+        )
+        enqueue_email(
+            db,
+            to_email=user.email,
+            subject="Reset your password for Ghosts-API",
+            body=email_body
+        )
     return {"msg": "Reset password email sent."}
 
 @router.post(
@@ -238,11 +253,12 @@ def confirm_email(
     data: TokenVerify,
     db: Session = Depends(get_db)
 ):
-    user_token = get_valid_action_token(db, data.token, "verification")
-    if not user_token:
-        raise HTTPException(status_code=400, detail="Invalid, expired or already used token.")
-    mark_action_token_used(db, data.token)
-    update_user_by_id(db, user_token.user_id, {"is_verified": True})
+    with transaction(db):
+        user_token = get_valid_action_token(db, data.token, "verification")
+        if not user_token:
+            raise HTTPException(status_code=400, detail="Invalid, expired or already used token.")
+        mark_action_token_used(db, data.token)
+        update_user_by_id(db, user_token.user_id, {"is_verified": True})
     return {"msg": "Email confirmado exitosamente."}
 
 @router.post(
@@ -259,37 +275,41 @@ def reset_password(
         raise HTTPException(status_code=400, detail="Invalid or expired token.")
     validate_password(data.new_password)
     user = get_user_by_id(db, user_token.user_id)
-    if user and verify_password(data.new_password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid or expired token.")
+    if verify_password(data.new_password, user.hashed_password):
         raise HTTPException(status_code=422, detail="The new password must be different from the previous one.")
-
-    restore_token = create_action_token(
-        db,
-        user_token.user_id,
-        "restore",
-        expires_minutes=30,
-        extra_payload={"old_hashed_password": user.hashed_password},
-        use_restore_table=True,
-        old_hashed_password=user.hashed_password
-    )
-
-    mark_action_token_used(db, data.token)
+    # Hashed before any row is written, so bcrypt never runs while row locks are held.
     hashed = hash_password(data.new_password)
-    update_user_by_id(db, user_token.user_id, {"hashed_password": hashed})
 
-    undo_link = f"https://tu-frontend.com/undo-password-change?token={restore_token.token}"
-    email_body = load_template(
-        "password_changed.html",
-        {
-            "username": f"{user.firstname} {user.lastname}",
-            "support_email": "soporte@your-domain.com",
-            "undo_link": undo_link
-        }
-    )
-    send_email(
-        to_email=user.email,
-        subject="Your password has been changed for Ghosts-API",
-        body=email_body
-    )
+    with transaction(db):
+        restore_token = create_action_token(
+            db,
+            user_token.user_id,
+            "restore",
+            expires_minutes=30,
+            extra_payload={"old_hashed_password": user.hashed_password},
+            use_restore_table=True,
+            old_hashed_password=user.hashed_password
+        )
+        mark_action_token_used(db, data.token)
+        update_user_by_id(db, user_token.user_id, {"hashed_password": hashed})
+
+        undo_link = f"https://tu-frontend.com/undo-password-change?token={restore_token.token}"
+        email_body = load_template(
+            "password_changed.html",
+            {
+                "username": f"{user.firstname} {user.lastname}",
+                "support_email": "soporte@your-domain.com",
+                "undo_link": undo_link
+            }
+        )
+        enqueue_email(
+            db,
+            to_email=user.email,
+            subject="Your password has been changed for Ghosts-API",
+            body=email_body
+        )
 
     return {"msg": "Password reset successfully."}
 
@@ -298,12 +318,12 @@ def undo_password_change(
     data: UndoPasswordChangeRequest,
     db: Session = Depends(get_db)
 ):
-    restore_token = db.query(PasswordRestoreToken).filter_by(token=data.token, used=False).first()
-    if not restore_token or restore_token.expires_at < datetime.now(timezone.utc):
-        raise HTTPException(status_code=400, detail="Invalid or expired token.")
-    update_user_by_id(db, restore_token.user_id, {"hashed_password": restore_token.old_hashed_password})
-    restore_token.used = True
-    db.commit()
+    with transaction(db):
+        restore_token = db.query(PasswordRestoreToken).filter_by(token=data.token, used=False).first()
+        if not restore_token or restore_token.expires_at < datetime.now(timezone.utc):
+            raise HTTPException(status_code=400, detail="Invalid or expired token.")
+        update_user_by_id(db, restore_token.user_id, {"hashed_password": restore_token.old_hashed_password})
+        restore_token.used = True
     return {"msg": "Your password has been restored. If you did not request this change, please contact support."}
 
 @router.post(
@@ -323,6 +343,48 @@ def verify_token(
         # Mensaje específico según el error
         if result.get("error") == "Token expired":
             raise HTTPException(status_code=401, detail="Token expired")
+        elif result.get("error") == "Token revoked":
+            raise HTTPException(status_code=401, detail="Token revoked")
         else:
             raise HTTPException(status_code=401, detail="Invalid token")
-    return result
\ No newline at end of file
+    return result
+
+@router.post(
+    "/revoke-token",
+    summary="Revoke access token",
+    description="Revoke a JWT access token (logout). The token is rejected by every verification from then on.",
+)
+def revoke_access_token(
+    data: TokenVerify,
+    db: Session = Depends(get_db)
+):
+    """
+    Revoke a single JWT access token.
+    """
+    result = decode_access_token(data.token)
+    if not result.get("valid"):
+        raise HTTPException(status_code=401, detail=result.get("error", "Invalid token"))
+    payload = result["payload"]
+    if "jti" not in payload or "type" in payload:
+        raise HTTPException(status_code=400, detail="This token cannot be revoked.")
+    with transaction(db):
+        revoke_token(db, payload)
+    return {"msg": "Token revoked."}
+
+@router.post(
+    "/verify-tokens",
+    response_model=TokenBatchVerifyResponse,
+    response_model_exclude_none=True,
+    summary="Verify access tokens in batch",
+    description="Verify up to 100 JWT access tokens in one call. Returns one result per token, in the same order.",
+    response_description="Validity and decoded data of each token."
+)
+def verify_tokens(
+    data: TokenBatchVerify
+):
+    """
+    Verify several JWT access tokens at once.
+    Identical tokens within the batch are decoded only once.
+    """
+    decoded = {token: decode_access_token(token) for token in dict.fromkeys(data.tokens)}
+    return {"results": [decoded[token] for token in data.tokens]}
@@ -1,5 +1,11 @@
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
 
+from app.core.principal_cache import Principal, principal_cache
+from app.core.security import decode_access_token
 from app.db.session import SessionLocal
+from app.models.user_model import User
 
 #The deps.py file is used to define reusable dependencies for the FastAPI application.
 
@@ -11,4 +17,49 @@ def get_db():
         yield db
     finally:
         db.close()
-        
\ No newline at end of file
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def load_principal(db: Session, user_id: int):
+    # Only the columns the principal needs, not the whole user row.
+    row = (
+        db.query(User.id, User.user_rol, User.is_active)
+        .filter(User.id == user_id, User.deleted_at.is_(None)).first()
+    )
+    if row is None:
+        return None
+    return Principal(id=row.id, role=row.user_rol, is_active=bool(row.is_active))
+
+    #Resolves the caller from the bearer token. FastAPI caches dependencies per
+    #request, so the token is decoded once even if several dependencies use it.
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    result = decode_access_token(credentials.credentials)
+    payload = result.get("payload") or {}
+    # Action tokens (email verification, reset...) are not access tokens.
+    if not result.get("valid") or "type" in payload:
+        detail = result.get("error") or "Invalid token"
+        raise HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    principal = principal_cache.get(user_id, lambda key: load_principal(db, key))
+    if principal is None:
+        raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
+    if not principal.is_active:
+        raise HTTPException(status_code=403, detail="Inactive user.")
+    return principal
+
+    #Dependency factory: lets through only callers with one of the given roles.
+def require_roles(*roles: str):
+    def check_role(principal: Principal = Depends(get_current_user)) -> Principal:
+        if principal.role not in roles:
+            raise HTTPException(status_code=403, detail="Insufficient permissions.")
+        return principal
+    return check_role
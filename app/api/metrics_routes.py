@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import generate_latest
+
+router = APIRouter()
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="Expose request, database, password hashing, email and cache metrics in Prometheus text format."
+)
+async def metrics():
+    """
+    Expose application metrics in Prometheus text format.
+    Async on purpose: scrapes never wait for a threadpool worker, and the
+    threadpool gauges can only be read from the event loop.
+    """
+    return PlainTextResponse(generate_latest(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,12 +1,22 @@
+import math
 import re
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Response
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from pydantic import EmailStr, ValidationError
 
-from app.api.deps import get_db
-from app.crud.user_crud import delete_user, get_user_by_email, get_user_by_id, get_users, update_user_by_id
-from app.schemas.user_schema import UserOut, UserReplace, UserUpdate
+from app.api.deps import get_current_user, get_db, require_roles
+from app.core.config import settings
+from app.db.errors import is_unique_violation
+from app.db.unit_of_work import transaction
+from app.core.principal_cache import Principal
+from app.crud.user_stats_crud import get_user_stats
+from app.crud.user_crud import bulk_update_users, delete_user, get_user_by_email, get_user_by_id, get_users, search_users, update_user_by_id
+from app.schemas.user_schema import (
+    UserBulkUpdate, UserBulkUpdateResult, UserOut, UserReplace, UserSearchPage, UserStats, UserUpdate
+)
+from app.utils.pagination import decode_cursor, encode_cursor
 
 from fastapi import status
 
@@ -25,17 +35,15 @@ def validate_email(email):
     except ValidationError:
         raise HTTPException(status_code=422, detail="The 'email' parameter must be a valid email address.")
 
-def validate_update_data(user_data: dict, db: Session, user_id: int):
+def validate_update_data(user_data: dict):
     if "password" in user_data:
         raise HTTPException(
             status_code=403,
             detail="Password cannot be updated from this endpoint. Use the password reset flow."
         )
+    # Whether the email is taken is left to the unique index (see update_user).
     if "email" in user_data:
         validate_email(user_data["email"])
-        existing_user = get_user_by_email(db, user_data["email"])
-        if existing_user and existing_user.id != user_id:
-            raise HTTPException(status_code=409, detail="The 'email' is already in use by another user.")
     if "firstname" in user_data:
         if not isinstance(user_data["firstname"], str) or not user_data["firstname"].strip():
             raise HTTPException(status_code=422, detail="The 'firstname' field is required and must be a non-empty string.")
@@ -52,6 +60,18 @@ def validate_update_data(user_data: dict, db: Session, user_id: int):
         if not re.match(r"^\+\d{7,15}$", user_data["phone"]):
             raise HTTPException(status_code=422, detail="The 'phone' field must be a valid international phone number (e.g., +1234567890).")
 
+def update_user(db: Session, user_id: int, user_dict: dict):
+    with transaction(db):
+        try:
+            user = update_user_by_id(db, user_id, user_dict)
+        except IntegrityError as e:
+            if is_unique_violation(e, "email"):
+                raise HTTPException(status_code=409, detail="The 'email' is already in use by another user.")
+            raise
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found.")
+    return user
+
 @router.get(
     "/",
     response_model=list[UserOut],
@@ -73,6 +93,97 @@ def list_users(
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@router.get(
+    "/search",
+    response_model=UserSearchPage,
+    response_model_exclude_none=True,
+    summary="Search users",
+    description="Search users by partial name, nickname or email. Results are ranked and paginated with a cursor.",
+    response_description="A page of matching users and the cursor for the next page."
+)
+def search_users_route(
+    q: str = Query(..., min_length=2, max_length=100, description="Text to search for"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of users to return"),
+    cursor: str = Query(None, description="Cursor returned by the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Search users by partial name, nickname or email.
+    """
+    after = None
+    if cursor:
+        try:
+            last_rank, last_id = decode_cursor(cursor, 2)
+        except ValueError:
+            last_rank = last_id = None
+        # Only a (rank, id) pair may reach the query; bool is an int in Python.
+        if (
+            isinstance(last_rank, bool) or not isinstance(last_rank, (int, float)) or not math.isfinite(last_rank)
+            or isinstance(last_id, bool) or not isinstance(last_id, int)
+        ):
+            raise HTTPException(status_code=422, detail="Invalid cursor.")
+        after = (last_rank, last_id)
+    try:
+        # One extra row tells whether there is a next page.
+        rows = search_users(db, q, limit=limit + 1, after=after)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last_user, last_rank = page[-1]
+        next_cursor = encode_cursor(last_rank, last_user.id)
+    return {"items": [user for user, _ in page], "next_cursor": next_cursor}
+
+@router.get(
+    "/stats",
+    response_model=UserStats,
+    summary="User statistics",
+    description="Users per role, verified ratio and signups per day, read from counters maintained on every write.",
+    response_description="The user statistics."
+)
+def user_stats(
+    days: int = Query(30, ge=1, le=366, description="Number of days of signups to return, including today"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get user statistics without scanning the users table.
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    try:
+        rows = get_user_stats(db, since)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    users_by_role = {row.bucket: row.count for row in rows if row.dimension == "role" and row.count}
+    signups_per_day = {row.bucket: row.count for row in rows if row.dimension == "signup_day" and row.count}
+    total = sum(users_by_role.values())
+    verified = sum(row.count for row in rows if row.dimension == "verified")
+    return {
+        "total_users": total,
+        "verified_users": verified,
+        "verified_ratio": verified / total if total else 0.0,
+        "users_by_role": users_by_role,
+        "signups_per_day": dict(sorted(signups_per_day.items()))
+    }
+
+@router.get(
+    "/me",
+    response_model=UserOut,
+    summary="Get current user",
+    description="Retrieve the user authenticated by the bearer token."
+)
+def get_me(principal: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Retrieve the user authenticated by the bearer token.
+    """
+    try:
+        user = get_user_by_id(db, principal.id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found.")
+        return user
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @router.get(
     "/{user_id}",
     response_model=UserOut,
@@ -111,6 +222,57 @@ def get_user_by_email_route(email: str, db: Session = Depends(get_db)):
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@router.patch(
+    "/bulk",
+    response_model=UserBulkUpdateResult,
+    summary="Bulk update users",
+    description=(
+        "Admin only. Apply the same changes to a list of users ('ids') or to every user matching a 'filter', "
+        "in one transaction. Besides the profile fields, the patch can set is_active, is_verified and user_rol."
+    ),
+    response_description="How many users were updated and which requested ids were not found."
+)
+def bulk_update_users_route(
+    data: UserBulkUpdate = Body(...),
+    principal: Principal = Depends(require_roles("admin")),
+    db: Session = Depends(get_db)
+):
+    """
+    Update many users at once with set-based statements.
+    """
+    if (data.ids is None) == (data.filter is None):
+        raise HTTPException(status_code=422, detail="Provide either 'ids' or 'filter'.")
+    filters = None
+    if data.ids is not None:
+        if not data.ids:
+            raise HTTPException(status_code=422, detail="The 'ids' field must not be empty.")
+        for user_id in data.ids:
+            validate_user_id(user_id)
+    else:
+        filters = data.filter.model_dump(exclude_none=True)
+        if not filters:
+            raise HTTPException(status_code=422, detail="The 'filter' field needs at least one condition.")
+
+    user_dict = data.patch.model_dump(exclude_unset=True)
+    if not user_dict:
+        raise HTTPException(status_code=422, detail="No data provided for update.")
+    validate_update_data(user_dict)
+    for field in ("is_active", "is_verified", "user_rol"):
+        if field in user_dict and user_dict[field] is None:
+            raise HTTPException(status_code=422, detail=f"The '{field}' field must not be null.")
+    if "user_rol" in user_dict and not user_dict["user_rol"].strip():
+        raise HTTPException(status_code=422, detail="The 'user_rol' field must be a non-empty string.")
+
+    try:
+        with transaction(db):
+            updated = bulk_update_users(
+                db, user_dict, ids=data.ids, filters=filters, chunk_size=settings.USER_BULK_UPDATE_CHUNK_SIZE
+            )
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    not_found = sorted(set(data.ids) - set(updated)) if data.ids is not None else []
+    return {"updated": len(updated), "not_found": not_found}
+
 @router.patch(
     "/{user_id}",
     response_model=UserOut,
@@ -131,12 +293,9 @@ def partial_update_user(
     user_dict = user_data.model_dump(exclude_unset=True)
     if not user_dict:
         raise HTTPException(status_code=422, detail="No data provided for update.")
-    validate_update_data(user_dict, db, user_id)
+    validate_update_data(user_dict)
     try:
-        user = update_user_by_id(db, user_id, user_dict)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found.")
-        return user
+        return update_user(db, user_id, user_dict)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except TypeError as e:
@@ -160,12 +319,9 @@ def replace_user(
     """
     validate_user_id(user_id)
     user_dict = user_data.model_dump()
-    validate_update_data(user_dict, db, user_id)
+    validate_update_data(user_dict)
     try:
-        user = update_user_by_id(db, user_id, user_dict)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found.")
-        return user
+        return update_user(db, user_id, user_dict)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except TypeError as e:
@@ -183,9 +339,10 @@ def remove_user(user_id: int, db: Session = Depends(get_db)):
     """
     validate_user_id(user_id)
     try:
-        user = delete_user(db, user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found.")
+        with transaction(db):
+            user = delete_user(db, user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found.")
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Request, Response
+
+from app.core import security
+from app.core.compression import skip_compression
+
+JWKS_CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=86400"
+
+router = APIRouter()
+
+@router.get(
+    "/jwks.json",
+    summary="JSON Web Key Set",
+    description="Public keys used to sign access tokens, so other services can verify tokens locally. Empty when tokens are signed with HS256.",
+    response_description="A JWKS document."
+)
+# The ETag identifies these exact bytes, so they are never re-encoded.
+@skip_compression
+async def jwks(request: Request):
+    """
+    Return the public signing keys as a cacheable JWKS document.
+    """
+    document = security.key_ring.jwks
+    headers = {"ETag": document.etag, "Cache-Control": JWKS_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == document.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=document.body, media_type="application/json", headers=headers)
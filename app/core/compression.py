@@ -0,0 +1,149 @@
+import gzip
+import zlib
+
+from app.core.config import settings
+
+try:
+    # brotli is optional; without it only gzip is offered.
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Response compression. Only bodies of the listed content types and at least
+# COMPRESSION_MINIMUM_SIZE bytes are compressed; brotli is preferred when the
+# client accepts it and the package is installed. Routes opt out with
+# @skip_compression (e.g. when they set an ETag on the exact bytes they send).
+
+COMPRESSIBLE_CONTENT_TYPES = frozenset({
+    "application/json",
+    "application/problem+json",
+    "text/plain",
+    "text/html",
+})
+
+GZIP_LEVEL = 6
+# Low qualities are much faster than the default 11 and still beat gzip on JSON.
+BROTLI_QUALITY = 4
+
+
+def skip_compression(endpoint):
+    """Route decorator: send the route's responses uncompressed."""
+    endpoint.skip_compression = True
+    return endpoint
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Best encoding the client accepts: "br", "gzip" or "" for none."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return ""
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if brotli is not None and isinstance(self._compressor, brotli.Compressor):
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if brotli is not None and isinstance(self._compressor, brotli.Compressor):
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible response bodies."""
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                # First body chunk: decide, then send the (possibly rewritten) start.
+                response_headers = {key.lower(): value for key, value in start["headers"]}
+                content_type = response_headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1")
+                endpoint = getattr(scope.get("route"), "endpoint", None)
+                if (
+                    getattr(endpoint, "skip_compression", False)
+                    or b"content-encoding" in response_headers
+                    or content_type not in COMPRESSIBLE_CONTENT_TYPES
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers = [(key, value) for key, value in start["headers"] if key.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    # Whole body at once (the usual case): one-shot compression.
+                    compressed = compress(body, encoding)
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    passthrough = True
+                    return
+                compressor = _Compressor(encoding)
+                await send({**start, "headers": headers})
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+        if start is not None and compressor is None and not passthrough:
+            # The app sent a start without any body message.
+            await send(start)
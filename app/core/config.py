@@ -13,6 +13,22 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = ""
     SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None
+    JWT_KEY_ID: Optional[str] = None
+    JWT_ACCEPT_HS256: bool = True
+    JWT_KEYS_FILE: Optional[str] = None
+    REVOCATION_REFRESH_SECONDS: float = 5
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    KNOWN_EMAILS_ENABLED: bool = True
+    KNOWN_EMAILS_REFRESH_SECONDS: float = 5
+    KNOWN_EMAILS_REBUILD_SECONDS: float = 3600
+    KNOWN_EMAILS_CAPACITY: int = 1000000
+    KNOWN_EMAILS_REDIS_URL: Optional[str] = None
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = 5
     ACCESS_TOKEN_EXPIRE_HOURS: int = 672
     ALLOWED_COUNTRIES: str
     MAX_ADDRESSES_PER_USER: int
@@ -21,6 +37,35 @@ class Settings(BaseSettings):
     SMTP_USER: str
     SMTP_PASSWORD: str
     EMAIL_FROM: str
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    METRICS_ENABLED: bool = True
+    QUERY_STATS_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    EMAIL_OUTBOX_WORKER_ENABLED: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 2
+    EMAIL_OUTBOX_LEASE_SECONDS: float = 300
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = 30
+    USER_PURGE_WORKER_ENABLED: bool = True
+    USER_PURGE_BATCH_SIZE: int = 500
+    USER_PURGE_POLL_SECONDS: float = 30
+    USER_PURGE_DELAY_SECONDS: float = 60
+    USER_BULK_UPDATE_CHUNK_SIZE: int = 500
+    WEB_CONCURRENCY: int = 1
+    DB_MAX_CONNECTIONS: int = 80
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_REDIS_URL: Optional[str] = None
+    IDEMPOTENCY_TTL_SECONDS: float = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_LOCK_SECONDS: float = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 30
 
     @property
     def db_url(self):
@@ -0,0 +1,250 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.rate_limit import buffer_body, client_ip
+
+# Idempotency-Key support for the non-idempotent creation endpoints. The
+# first response per (caller, route, key) is stored and replayed to retries,
+# so a client retrying after a timeout does not register twice or redo bcrypt.
+# A retry that arrives while the first request is still running waits for it.
+# Keys are scoped by caller (its Authorization header, else its address), so
+# two clients that pick the same key never see each other's responses.
+
+# Route -> longest time (seconds) its response may be kept, on top of
+# IDEMPOTENCY_TTL_SECONDS. The registration response carries an access token:
+# it is never replayed once that token could have expired.
+IDEMPOTENT_ROUTES = {
+    "/auth/register": settings.ACCESS_TOKEN_EXPIRE_HOURS * 3600,
+    "/addresses": None,
+}
+
+MAX_KEY_LENGTH = 255
+# How often a request waiting on an in-flight duplicate checks the store.
+POLL_INTERVAL = 0.05
+
+
+class MemoryIdempotencyStore:
+    """
+    In-process store: an LRU of at most `max_entries` keys, each either
+    in flight (with a lock that expires, in case its request never finishes)
+    or done (holding the recorded response until its TTL).
+    """
+
+    def __init__(self, max_entries: int = 10000, clock=time.monotonic):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.max_entries = max_entries
+
+    def begin(self, key: str, fingerprint: str, lock_seconds: float):
+        """
+        Claim `key`. Returns ("started", None) if the caller should run the
+        request, ("in_flight", fingerprint) if another request holds it, or
+        ("done", record) with the stored response.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= now:
+                self._entries[key] = {"state": "in_flight", "fingerprint": fingerprint, "expires": now + lock_seconds}
+                self._entries.move_to_end(key)
+                self._evict()
+                return "started", None
+            if entry["state"] == "in_flight":
+                return "in_flight", entry["fingerprint"]
+            return "done", entry["record"]
+
+    def complete(self, key: str, record: dict, ttl: float):
+        with self._lock:
+            self._entries[key] = {"state": "done", "record": record, "expires": self._clock() + ttl}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self):
+        # Oldest first, but never a key whose request is still running.
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if self._entries[key]["state"] != "in_flight":
+                del self._entries[key]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisIdempotencyStore:
+    """
+    Shared store on top of any Redis-protocol client (anything exposing
+    set/get/delete), so every worker sees the same keys.
+    """
+
+    def __init__(self, client, prefix: str = "idempotency"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        # redis is an optional dependency, only needed for the shared backend.
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def begin(self, key: str, fingerprint: str, lock_seconds: float):
+        name = f"{self.prefix}:{key}"
+        claim = json.dumps({"state": "in_flight", "fingerprint": fingerprint})
+        if self.client.set(name, claim, nx=True, ex=max(1, int(lock_seconds))):
+            return "started", None
+        raw = self.client.get(name)
+        if raw is None:
+            # Expired between the two calls: try again.
+            return self.begin(key, fingerprint, lock_seconds)
+        entry = json.loads(raw)
+        if entry["state"] == "in_flight":
+            return "in_flight", entry["fingerprint"]
+        return "done", entry["record"]
+
+    def complete(self, key: str, record: dict, ttl: float):
+        self.client.set(f"{self.prefix}:{key}", json.dumps({"state": "done", "record": record}), ex=max(1, int(ttl)))
+
+    def release(self, key: str):
+        self.client.delete(f"{self.prefix}:{key}")
+
+    def reset(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+def build_idempotency_store():
+    if settings.IDEMPOTENCY_REDIS_URL:
+        return RedisIdempotencyStore.from_url(settings.IDEMPOTENCY_REDIS_URL)
+    return MemoryIdempotencyStore(max_entries=settings.IDEMPOTENCY_MAX_ENTRIES)
+
+idempotency_store = build_idempotency_store()
+
+
+def _caller(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return "auth-" + hashlib.sha256(value).hexdigest()
+    return "ip-" + client_ip(scope)
+
+def _error(status_code: int, detail: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+
+def _replay(record: dict):
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    return [
+        {"type": "http.response.start", "status": record["status"], "headers": headers},
+        {"type": "http.response.body", "body": base64.b64decode(record["body"])},
+    ]
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware applying Idempotency-Key to POSTs on IDEMPOTENT_ROUTES.
+    Requests without the header are not affected. Server errors (5xx) and
+    429 are not stored, so the client can retry those with the same key.
+    """
+
+    def __init__(self, app, store=None, routes=None, enabled: bool = True):
+        self.app = app
+        self.store = store if store is not None else idempotency_store
+        self.routes = routes if routes is not None else IDEMPOTENT_ROUTES
+        self.enabled = enabled
+
+    async def _call_store(self, method, *args):
+        if isinstance(self.store, MemoryIdempotencyStore):
+            return method(*args)
+        return await run_in_threadpool(method, *args)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled or scope["type"] != "http" or scope["method"] != "POST"
+            or scope["path"].rstrip("/") not in self.routes
+        ):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                idempotency_key = value.decode("latin-1").strip()
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _error(400, f"The Idempotency-Key header must have 1 to {MAX_KEY_LENGTH} characters.")(scope, receive, send)
+            return
+
+        body, receive = await buffer_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        path = scope["path"].rstrip("/")
+        key = f"{_caller(scope)}:{path}:{idempotency_key}"
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            state, value = await self._call_store(
+                self.store.begin, key, fingerprint, settings.IDEMPOTENCY_LOCK_SECONDS
+            )
+            if state == "started":
+                break
+            stored_fingerprint = value if state == "in_flight" else value["fingerprint"]
+            if stored_fingerprint != fingerprint:
+                await _error(422, "This Idempotency-Key was already used with a different request.")(scope, receive, send)
+                return
+            if state == "done":
+                for message in _replay(value):
+                    await send(message)
+                return
+            if time.monotonic() >= deadline:
+                await _error(
+                    409, "A request with this Idempotency-Key is still being processed.", {"Retry-After": "1"}
+                )(scope, receive, send)
+                return
+            await anyio.sleep(POLL_INTERVAL)
+
+        start = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            await self._call_store(self.store.release, key)
+            raise
+        if start is None or start["status"] >= 500 or start["status"] == 429:
+            await self._call_store(self.store.release, key)
+            return
+        record = {
+            "status": start["status"],
+            "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in start["headers"]],
+            "body": base64.b64encode(b"".join(chunks)).decode("ascii"),
+            "fingerprint": fingerprint,
+        }
+        ttl = settings.IDEMPOTENCY_TTL_SECONDS
+        if self.routes[path] is not None:
+            ttl = min(ttl, self.routes[path])
+        await self._call_store(self.store.complete, key, record, ttl)
@@ -0,0 +1,346 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from jose import jwk
+
+from app.core.config import settings
+
+# Signing keys for access tokens. HS* algorithms sign with a shared secret,
+# which only this service knows. RS*/ES* sign with a private key and publish the
+# public half at /.well-known/jwks.json, so downstream services can verify
+# tokens locally instead of calling POST /auth/verify-token.
+#
+# Keys live in a key ring. Each key has a kid (sent in the token header) and an
+# optional schedule: it signs from activates_at until retires_at, and keeps
+# verifying until expires_at. Rotating therefore never invalidates outstanding
+# tokens: old keys only verify until the tokens they signed expire, and users
+# re-authenticate gradually as their own tokens run out.
+
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+
+DEFAULT_KID = "default"
+
+
+class SigningKey:
+    def __init__(
+        self,
+        algorithm: str,
+        key: str,
+        kid: Optional[str] = None,
+        activates_at: Optional[datetime] = None,
+        retires_at: Optional[datetime] = None,
+        expires_at: Optional[datetime] = None
+    ):
+        if algorithm not in SYMMETRIC_ALGORITHMS | ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.signing_key = key
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            self.verifying_key = key
+            self.public_jwk = None
+        else:
+            private = jwk.construct(key, algorithm)
+            public = private.public_key()
+            self.verifying_key = public.to_pem().decode("utf-8")
+            self.public_jwk = public.to_dict()
+        self.kid = kid or self._thumbprint() or DEFAULT_KID
+        self.activates_at = activates_at
+        self.retires_at = retires_at
+        self.expires_at = expires_at
+
+    @property
+    def is_symmetric(self) -> bool:
+        return self.algorithm in SYMMETRIC_ALGORITHMS
+
+    def can_sign(self, now: datetime) -> bool:
+        return (self.activates_at is None or self.activates_at <= now) and (self.retires_at is None or now < self.retires_at)
+
+    def can_verify(self, now: datetime) -> bool:
+        # Keys scheduled for the future already verify, so a token signed by a
+        # worker that switched a little earlier is never rejected by another.
+        return self.expires_at is None or now < self.expires_at
+
+    def _thumbprint(self) -> Optional[str]:
+        # RFC 7638 thumbprint of the public key, so kids are stable across restarts.
+        if self.public_jwk is None:
+            return None
+        required = {name: self.public_jwk[name] for name in ("crv", "e", "kty", "n", "x", "y") if name in self.public_jwk}
+        canonical = json.dumps(required, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def jwks_entry(self) -> Optional[dict]:
+        if self.public_jwk is None:
+            return None
+        return {**self.public_jwk, "kid": self.kid, "use": "sig", "alg": self.algorithm}
+
+
+class JWKSDocument:
+    """Serialized JWKS body and its ETag, computed once per key change."""
+
+    def __init__(self, keys: list):
+        entries = [entry for entry in (key.jwks_entry() for key in keys) if entry]
+        self.body = json.dumps({"keys": entries}, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+
+class KeyRing:
+    """
+    Set of signing keys with a precomputed view of the current state: the
+    signing key, a kid -> key dict for verification and the JWKS document.
+    The view is only rebuilt when the next scheduled transition passes, so
+    signing and key lookup are O(1).
+    """
+
+    def __init__(self, keys: list, clock=None):
+        kids = [key.kid for key in keys]
+        if len(kids) != len(set(kids)):
+            raise ValueError("Key ids in the key ring must be unique.")
+        self.keys = list(keys)
+        self._clock = clock or (lambda: datetime.now(timezone.utc))
+        self._next_transition = None
+        self._refresh(self._clock())
+
+    def _refresh(self, now: datetime):
+        verifying = [key for key in self.keys if key.can_verify(now)]
+        signing = [key for key in verifying if key.can_sign(now)]
+        if not signing:
+            raise RuntimeError("The key ring has no key able to sign right now.")
+        # The most recently activated key signs; unscheduled keys count as oldest.
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        self._signing_key = max(signing, key=lambda key: key.activates_at or oldest)
+        self._by_kid = {key.kid: key for key in verifying}
+        # Tokens issued before kids existed carry no kid: verify them with the
+        # first key of their algorithm, in configuration order.
+        self._kidless = {}
+        for key in verifying:
+            self._kidless.setdefault(key.algorithm, key)
+        self._jwks = JWKSDocument(verifying)
+
+        upcoming = [
+            moment for key in self.keys
+            for moment in (key.activates_at, key.retires_at, key.expires_at)
+            if moment is not None and moment > now
+        ]
+        self._next_transition = min(upcoming) if upcoming else None
+
+    def _current(self):
+        if self._next_transition is not None:
+            now = self._clock()
+            if now >= self._next_transition:
+                self._refresh(now)
+
+    def signing_key(self) -> SigningKey:
+        self._current()
+        return self._signing_key
+
+    def verification_key(self, kid: Optional[str], algorithm: Optional[str]) -> Optional[SigningKey]:
+        self._current()
+        key = self._by_kid.get(kid) if kid is not None else self._kidless.get(algorithm)
+        # Only ever verify with the algorithm bound to the key (no algorithm confusion).
+        if key is None or key.algorithm != algorithm:
+            return None
+        return key
+
+    @property
+    def jwks(self) -> JWKSDocument:
+        self._current()
+        return self._jwks
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _read_private_key() -> Optional[str]:
+    if settings.JWT_PRIVATE_KEY_FILE:
+        with open(settings.JWT_PRIVATE_KEY_FILE, "r", encoding="utf-8") as f:
+            return f.read()
+    if settings.JWT_PRIVATE_KEY:
+        # Allow the PEM to be passed in a single-line environment variable.
+        return settings.JWT_PRIVATE_KEY.replace("\\n", "\n")
+    return None
+
+def _key_from_entry(entry: dict, base_dir: str) -> SigningKey:
+    algorithm = entry["algorithm"]
+    if algorithm in SYMMETRIC_ALGORITHMS:
+        material = entry.get("secret") or settings.SECRET_KEY
+    elif entry.get("private_key_file"):
+        with open(os.path.join(base_dir, entry["private_key_file"]), "r", encoding="utf-8") as f:
+            material = f.read()
+    else:
+        material = entry["private_key"]
+    return SigningKey(
+        algorithm,
+        material,
+        kid=entry["kid"],
+        activates_at=_parse_datetime(entry.get("activates_at")),
+        retires_at=_parse_datetime(entry.get("retires_at")),
+        expires_at=_parse_datetime(entry.get("expires_at"))
+    )
+
+def read_keys_file(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["keys"]
+
+def load_key_ring() -> KeyRing:
+    """
+    Build the key ring from JWT_KEYS_FILE when set, otherwise from the single
+    JWT_ALGORITHM key. In both cases the SECRET_KEY HS256 key keeps verifying
+    while JWT_ACCEPT_HS256 is on.
+    """
+    if settings.JWT_KEYS_FILE:
+        base_dir = os.path.dirname(os.path.abspath(settings.JWT_KEYS_FILE))
+        keys = [_key_from_entry(entry, base_dir) for entry in read_keys_file(settings.JWT_KEYS_FILE)]
+    elif settings.JWT_ALGORITHM in SYMMETRIC_ALGORITHMS:
+        keys = [SigningKey(settings.JWT_ALGORITHM, settings.SECRET_KEY, kid=settings.JWT_KEY_ID)]
+    else:
+        private_key = _read_private_key()
+        if not private_key:
+            raise RuntimeError(f"JWT_ALGORITHM={settings.JWT_ALGORITHM} requires JWT_PRIVATE_KEY or JWT_PRIVATE_KEY_FILE.")
+        keys = [SigningKey(settings.JWT_ALGORITHM, private_key, kid=settings.JWT_KEY_ID)]
+
+    if settings.JWT_ACCEPT_HS256 and not any(key.algorithm == "HS256" for key in keys):
+        # Verify-only: retired from signing since the beginning of time.
+        keys.append(SigningKey("HS256", settings.SECRET_KEY, kid="legacy-hs256",
+                               retires_at=datetime.min.replace(tzinfo=timezone.utc)))
+    return KeyRing(keys)
+
+
+def generate_private_key(algorithm: str) -> str:
+    """Generate a PEM private key for RS*/ES* algorithms. Requires `cryptography`."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm in ("ES256", "ES384", "ES512"):
+        curve = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}[algorithm]
+        key = ec.generate_private_key(curve)
+    else:
+        raise ValueError(f"Cannot generate a key for {algorithm}")
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode("utf-8")
+
+
+def has_signing_key(entries: list, now: datetime) -> bool:
+    """Whether some keys-file entry is able to sign at `now`."""
+    for entry in entries:
+        activates_at = _parse_datetime(entry.get("activates_at"))
+        retires_at = _parse_datetime(entry.get("retires_at"))
+        if (activates_at is None or activates_at <= now) and (retires_at is None or now < retires_at):
+            return True
+    return False
+
+def configured_key_entry(base_dir: str) -> dict:
+    """
+    The key configured through JWT_ALGORITHM (and JWT_PRIVATE_KEY[_FILE]) as a
+    keys-file entry, with the kid its tokens already carry. An inline
+    JWT_PRIVATE_KEY is written next to the keys file.
+    """
+    if settings.JWT_ALGORITHM in SYMMETRIC_ALGORITHMS:
+        key = SigningKey(settings.JWT_ALGORITHM, settings.SECRET_KEY, kid=settings.JWT_KEY_ID)
+        # No secret in the file: symmetric entries sign with SECRET_KEY.
+        return {"kid": key.kid, "algorithm": key.algorithm}
+    private_key = _read_private_key()
+    if not private_key:
+        raise RuntimeError(f"JWT_ALGORITHM={settings.JWT_ALGORITHM} requires JWT_PRIVATE_KEY or JWT_PRIVATE_KEY_FILE.")
+    key = SigningKey(settings.JWT_ALGORITHM, private_key, kid=settings.JWT_KEY_ID)
+    if settings.JWT_PRIVATE_KEY_FILE:
+        private_key_file = os.path.abspath(settings.JWT_PRIVATE_KEY_FILE)
+    else:
+        private_key_file = f"{key.kid}.pem"
+        with open(os.path.join(base_dir, private_key_file), "w", encoding="utf-8") as f:
+            f.write(private_key)
+        os.chmod(os.path.join(base_dir, private_key_file), 0o600)
+    return {"kid": key.kid, "algorithm": key.algorithm, "private_key_file": private_key_file}
+
+def rotate_keys(entries: list, algorithm: str, kid: str, private_key_file: str,
+                activates_at: datetime, token_lifetime: timedelta, now: datetime) -> list:
+    """
+    Schedule a new key: it signs from `activates_at`, the keys signing until then
+    retire at that moment and keep verifying for one token lifetime. Keys whose
+    verification window is over are dropped.
+    """
+    rotated = []
+    for entry in entries:
+        expires_at = _parse_datetime(entry.get("expires_at"))
+        if expires_at is not None and expires_at <= now:
+            continue
+        if not entry.get("retires_at"):
+            entry = {
+                **entry,
+                "retires_at": activates_at.isoformat(),
+                "expires_at": (activates_at + token_lifetime).isoformat()
+            }
+        rotated.append(entry)
+    rotated.append({
+        "kid": kid,
+        "algorithm": algorithm,
+        "private_key_file": private_key_file,
+        "activates_at": activates_at.isoformat()
+    })
+    return rotated
+
+
+def _generate_command(args) -> int:
+    sys.stdout.write(generate_private_key(args.algorithm))
+    return 0
+
+def _rotate_command(args) -> int:
+    now = datetime.now(timezone.utc)
+    kid = args.kid or now.strftime("%Y%m%d%H%M%S")
+    base_dir = os.path.dirname(os.path.abspath(args.keys_file))
+    private_key_file = f"{kid}.pem"
+    with open(os.path.join(base_dir, private_key_file), "w", encoding="utf-8") as f:
+        f.write(generate_private_key(args.algorithm))
+    os.chmod(os.path.join(base_dir, private_key_file), 0o600)
+
+    entries = read_keys_file(args.keys_file) if os.path.exists(args.keys_file) else []
+    if not has_signing_key(entries, now):
+        # First rotation (or an empty file): the key configured today keeps
+        # signing until the new one activates, and then verifies its tokens.
+        entries = [configured_key_entry(base_dir)] + entries
+    entries = rotate_keys(
+        entries, args.algorithm, kid, private_key_file,
+        activates_at=now + timedelta(hours=args.lead_hours),
+        token_lifetime=timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS),
+        now=now
+    )
+    with open(args.keys_file, "w", encoding="utf-8") as f:
+        json.dump({"keys": entries}, f, indent=2)
+    print(f"Key {kid} scheduled to start signing in {args.lead_hours} hours.")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="Print a new PEM private key.")
+    generate_parser.add_argument("--algorithm", default="RS256", choices=sorted(ASYMMETRIC_ALGORITHMS))
+    generate_parser.set_defaults(handler=_generate_command)
+
+    rotate_parser = subparsers.add_parser("rotate", help="Schedule a new signing key in a keys file.")
+    rotate_parser.add_argument("--keys-file", required=True)
+    rotate_parser.add_argument("--algorithm", default="RS256", choices=sorted(ASYMMETRIC_ALGORITHMS))
+    rotate_parser.add_argument("--kid")
+    rotate_parser.add_argument("--lead-hours", type=float, default=24,
+                               help="Hours before the new key starts signing. Must cover a restart of every worker.")
+    rotate_parser.set_defaults(handler=_rotate_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
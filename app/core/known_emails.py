@@ -0,0 +1,210 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.metrics import cache_lookups_total
+from app.core.revocation import BloomFilter
+
+# In-process bloom filter of the (normalized) emails of existing users, so a
+# lookup of an email nobody registered (login, password reset and verification
+# requests sprayed by bots) is answered without a query. A miss is definitive;
+# a hit goes to the database as before.
+# Registrations and email changes made by this process are added on commit.
+# Those made by other processes are picked up by KnownEmailsRefresher every
+# KNOWN_EMAILS_REFRESH_SECONDS (rows whose created_at or updated_at moved), and
+# the filter is rebuilt every KNOWN_EMAILS_REBUILD_SECONDS so emails of deleted
+# users stop matching. A filter that has not been refreshed for a while (the
+# refresher stopped, the database is unreachable) is not trusted: lookups go
+# to the database until it catches up.
+# Until then, another process would miss a user registered a moment ago. With
+# several processes, each registration is also written to a shared store
+# (KNOWN_EMAILS_REDIS_URL) before it commits, and a bloom miss is only final
+# once that store does not have the email either. Without a shared store the
+# filter is only used when the server runs a single worker.
+
+logger = logging.getLogger("app.known_emails")
+
+# Transactions commit in a different order than their timestamps (and ids) were
+# taken; every refresh re-reads this window so a late commit is never missed.
+REFRESH_OVERLAP = timedelta(seconds=30)
+# Refreshes that can be missed before the filter stops answering.
+STALE_AFTER_REFRESHES = 3
+
+
+class RedisKnownEmailsStore:
+    """
+    Emails registered recently by any process, on top of any Redis-protocol
+    client (anything exposing set/exists). Entries expire once every process
+    has had time to refresh its own filter.
+    """
+
+    def __init__(self, client, prefix: str = "known-emails"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        # redis is an optional dependency, only needed for the shared backend.
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def _name(self, email_normalized: str) -> str:
+        # Hashed: the store does not need to hold the addresses themselves.
+        return f"{self.prefix}:{hashlib.sha256(email_normalized.encode()).hexdigest()}"
+
+    def add(self, email_normalized: str, ttl: float):
+        self.client.set(self._name(email_normalized), 1, ex=max(1, int(ttl)))
+
+    def contains(self, email_normalized: str) -> bool:
+        return bool(self.client.exists(self._name(email_normalized)))
+
+
+class KnownEmails:
+    def __init__(self, session_factory=None, refresh_seconds: float = 5.0, rebuild_seconds: float = 3600,
+                 capacity: int = 1_000_000, enabled: bool = True, shared=None, clock=time.monotonic):
+        self._session_factory = session_factory
+        self.enabled = enabled
+        self.shared = shared
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.capacity = capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Until the first load completes every lookup goes to the database.
+        self._bloom = None
+        self._created_watermark = None
+        self._updated_watermark = None
+        self._fresh_until = 0.0
+        self._next_rebuild = 0.0
+
+    def _session(self):
+        if self._session_factory is None:
+            # Imported lazily: the session module builds the engine at import time.
+            from app.db.session import BackgroundSessionLocal
+            self._session_factory = BackgroundSessionLocal
+        return self._session_factory()
+
+    def might_exist(self, email_normalized: str) -> bool:
+        """False only if no user has this email; True means "ask the database"."""
+        bloom = self._bloom
+        if not self.enabled or bloom is None or self._clock() > self._fresh_until:
+            return True
+        if email_normalized in bloom:
+            cache_lookups_total.inc("known_emails_bloom", "hit")
+            return True
+        if self.shared is not None:
+            try:
+                if self.shared.contains(email_normalized):
+                    cache_lookups_total.inc("known_emails_bloom", "hit")
+                    return True
+            except Exception:
+                logger.exception("Known emails shared store lookup failed")
+                return True
+        cache_lookups_total.inc("known_emails_bloom", "miss")
+        return False
+
+    def add(self, email_normalized: str):
+        """Apply a registration or email change made by this process right away."""
+        if self._bloom is not None:
+            self._bloom.add(email_normalized)
+
+    def share(self, email_normalized: str):
+        """
+        Tell the other processes about a registration or email change. Called
+        before the commit, so no process can see the row and miss the email.
+        """
+        if self.shared is not None:
+            # Until every process trusting its filter has refreshed past the commit.
+            ttl = STALE_AFTER_REFRESHES * self.refresh_seconds + REFRESH_OVERLAP.total_seconds()
+            self.shared.add(email_normalized, ttl)
+
+    def refresh(self):
+        """Load the filter, or bring it up to date; rebuilt when it is due."""
+        from app.models.user_model import User
+
+        with self._lock:
+            # Freshness counts from the start: rows committed during the refresh may be missed.
+            started = self._clock()
+            rebuild = self._bloom is None or self._clock() >= self._next_rebuild
+            db = self._session()
+            try:
+                if rebuild:
+                    # Watermarks first: rows committed during the load are read again next time.
+                    created_watermark = db.query(func.max(User.created_at)).scalar()
+                    updated_watermark = db.query(func.max(User.updated_at)).scalar()
+                    emails = [email for email, in db.query(User.email_normalized).filter(User.deleted_at.is_(None))]
+                    # Sized for the current users with room to grow until the next rebuild.
+                    bloom = BloomFilter(max(self.capacity, 2 * len(emails)))
+                    for email in emails:
+                        bloom.add(email)
+                    self._created_watermark = created_watermark
+                    self._updated_watermark = updated_watermark
+                    # Swap in the rebuilt filter only once it is complete.
+                    self._bloom = bloom
+                    self._next_rebuild = self._clock() + self.rebuild_seconds
+                else:
+                    self._created_watermark = self._read_since(db, User.created_at, self._created_watermark)
+                    self._updated_watermark = self._read_since(db, User.updated_at, self._updated_watermark)
+            finally:
+                db.close()
+            self._fresh_until = started + STALE_AFTER_REFRESHES * self.refresh_seconds
+
+    def _read_since(self, db, column, watermark):
+        # Adds the emails of rows whose `column` is past `watermark` (minus the overlap).
+        from app.models.user_model import User
+
+        query = db.query(User.email_normalized, column)
+        if watermark is not None:
+            query = query.filter(column > watermark - REFRESH_OVERLAP)
+        else:
+            query = query.filter(column.isnot(None))
+        for email, value in query:
+            self._bloom.add(email)
+            if watermark is None or value > watermark:
+                watermark = value
+        return watermark
+
+
+class KnownEmailsRefresher(threading.Thread):
+    """Keeps a KnownEmails filter loaded and fresh, off the request path."""
+
+    def __init__(self, state: KnownEmails = None):
+        super().__init__(daemon=True, name="known-emails")
+        self.state = state if state is not None else known_emails
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.state.refresh()
+            except Exception:
+                logger.exception("Known emails refresh failed")
+            self.stop_event.wait(self.state.refresh_seconds)
+
+    def stop(self, timeout: float = None):
+        self.stop_event.set()
+        self.join(timeout)
+
+
+def build_known_emails():
+    shared = None
+    if settings.KNOWN_EMAILS_REDIS_URL:
+        shared = RedisKnownEmailsStore.from_url(settings.KNOWN_EMAILS_REDIS_URL)
+    return KnownEmails(
+        refresh_seconds=settings.KNOWN_EMAILS_REFRESH_SECONDS,
+        rebuild_seconds=settings.KNOWN_EMAILS_REBUILD_SECONDS,
+        capacity=settings.KNOWN_EMAILS_CAPACITY,
+        # A miss is only final if every registration is visible to this process.
+        enabled=settings.KNOWN_EMAILS_ENABLED and (shared is not None or settings.WEB_CONCURRENCY == 1),
+        shared=shared
+    )
+
+known_emails = build_known_emails()
@@ -0,0 +1,232 @@
+import time
+from bisect import bisect_left
+
+import anyio.to_thread
+from sqlalchemy import event
+
+# Minimal Prometheus instrumentation without external dependencies.
+# Counters and histograms are plain Python numbers updated without locks:
+# under the GIL a lost increment is possible but rare, which is an acceptable
+# trade-off to keep collection cheap enough to leave on in production.
+# The only per-observation allocation is the label tuple.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+    def clear(self):
+        self._values.clear()
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def collect(self):
+        value = self.callback()
+        if value is not None:
+            yield f"{self.name} {value}"
+
+    def clear(self):
+        pass
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last)..., sum]
+        self._values = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values.setdefault(labels, [0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels):
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def collect(self):
+        for labels, series in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}"
+
+    def clear(self):
+        self._values.clear()
+
+
+def generate_latest() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_requests_total = Counter(
+    "http_requests_total", "Total HTTP requests by route and status code.", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+
+# Database
+db_queries_total = Counter("db_queries_total", "Total SQL statements executed.")
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "SQL statement latency.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Password hashing
+password_hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash and verify duration.", ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+)
+
+# Email
+email_send_duration_seconds = Histogram("email_send_duration_seconds", "SMTP send duration.")
+email_send_failures_total = Counter("email_send_failures_total", "Total failed SMTP sends.")
+email_outbox_dead_letters_total = Counter("email_outbox_dead_letters_total", "Outbox emails given up on after too many attempts.")
+
+# Caches: every in-process cache reports lookups as hit or miss under its own name.
+cache_lookups_total = Counter("cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+# Request coalescing: "coalesced" calls shared the result of a "leader" call.
+single_flight_calls_total = Counter(
+    "single_flight_calls_total", "Single-flight calls by flight and result.", ("flight", "result")
+)
+
+
+def _threadpool_stat(name):
+    # Sync route handlers run in anyio's default thread limiter. Its state is
+    # bound to the event loop, so it can only be read from an async handler.
+    try:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+    except Exception:
+        return None
+    return getattr(limiter, name)
+
+Gauge("threadpool_tokens_total", "Threadpool size available to sync handlers.", lambda: _threadpool_stat("total_tokens"))
+Gauge("threadpool_tokens_borrowed", "Threadpool workers currently busy.", lambda: _threadpool_stat("borrowed_tokens"))
+
+
+def register_pool_gauges(engine):
+    pool = engine.pool
+    Gauge("db_pool_size", "Configured connection pool size.", lambda: _pool_stat(pool, "size"))
+    Gauge("db_pool_checked_out", "Connections currently checked out.", lambda: _pool_stat(pool, "checkedout"))
+    # QueuePool reports negative overflow while the pool is not yet full.
+    Gauge("db_pool_overflow", "Connections open beyond the pool size.",
+          lambda: max(0, _pool_stat(pool, "overflow") or 0))
+
+def _pool_stat(pool, name):
+    # Only QueuePool exposes these counters; other pool classes report nothing.
+    stat = getattr(pool, name, None)
+    return stat() if callable(stat) else None
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        db_queries_total.inc()
+        db_query_duration_seconds.observe(elapsed)
+
+    register_pool_gauges(engine)
+
+
+def route_template(scope) -> str:
+    """
+    Route template of a handled request, e.g. /users/{user_id}. Labels always
+    use the template, never the raw path, to keep cardinality bounded.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # A route reached through include_router only knows its own path; FastAPI
+    # keeps the one with the router prefix in its effective route context.
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(context, "path_format", None) or getattr(route, "path_format", None) or scope["path"]
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route_label = route_template(scope)
+            http_request_duration_seconds.observe(time.perf_counter() - start, scope["method"], route_label)
+            http_requests_total.inc(scope["method"], route_label, str(status_code))
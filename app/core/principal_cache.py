@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.metrics import cache_lookups_total
+
+# Authenticated callers are resolved to a slim principal, cached per user id
+# for a few seconds so authenticating a request does not cost a query.
+# user_crud invalidates an entry whenever the user is updated or deleted;
+# changes made by other instances show up once the TTL expires.
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str
+    is_active: bool
+
+
+class PrincipalCache:
+    """LRU cache of principals with a per-entry TTL."""
+
+    def __init__(self, ttl: float = 30, max_size: int = 10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped by every invalidation, so a load that raced with one is not stored.
+        self._generation = 0
+
+    def get(self, user_id: int, loader):
+        """
+        Return the cached principal for `user_id`, calling `loader(user_id)`
+        on a miss. The loader returns a Principal, or None for unknown users
+        (which are not cached).
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                cache_lookups_total.inc("principal", "hit")
+                return entry[0]
+            generation = self._generation
+        cache_lookups_total.inc("principal", "miss")
+
+        principal = loader(user_id)
+        if principal is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (principal, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache(ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS, max_size=settings.PRINCIPAL_CACHE_MAX_SIZE)
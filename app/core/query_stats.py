@@ -0,0 +1,111 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.metrics import route_template
+
+# Per-request SQL instrumentation. The middleware opens a RequestQueryStats for
+# each request; the cursor hooks add every statement to it. Sync route handlers
+# run in the threadpool with a copy of the request context, so they see the
+# same (mutable) stats object as the middleware.
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\([^)]*\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+
+
+class RequestQueryStats:
+    __slots__ = ("scope", "count", "duration")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope) if self.scope is not None else "-"
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Collapse a statement to its shape so identical queries group together
+    in the slow-query log: literals become ?, IN lists become IN (...).
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (...)", statement)
+
+
+_instrumented_engines = set()
+
+def instrument_query_stats(engine, slow_query_threshold_ms: float):
+    if engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+    threshold = slow_query_threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_stats_start"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration += elapsed
+        if elapsed >= threshold:
+            slow_query_logger.warning(
+                "Slow query (%.1f ms) on %s: %s",
+                elapsed * 1000,
+                stats.route if stats is not None else "-",
+                normalize_sql(statement)
+            )
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that counts the SQL statements and DB time of each request
+    and reports them, along with total time, in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                server_timing = (
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+                    f"app;dur={total_ms:.2f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
@@ -0,0 +1,227 @@
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+# Rate limiting for the expensive auth endpoints (bcrypt, SMTP, token inserts).
+# The check runs as ASGI middleware, so a rejected request never reaches the
+# route handler, bcrypt or the database.
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    # Number of requests allowed per window, and window length in seconds.
+    limit: int
+    window: int
+    # "ip" keys on the client address, "email" on the email field of the JSON body.
+    key: str = "ip"
+
+# Per-route configuration. Every rule of a route must pass for the request to go through.
+RATE_LIMIT_RULES = {
+    "/auth/login": (
+        RateLimitRule(limit=20, window=60, key="ip"),
+        RateLimitRule(limit=5, window=60, key="email"),
+    ),
+    "/auth/register": (
+        RateLimitRule(limit=10, window=60, key="ip"),
+    ),
+    "/auth/request-password-reset": (
+        RateLimitRule(limit=10, window=60, key="ip"),
+        RateLimitRule(limit=3, window=300, key="email"),
+    ),
+    "/auth/request-email-verification": (
+        RateLimitRule(limit=10, window=60, key="ip"),
+        RateLimitRule(limit=3, window=300, key="email"),
+    ),
+}
+
+
+class MemoryRateLimitStore:
+    """
+    In-process token bucket store. Each key holds (tokens, last_refill, window),
+    so a check is a single dict lookup. Idle buckets are evicted periodically.
+    """
+
+    def __init__(self, eviction_interval: int = 60, clock=time.monotonic):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._eviction_interval = eviction_interval
+        self._next_eviction = clock() + eviction_interval
+
+    def hit(self, key: str, limit: int, window: int) -> float:
+        """
+        Consume one token for `key`. Returns 0 if allowed, otherwise the number
+        of seconds until a token becomes available.
+        """
+        now = self._clock()
+        rate = limit / window
+        with self._lock:
+            if now >= self._next_eviction:
+                self._evict(now)
+            tokens, last, _ = self._buckets.get(key, (limit, now, window))
+            tokens = min(limit, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, window)
+                return 0.0
+            self._buckets[key] = (tokens, now, window)
+            return (1 - tokens) / rate
+
+    def _evict(self, now: float):
+        # A bucket idle for a full window is back at full capacity,
+        # so dropping it is equivalent to keeping it.
+        expired = [key for key, (_, last, window) in self._buckets.items() if now - last >= window]
+        for key in expired:
+            del self._buckets[key]
+        self._next_eviction = now + self._eviction_interval
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisRateLimitStore:
+    """
+    Shared sliding-window counter on top of any Redis-protocol client
+    (anything exposing incr/expire/get), so several workers share limits.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit", clock=time.time):
+        self.client = client
+        self.prefix = prefix
+        self._clock = clock
+
+    @classmethod
+    def from_url(cls, url: str):
+        # redis is an optional dependency, only needed for the shared backend.
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def hit(self, key: str, limit: int, window: int) -> float:
+        now = self._clock()
+        current_window = int(now // window)
+        current_key = f"{self.prefix}:{key}:{current_window}"
+        previous_key = f"{self.prefix}:{key}:{current_window - 1}"
+
+        count = int(self.client.incr(current_key))
+        if count == 1:
+            self.client.expire(current_key, window * 2)
+        previous = int(self.client.get(previous_key) or 0)
+
+        elapsed = now - current_window * window
+        weighted = previous * (window - elapsed) / window + count
+        if weighted <= limit:
+            return 0.0
+        if count > limit or not previous:
+            return window - elapsed
+        # Wait until the previous window's weight decays enough to admit one more request.
+        return max(0.0, window - (limit - count) * window / previous - elapsed)
+
+    def reset(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+def build_rate_limit_store():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisRateLimitStore.from_url(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitStore()
+
+rate_limit_store = build_rate_limit_store()
+
+
+def client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _email_from_body(body: bytes):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    email = data.get("email") if isinstance(data, dict) else None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that applies RATE_LIMIT_RULES and answers 429 with a
+    Retry-After header before the request reaches the application.
+    """
+
+    def __init__(self, app, store=None, rules=None, enabled: bool = True):
+        self.app = app
+        self.store = store if store is not None else rate_limit_store
+        self.rules = rules if rules is not None else RATE_LIMIT_RULES
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        rules = self.rules.get(scope["path"].rstrip("/"))
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        email = None
+        if any(rule.key == "email" for rule in rules):
+            body, receive = await buffer_body(receive)
+            email = _email_from_body(body)
+
+        for rule in rules:
+            value = client_ip(scope) if rule.key == "ip" else email
+            if value is None:
+                continue
+            key = f"{scope['path']}:{rule.key}:{value}"
+            if isinstance(self.store, MemoryRateLimitStore):
+                retry_after = self.store.hit(key, rule.limit, rule.window)
+            else:
+                retry_after = await run_in_threadpool(self.store.hit, key, rule.limit, rule.window)
+            if retry_after:
+                response = JSONResponse(
+                    {"detail": "Too many requests. Please try again later."},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+async def buffer_body(receive):
+    # Read the whole request body and hand back a receive callable that replays it.
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
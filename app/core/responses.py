@@ -0,0 +1,19 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    # orjson is an optional speed-up; without it the standard encoder is used.
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Default response class of the app. Routes with a response_model are
+# serialized straight to JSON bytes by Pydantic and never reach render();
+# this covers routes that return plain dicts and lists (e.g. the auth routes).
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.metrics import cache_lookups_total
+
+# In-process view of token revocations, so verifying a token never costs a
+# query. Two mechanisms:
+#   - Per-user token version: tokens embed the user's token_version ("ver");
+#     bumping it (password change, deactivation) revokes every older token.
+#     Only users that were ever bumped are kept in memory.
+#   - Explicitly revoked jtis (logout), held in a bloom filter. A miss is
+#     definitive; a hit is confirmed against the database.
+# Both are refreshed incrementally from the database every
+# REVOCATION_REFRESH_SECONDS, and changes made by this process apply immediately.
+
+# Rows committed slightly out of timestamp order are caught by re-reading this window.
+REFRESH_OVERLAP = timedelta(seconds=30)
+# Bloom filters cannot forget, so the filter is rebuilt from unexpired rows periodically.
+BLOOM_REBUILD_SECONDS = 3600
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationState:
+    def __init__(self, session_factory=None, refresh_seconds: float = 5.0, bloom_capacity: int = 100_000, clock=time.monotonic):
+        self._session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self.bloom_capacity = bloom_capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._versions = {}
+        self._bloom = BloomFilter(self.bloom_capacity)
+        self._versions_watermark = None
+        self._revoked_watermark = None
+        self._next_refresh = 0.0
+        self._loaded = False
+        self._next_rebuild = self._clock() + BLOOM_REBUILD_SECONDS
+
+    def _session(self):
+        if self._session_factory is None:
+            # Imported lazily: the session module builds the engine at import time.
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def is_revoked(self, payload: dict) -> bool:
+        self._maybe_refresh()
+        if self._versions.get(payload.get("sub"), 0) > payload.get("ver", 0):
+            return True
+        jti = payload.get("jti")
+        if jti is None:
+            return False
+        if jti not in self._bloom:
+            cache_lookups_total.inc("revoked_jti_bloom", "miss")
+            return False
+        cache_lookups_total.inc("revoked_jti_bloom", "hit")
+        return self._confirm_revoked(jti)
+
+    def note_version(self, user_id: int, version: int):
+        """Apply a token_version bump made by this process right away."""
+        key = str(user_id)
+        if version > self._versions.get(key, 0):
+            self._versions[key] = version
+
+    def note_revoked(self, jti: str):
+        self._bloom.add(jti)
+
+    def _maybe_refresh(self):
+        if self._clock() < self._next_refresh:
+            return
+        # Only one thread refreshes; the others keep using the current view.
+        # Before the first load succeeds there is no view to use (an empty one
+        # would accept every revoked token), so they wait for it instead.
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            # Loaded by another thread while this one waited.
+            if self._clock() >= self._next_refresh:
+                self.refresh()
+        finally:
+            self._lock.release()
+
+    def refresh(self):
+        from app.models.auth_model import RevokedToken
+        from app.models.user_model import User
+
+        db = self._session()
+        try:
+            query = db.query(User.id, User.token_version, User.token_version_changed_at).filter(
+                User.token_version_changed_at.isnot(None)
+            )
+            if self._versions_watermark is not None:
+                query = query.filter(User.token_version_changed_at > self._versions_watermark - REFRESH_OVERLAP)
+            for user_id, version, changed_at in query:
+                self.note_version(user_id, version)
+                if self._versions_watermark is None or changed_at > self._versions_watermark:
+                    self._versions_watermark = changed_at
+
+            rebuild = self._clock() >= self._next_rebuild
+            bloom = BloomFilter(self.bloom_capacity) if rebuild else self._bloom
+            watermark = None if rebuild else self._revoked_watermark
+            query = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(
+                RevokedToken.expires_at > datetime.now(timezone.utc)
+            )
+            if watermark is not None:
+                query = query.filter(RevokedToken.revoked_at > watermark - REFRESH_OVERLAP)
+            for jti, revoked_at in query:
+                bloom.add(jti)
+                if watermark is None or revoked_at > watermark:
+                    watermark = revoked_at
+            # Swap in the rebuilt filter only once it is complete.
+            self._bloom = bloom
+            self._revoked_watermark = watermark
+            if rebuild:
+                self._next_rebuild = self._clock() + BLOOM_REBUILD_SECONDS
+        finally:
+            db.close()
+        self._next_refresh = self._clock() + self.refresh_seconds
+        self._loaded = True
+
+    def _confirm_revoked(self, jti: str) -> bool:
+        from app.models.auth_model import RevokedToken
+
+        db = self._session()
+        try:
+            return db.query(RevokedToken.jti).filter(RevokedToken.jti == jti).first() is not None
+        finally:
+            db.close()
+
+
+revocation_state = RevocationState(
+    refresh_seconds=settings.REVOCATION_REFRESH_SECONDS,
+    bloom_capacity=settings.REVOCATION_BLOOM_CAPACITY
+)
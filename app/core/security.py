@@ -1,18 +1,51 @@
+import time
+import uuid
 from passlib.context import CryptContext
 
 from datetime import datetime, timedelta, timezone
 from jose import ExpiredSignatureError, JWTError, jwt
 from app.core.config import settings
+from app.core.jwt_keys import KeyRing, load_key_ring
+from app.core.metrics import password_hash_duration_seconds
+from app.core.revocation import revocation_state
+from app.core.single_flight import single_flight
 
 # Provide functions to hash and verify passwords using bcrypt.
 # It uses the passlib library to handle password hashing and verification.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    start = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    password_hash_duration_seconds.observe(time.perf_counter() - start, "hash")
+    return hashed
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    start = time.perf_counter()
+    result = pwd_context.verify(plain_password, hashed_password)
+    password_hash_duration_seconds.observe(time.perf_counter() - start, "verify")
+    return result
+
+def dummy_verify_password():
+    # Costs the same as verify_password, for requests that have no hash to check.
+    start = time.perf_counter()
+    pwd_context.dummy_verify()
+    password_hash_duration_seconds.observe(time.perf_counter() - start, "verify")
+
+# Keys used to sign and verify tokens (see app.core.jwt_keys).
+key_ring = load_key_ring()
+
+def configure_key_ring(ring: KeyRing):
+    global key_ring
+    key_ring = ring
+
+def _verification_key(token: str):
+    # Select the key by the kid in the token header.
+    header = jwt.get_unverified_header(token)
+    key = key_ring.verification_key(header.get("kid"), header.get("alg"))
+    if key is None:
+        raise JWTError("Unknown signing key")
+    return key
 
 # Function to create a JWT access token.
 # It takes a dictionary of data and an optional expiration time in hours.
@@ -22,17 +55,34 @@ def create_access_token(data: dict, user_rol: str = None, expires_delta: timedel
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     if user_rol:
         to_encode["rol"] = user_rol
+    signing_key = key_ring.signing_key()
     encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM
+        to_encode,
+        signing_key.signing_key,
+        algorithm=signing_key.algorithm,
+        headers={"kid": signing_key.kid}
     )
     return encoded_jwt
 
+# A token that is just issued or widely shared is often checked by many
+# requests at once; they verify its signature once. Callers share the
+# returned dict and must not modify it.
+_decode_flight = single_flight("decode_access_token")
+
 def decode_access_token(token: str):
+    return _decode_flight.do(token, lambda: _decode_access_token(token))
+
+def _decode_access_token(token: str):
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        key = _verification_key(token)
+        payload = jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+        # Action tokens (with a "type") are tracked in their own tables;
+        # only access tokens go through the revocation check.
+        if "type" not in payload and revocation_state.is_revoked(payload):
+            return {"valid": False, "error": "Token revoked"}
         return {"valid": True, "payload": payload}
     except ExpiredSignatureError:
         return {"valid": False, "error": "Token expired"}
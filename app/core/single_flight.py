@@ -0,0 +1,84 @@
+import threading
+
+from app.core.config import settings
+from app.core.metrics import single_flight_calls_total
+
+# Request coalescing: concurrent calls for the same key share one execution.
+# The first caller (the leader) runs the function; callers arriving while it
+# runs wait for its result instead of repeating the work. Nothing is kept once
+# the call finishes, so unlike a cache this never serves an older result than
+# one that was already being computed when the caller arrived.
+
+
+class _Call:
+    __slots__ = ("done", "ok", "value")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.value = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key. Followers wait at most `timeout`
+    seconds; after that, or if the leader raised, they run the function
+    themselves. Every call is counted in single_flight_calls_total under
+    `name` as leader, coalesced, timeout or fallback.
+    """
+
+    def __init__(self, name: str, timeout: float = 5, enabled: bool = True):
+        self.name = name
+        self.timeout = timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Return fn(), or the result of an identical call already in flight."""
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            single_flight_calls_total.inc(self.name, "leader")
+            try:
+                call.value = fn()
+                call.ok = True
+                return call.value
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            single_flight_calls_total.inc(self.name, "timeout")
+            return fn()
+        if not call.ok:
+            single_flight_calls_total.inc(self.name, "fallback")
+            return fn()
+        single_flight_calls_total.inc(self.name, "coalesced")
+        return call.value
+
+    def forget(self, key=None):
+        """
+        Stop new callers from joining the call in flight for `key` (every
+        key if None), e.g. after a write that call may not have seen.
+        """
+        with self._lock:
+            if key is None:
+                self._calls.clear()
+            else:
+                self._calls.pop(key, None)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+def single_flight(name: str) -> SingleFlight:
+    return SingleFlight(name, timeout=settings.SINGLE_FLIGHT_TIMEOUT_SECONDS, enabled=settings.SINGLE_FLIGHT_ENABLED)
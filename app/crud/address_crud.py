@@ -1,11 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from app.core.single_flight import single_flight
+from app.db.returning import delete_returning, update_returning
+from app.db.shared_reads import coalesced_read
+from app.db.unit_of_work import on_commit
 from app.models.address_model import Address
 
+# Concurrent reads of the same page of addresses share one query. Any address
+# write makes later reads start a fresh query instead of joining one in flight.
+addresses_by_user_flight = single_flight("get_addresses_by_user_id")
+
 def create_address(db: Session, address):
     try:
         db.add(address)
-        db.commit()
-        db.refresh(address)
+        db.flush()
+        on_commit(db, addresses_by_user_flight.forget)
         return address
     except Exception:
         db.rollback()
@@ -18,33 +27,58 @@ def get_address_by_id(db: Session, address_id):
         db.rollback()
         raise
 
-def get_addresses_by_user_id(db: Session, user_id):
+def get_addresses_by_user_id(db: Session, user_id, limit: int = None, after_id: int = None):
+    try:
+        def load():
+            # Ordered by id and served by the (user_id, id) index; `after_id` continues a page.
+            query = db.query(Address).filter(Address.user_id == user_id)
+            if after_id is not None:
+                query = query.filter(Address.id > after_id)
+            return query.order_by(Address.id).limit(limit).all()
+        return coalesced_read(
+            db, addresses_by_user_flight, Address, (user_id, limit, after_id), load, many=True
+        )
+    except Exception:
+        db.rollback()
+        raise
+
+def get_address_page_with_total(db: Session, user_id, limit: int, after_id: int = None):
+    """
+    One page of a user's addresses plus the user's total number of addresses,
+    both from a single query: count(*) OVER () is evaluated over all the
+    user's rows before the keyset filter and LIMIT apply.
+    """
     try:
-        return db.query(Address).filter(Address.user_id == user_id).all()
+        numbered = (
+            select(Address, func.count().over().label("total"))
+            .where(Address.user_id == user_id)
+            .subquery()
+        )
+        address = aliased(Address, numbered)
+        query = db.query(address, numbered.c.total)
+        if after_id is not None:
+            query = query.filter(numbered.c.id > after_id)
+        rows = query.order_by(numbered.c.id).limit(limit).all()
+        if not rows:
+            # Past the last page there is no row to carry the total.
+            return [], count_addresses_for_user(db, user_id)
+        return [row[0] for row in rows], rows[0][1]
     except Exception:
         db.rollback()
         raise
 
 def update_address_by_id(db: Session, address_id, address_data):
     try:
-        address = get_address_by_id(db, address_id)
-        if address:
-            for key, value in address_data.items():
-                setattr(address, key, value)
-            db.commit()
-            db.refresh(address)
-        return address
+        on_commit(db, addresses_by_user_flight.forget)
+        return update_returning(db, Address, address_id, address_data)
     except Exception:
         db.rollback()
         raise
 
 def delete_address(db: Session, address_id):
     try:
-        address = get_address_by_id(db, address_id)
-        if address:
-            db.delete(address)
-            db.commit()
-        return address
+        on_commit(db, addresses_by_user_flight.forget)
+        return delete_returning(db, Address, address_id)
     except Exception:
         db.rollback()
         raise
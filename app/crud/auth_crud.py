@@ -1,19 +1,30 @@
 from datetime import datetime, timedelta, timezone
 import secrets
-from jose import ExpiredSignatureError, JWTError, jwt
 from sqlalchemy.orm import Session
 
-from app.core.config import settings
-from app.models.auth_model import PasswordRestoreToken, ActionToken
+from app.models.auth_model import PasswordRestoreToken, ActionToken, RevokedToken
 from app.models.user_model import User
 from app.schemas.auth_schema import UserLogin
-from app.core.security import create_access_token, verify_password
+from app.core.known_emails import known_emails
+from app.core.revocation import revocation_state
+from app.core.security import create_access_token, decode_access_token, dummy_verify_password, verify_password
+from app.crud.user_stats_crud import defer_user_stats_delta, user_stats_delta
+from app.db.unit_of_work import before_commit, on_commit
+from app.utils.email_utils import normalize_email
 
 def login(db: Session, user_in: UserLogin):
     try:
-        db_user = db.query(User).filter(User.email == user_in.email).first()
-        if db_user and verify_password(user_in.password, db_user.hashed_password):
-            token = create_access_token({"sub": str(db_user.id)}, db_user.user_rol)
+        email = normalize_email(user_in.email)
+        db_user = None
+        if known_emails.might_exist(email):
+            db_user = db.query(User).filter(User.email_normalized == email, User.deleted_at.is_(None)).first()
+        if db_user is None:
+            # Same bcrypt cost as a wrong password: the response time does not
+            # tell whether the email is registered.
+            dummy_verify_password()
+            return None
+        if verify_password(user_in.password, db_user.hashed_password):
+            token = create_access_token({"sub": str(db_user.id), "ver": db_user.token_version or 0}, db_user.user_rol)
             return {"user": db_user, "access_token": token}
         return None
     except Exception:
@@ -23,14 +34,29 @@ def login(db: Session, user_in: UserLogin):
 def register(db: Session, db_user):
     try:
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        token = create_access_token({"sub": str(db_user.id)}, db_user.user_rol)
+        db.flush()
+        email = db_user.email_normalized
+        # Ahead of the stats delta, which should be the last thing before the commit.
+        before_commit(db, lambda: known_emails.share(email))
+        on_commit(db, lambda: known_emails.add(email))
+        defer_user_stats_delta(db, user_stats_delta(db_user))
+        token = create_access_token({"sub": str(db_user.id), "ver": db_user.token_version or 0}, db_user.user_rol)
         return {"user": db_user, "access_token": token}
     except Exception:
         db.rollback()
         raise
 
+def revoke_token(db: Session, payload: dict):
+    try:
+        expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+        if not db.query(RevokedToken.jti).filter(RevokedToken.jti == payload["jti"]).first():
+            db.add(RevokedToken(jti=payload["jti"], user_id=int(payload["sub"]), expires_at=expires_at))
+            db.flush()
+        on_commit(db, lambda: revocation_state.note_revoked(payload["jti"]))
+    except Exception:
+        db.rollback()
+        raise
+
 def get_valid_action_token(db: Session, token: str, type_: str):
     user_token = db.query(ActionToken).filter(
         ActionToken.token == token,
@@ -41,12 +67,10 @@ def get_valid_action_token(db: Session, token: str, type_: str):
     if not user_token:
         return None
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        if payload.get("type") != type_:
+        result = decode_access_token(token)
+        if not result["valid"] or result["payload"].get("type") != type_:
             return None
         return user_token
-    except (ExpiredSignatureError, JWTError):
-        return None
     except Exception:
         return None
 
@@ -54,7 +78,7 @@ def mark_action_token_used(db: Session, token: str):
     user_token = db.query(ActionToken).filter(ActionToken.token == token).first()
     if user_token:
         user_token.used = True
-        db.commit()
+        db.flush()
 
 def create_action_token(
     db: Session,
@@ -84,8 +108,7 @@ def create_action_token(
             used=False
         )
         db.add(restore_token)
-        db.commit()
-        db.refresh(restore_token)
+        db.flush()
         return restore_token
     else:
         user_token = ActionToken(
@@ -96,6 +119,5 @@ def create_action_token(
             used=False
         )
         db.add(user_token)
-        db.commit()
-        db.refresh(user_token)
+        db.flush()
         return user_token
\ No newline at end of file
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+
+from app.models.email_outbox_model import EmailOutbox
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str):
+    try:
+        email = EmailOutbox(to_email=to_email, subject=subject, body=body)
+        db.add(email)
+        db.flush()
+        return email
+    except Exception:
+        db.rollback()
+        raise
+
+def claim_pending_emails(db: Session, batch_size: int, lease_seconds: float):
+    """
+    Lock up to `batch_size` due emails, skipping rows other workers hold,
+    and push their next_attempt_at forward by `lease_seconds`. Once committed
+    the lease keeps other workers away while this one sends, without holding
+    row locks during SMTP; if this worker dies the rows become due again.
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        emails = (
+            db.query(EmailOutbox)
+            .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for email in emails:
+            email.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        db.flush()
+        return emails
+    except Exception:
+        db.rollback()
+        raise
+
+def mark_email_sent(db: Session, email: EmailOutbox):
+    email.status = "sent"
+    email.attempts += 1
+    email.sent_at = datetime.now(timezone.utc)
+    email.last_error = None
+    db.flush()
+
+def mark_email_failed(db: Session, email: EmailOutbox, error: str, max_attempts: int, retry_base_seconds: float):
+    """
+    Schedule a retry with exponential backoff (retry_base_seconds, x2 per
+    attempt, capped at one day), or dead-letter the email after `max_attempts`.
+    """
+    email.attempts += 1
+    email.last_error = error[:1000]
+    if email.attempts >= max_attempts:
+        email.status = "dead"
+    else:
+        delay = min(retry_base_seconds * 2 ** (email.attempts - 1), 86400)
+        email.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    db.flush()
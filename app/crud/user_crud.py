@@ -1,47 +1,290 @@
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from sqlalchemy import Float, and_, cast, column, delete, func, inspect, literal, literal_column, or_, select, table, update
 from sqlalchemy.orm import Session
-from app.models.user_model import User
+from app.core.known_emails import known_emails
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_state
+from app.crud.user_stats_crud import defer_user_stats_delta, user_stats_delta
+from app.core.single_flight import single_flight
+from app.db.returning import update_returning
+from app.db.shared_reads import coalesced_read
+from app.db.unit_of_work import before_commit, on_commit
+from app.models.address_model import Address
+from app.models.auth_model import ActionToken, PasswordRestoreToken, RevokedToken
+from app.models.user_model import SEARCH_DOCUMENT_SQL, User
+from app.utils.email_utils import normalize_email
 
 def get_users(db: Session, skip: int = 0, limit: int = 10):
     try:
-        return db.query(User).offset(skip).limit(limit).all()
+        return (
+            db.query(User).filter(User.deleted_at.is_(None))
+            .order_by(User.id).offset(skip).limit(limit).all()
+        )
     except Exception as e:
         db.rollback()
         raise
 
+# Concurrent lookups of the same user share one query (see app.db.shared_reads).
+user_by_id_flight = single_flight("get_user_by_id")
+
+def _invalidate_user(user_id: int):
+    principal_cache.invalidate(user_id)
+    # Lookups started from now on must see the write, not join an older query.
+    user_by_id_flight.forget(user_id)
+
 def get_user_by_id(db: Session, user_id: int):
     try:
-        return db.query(User).filter(User.id == user_id).first()
+        def load():
+            # Served from the session's identity map when the user is already loaded.
+            user = db.get(User, user_id)
+            return user if user is not None and user.deleted_at is None else None
+        return coalesced_read(db, user_by_id_flight, User, user_id, load)
     except Exception as e:
         db.rollback()
         raise
 
 def get_user_by_email(db: Session, email: str):
     try:
-        return db.query(User).filter(User.email == email).first()
+        email_normalized = normalize_email(email)
+        # Emails nobody registered are answered without a query.
+        if not known_emails.might_exist(email_normalized):
+            return None
+        return db.query(User).filter(
+            User.email_normalized == email_normalized, User.deleted_at.is_(None)
+        ).first()
     except Exception as e:
         db.rollback()
         raise
 
 def update_user_by_id(db: Session, user_id: int, user_data: dict):
     try:
-        user = get_user_by_id(db, user_id)
+        values = dict(user_data)
+        # UPDATE ... RETURNING bypasses the model's email validator.
+        if "email" in values:
+            values["email_normalized"] = email_normalized = normalize_email(values["email"])
+            before_commit(db, lambda: known_emails.share(email_normalized))
+            on_commit(db, lambda: known_emails.add(email_normalized))
+        # A password change or deactivation revokes every token issued before it.
+        revoke = "hashed_password" in values or values.get("is_active") is False
+        if revoke:
+            values["token_version"] = User.token_version + 1
+            values["token_version_changed_at"] = datetime.now(timezone.utc)
+        # Role and verification changes move the user between stats counters,
+        # so those (rare) updates read the previous values under a row lock.
+        before = None
+        if "user_rol" in values or "is_verified" in values:
+            before = (
+                db.query(User.user_rol, User.is_verified, User.created_at)
+                .filter(User.id == user_id, User.deleted_at.is_(None)).with_for_update().first()
+            )
+        user = update_returning(db, User, user_id, values, where=(User.deleted_at.is_(None),))
         if user:
-            for key, value in user_data.items():
-                setattr(user, key, value)
-            db.commit()
-            db.refresh(user)
+            if before:
+                delta = user_stats_delta(before, -1)
+                delta.update(user_stats_delta(user))
+                defer_user_stats_delta(db, delta)
+            on_commit(db, lambda: _invalidate_user(user_id))
+            if revoke:
+                version = user.token_version
+                on_commit(db, lambda: revocation_state.note_version(user_id, version))
         return user
     except Exception as e:
         db.rollback()
         raise
 
+def _bulk_filter_criteria(filters: dict) -> list:
+    criteria = []
+    for key, value in filters.items():
+        if key == "created_before":
+            criteria.append(User.created_at < value)
+        elif key == "created_after":
+            criteria.append(User.created_at >= value)
+        else:
+            criteria.append(getattr(User, key) == value)
+    return criteria
+
+def bulk_update_users(db: Session, user_data: dict, ids: list = None, filters: dict = None, chunk_size: int = 500) -> list:
+    """
+    Apply the same `user_data` to the users in `ids`, or to every user matching
+    `filters` (column -> value, plus created_before/created_after), with one
+    UPDATE ... WHERE id IN (...) per chunk of `chunk_size` users. Each chunk is
+    first locked with a SELECT that also provides what the stats counters and
+    token revocation need. Returns the ids updated. Flushes only; the caller commits.
+    """
+    try:
+        values = dict(user_data)
+        now = datetime.now(timezone.utc)
+        revoke = values.get("is_active") is False
+        if revoke:
+            values["token_version"] = User.token_version + 1
+            values["token_version_changed_at"] = now
+        stats_fields = {"user_rol", "is_verified"} & values.keys()
+        criteria = _bulk_filter_criteria(filters or {})
+
+        updated, versions, delta = [], {}, Counter()
+        pending = sorted(set(ids)) if ids is not None else None
+        last_id = 0
+        while True:
+            query = db.query(
+                User.id, User.user_rol, User.is_verified, User.created_at, User.token_version
+            ).filter(User.deleted_at.is_(None))
+            if pending is not None:
+                chunk, pending = pending[:chunk_size], pending[chunk_size:]
+                if not chunk:
+                    break
+                query = query.filter(User.id.in_(chunk)).order_by(User.id)
+            else:
+                # Keyset over the filter: rows the patch stops matching are not revisited.
+                query = query.filter(*criteria, User.id > last_id).order_by(User.id).limit(chunk_size)
+            rows = query.with_for_update().all()
+            if not rows:
+                if pending is None:
+                    break
+                continue
+            last_id = rows[-1].id
+            row_ids = [row.id for row in rows]
+            db.execute(
+                update(User).where(User.id.in_(row_ids)).values(**values),
+                execution_options={"synchronize_session": False}
+            )
+            for row in rows:
+                if stats_fields:
+                    delta.update(user_stats_delta(row, -1))
+                    after = SimpleNamespace(**{**row._asdict(), **{key: values[key] for key in stats_fields}})
+                    delta.update(user_stats_delta(after))
+                if revoke:
+                    versions[row.id] = row.token_version + 1
+            updated += row_ids
+
+        defer_user_stats_delta(db, delta)
+
+        def after_commit():
+            for user_id in updated:
+                _invalidate_user(user_id)
+            for user_id, version in versions.items():
+                revocation_state.note_version(user_id, version)
+        if updated:
+            on_commit(db, after_commit)
+        return updated
+    except Exception as e:
+        db.rollback()
+        raise
+
 def delete_user(db: Session, user_id: int):
+    """
+    Soft delete: one UPDATE that hides the user from every read and revokes
+    its tokens. purge_deleted_users removes the row and its data later.
+    """
     try:
-        user = get_user_by_id(db, user_id)
+        now = datetime.now(timezone.utc)
+        user = update_returning(
+            db, User, user_id,
+            {"deleted_at": now, "token_version": User.token_version + 1, "token_version_changed_at": now},
+            where=(User.deleted_at.is_(None),)
+        )
         if user:
-            db.delete(user)
-            db.commit()
+            defer_user_stats_delta(db, user_stats_delta(user, -1))
+            version = user.token_version
+            on_commit(db, lambda: _invalidate_user(user_id))
+            on_commit(db, lambda: revocation_state.note_version(user_id, version))
         return user
     except Exception as e:
         db.rollback()
-        raise
\ No newline at end of file
+        raise
+
+# Rows that belong to a user, deleted before the user row itself.
+USER_OWNED_MODELS = (Address, ActionToken, PasswordRestoreToken, RevokedToken)
+
+def purge_deleted_users(db: Session, deleted_before: datetime, batch_size: int) -> int:
+    """
+    Permanently remove users soft-deleted before `deleted_before`, deleting at
+    most `batch_size` rows per table per call so each transaction stays short
+    however much data a user has. A user row goes once nothing refers to it.
+    Returns the number of rows deleted; 0 means there is nothing left to purge.
+    """
+    try:
+        user_ids = [row.id for row in (
+            db.query(User.id)
+            .filter(User.deleted_at.isnot(None), User.deleted_at <= deleted_before)
+            .order_by(User.deleted_at)
+            .limit(batch_size)
+            # Concurrent purgers take different users.
+            .with_for_update(skip_locked=True)
+        )]
+        if not user_ids:
+            return 0
+        removed = 0
+        finished = True
+        for model in USER_OWNED_MODELS:
+            pk = inspect(model).primary_key[0]
+            owned = select(pk).where(model.user_id.in_(user_ids)).limit(batch_size)
+            count = db.execute(
+                delete(model).where(pk.in_(owned)),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            removed += count
+            if count >= batch_size:
+                finished = False
+        if finished:
+            removed += db.execute(
+                delete(User).where(User.id.in_(user_ids)),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+        return removed
+    except Exception as e:
+        db.rollback()
+        raise
+
+users_fts = table("users_fts", column("rowid"), column("rank"))
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _similarity_rank(term: str, document):
+    # word_similarity is float4; the cursor carries the rank as a double, and
+    # float4 0.4 widened is 0.4000000059604645, so keyset comparisons against
+    # it would skip tied rows. Compare and return the rank as float8.
+    return -cast(func.word_similarity(literal(term), document), Float(53))
+
+def search_users(db: Session, query: str, limit: int = 20, after: tuple = None):
+    """
+    Ranked search over name, nickname and email. Returns (user, rank) pairs,
+    best match first; a lower rank is a better match. `after` is the
+    (rank, id) of the last row of the previous page (keyset continuation).
+    """
+    try:
+        dialect = db.get_bind().dialect.name
+        term = query.strip().lower()
+        if dialect == "sqlite":
+            # FTS5 prefix match on every word of the query; bm25 rank, lower is better.
+            words = re.findall(r"\w+", term)
+            if not words:
+                return []
+            match = " ".join('"%s"*' % word for word in words)
+            rank = users_fts.c.rank
+            statement = (
+                db.query(User, rank)
+                .join(users_fts, users_fts.c.rowid == User.id)
+                .filter(literal_column("users_fts").op("MATCH")(match), User.deleted_at.is_(None))
+            )
+        else:
+            document = literal_column(SEARCH_DOCUMENT_SQL)
+            pattern = f"%{_escape_like(term)}%"
+            if dialect == "postgresql":
+                # Substring or fuzzy word match, both served by the trigram GIN index.
+                rank = _similarity_rank(term, document)
+                condition = or_(document.like(pattern, escape="\\"), literal(term).op("<%")(document))
+            else:
+                rank = literal(0.0)
+                condition = document.like(pattern, escape="\\")
+            statement = db.query(User, rank).filter(condition, User.deleted_at.is_(None))
+        if after is not None:
+            last_rank, last_id = after
+            statement = statement.filter(or_(rank > last_rank, and_(rank == last_rank, User.id > last_id)))
+        return statement.order_by(rank, User.id).limit(limit).all()
+    except Exception as e:
+        db.rollback()
+        raise
@@ -0,0 +1,118 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+
+from sqlalchemy import and_, delete, event, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.db.unit_of_work import before_commit
+from app.models.user_model import User
+from app.models.user_stats_model import UserStat
+
+def _signup_day(created_at) -> str:
+    if created_at is None:
+        return datetime.now(timezone.utc).date().isoformat()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date().isoformat()
+
+def user_stats_delta(user, sign: int = 1) -> Counter:
+    """The counters a user contributes to, as {(dimension, bucket): sign}."""
+    delta = Counter({("role", user.user_rol or ""): sign, ("signup_day", _signup_day(user.created_at)): sign})
+    if user.is_verified:
+        delta[("verified", "")] += sign
+    return delta
+
+def apply_user_stats_delta(db: Session, delta: Counter):
+    """Add `delta` to the counters with one upsert. Flushes only; the caller commits."""
+    try:
+        # Keys in a fixed order so concurrent transactions lock rows in the same order.
+        rows = [
+            {"dimension": dimension, "bucket": bucket, "count": amount}
+            for (dimension, bucket), amount in sorted(delta.items()) if amount
+        ]
+        if not rows:
+            return
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(UserStat).values(rows)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[UserStat.dimension, UserStat.bucket],
+                set_={"count": UserStat.count + statement.excluded["count"]}
+            ))
+            return
+        for row in rows:
+            updated = db.execute(
+                update(UserStat)
+                .where(UserStat.dimension == row["dimension"], UserStat.bucket == row["bucket"])
+                .values(count=UserStat.count + row["count"])
+            )
+            if not updated.rowcount:
+                db.add(UserStat(**row))
+        db.flush()
+    except Exception:
+        db.rollback()
+        raise
+
+def defer_user_stats_delta(db: Session, delta: Counter):
+    """
+    Add `delta` to the counters as the last statement before the transaction
+    commits. Every registration hits the same rows (its role, today's signup
+    day), so the upsert's row locks must not be held for the whole workflow.
+    Deltas deferred in one transaction are applied as a single upsert.
+    """
+    pending = db.info.get("user_stats_delta")
+    if pending is None:
+        pending = db.info["user_stats_delta"] = Counter()
+        before_commit(db, lambda: apply_user_stats_delta(db, db.info.pop("user_stats_delta", Counter())))
+    pending.update(delta)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deferred_delta(session):
+    session.info.pop("user_stats_delta", None)
+
+def get_user_stats(db: Session, since: date) -> list:
+    """Every role and verified counter, plus signup days from `since` onwards."""
+    try:
+        return db.query(UserStat).filter(or_(
+            UserStat.dimension != "signup_day",
+            and_(UserStat.dimension == "signup_day", UserStat.bucket >= since.isoformat())
+        )).all()
+    except Exception:
+        db.rollback()
+        raise
+
+def rebuild_user_stats(db: Session) -> dict:
+    """
+    Recompute every counter from the users table and replace the stored ones.
+    Returns the drift that was repaired as {(dimension, bucket): (stored, actual)}.
+    Flushes only; the caller commits.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # Writers wait until the rebuild commits; their increments then apply
+            # on top of a count that did not include their (uncommitted) rows.
+            db.execute(text("LOCK TABLE user_stats IN EXCLUSIVE MODE"))
+        stored = {(row.dimension, row.bucket): row.count for row in db.query(UserStat)}
+        actual = Counter()
+        users = select(User.user_rol, User.is_verified, User.created_at).where(User.deleted_at.is_(None))
+        for user in db.execute(users.execution_options(yield_per=1000)):
+            actual.update(user_stats_delta(user))
+        db.execute(delete(UserStat))
+        if actual:
+            db.execute(UserStat.__table__.insert(), [
+                {"dimension": dimension, "bucket": bucket, "count": count}
+                for (dimension, bucket), count in sorted(actual.items()) if count
+            ])
+        db.flush()
+        return {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in stored.keys() | actual.keys()
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+    except Exception:
+        db.rollback()
+        raise
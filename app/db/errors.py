@@ -0,0 +1,14 @@
+from sqlalchemy.exc import IntegrityError
+
+# Writes rely on unique constraints instead of checking with a SELECT first;
+# this tells which constraint a failed write ran into.
+
+def is_unique_violation(error: IntegrityError, column: str) -> bool:
+    # Postgres reports SQLSTATE 23505 and names the key, e.g.
+    # 'duplicate key value violates unique constraint "users_email_key"';
+    # SQLite reports "UNIQUE constraint failed: users.email".
+    sqlstate = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    if sqlstate is not None and sqlstate != "23505":
+        return False
+    message = str(error.orig).lower()
+    return column in message and ("unique" in message or "duplicate" in message)
@@ -1,7 +1,11 @@
+-- Extensión para la búsqueda de usuarios por trigramas
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Tabla de usuarios
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
-    email VARCHAR NOT NULL UNIQUE,
+    email VARCHAR NOT NULL,
+    email_normalized VARCHAR NOT NULL,
     hashed_password VARCHAR NOT NULL,
     nickname VARCHAR,
     firstname VARCHAR NOT NULL,
@@ -17,7 +21,10 @@ CREATE TABLE users (
     stripe_customer_id VARCHAR,
     google_id VARCHAR,
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ
+    updated_at TIMESTAMPTZ,
+    token_version INTEGER NOT NULL DEFAULT 0,
+    token_version_changed_at TIMESTAMPTZ,
+    deleted_at TIMESTAMPTZ
 );
 
 -- Tabla de direcciones (relación con usuarios)
@@ -55,17 +62,62 @@ CREATE TABLE password_restore_tokens (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Tokens de acceso revocados explícitamente (logout)
+CREATE TABLE revoked_tokens (
+    jti VARCHAR PRIMARY KEY,
+    user_id INTEGER,
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Contadores de GET /users/stats (se reconstruyen con python -m app.utils.user_stats)
+CREATE TABLE user_stats (
+    dimension VARCHAR NOT NULL,
+    bucket VARCHAR NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- Bandeja de salida de correos (la envía el worker de app.utils.email_outbox)
+CREATE TABLE email_outbox (
+    id SERIAL PRIMARY KEY,
+    to_email VARCHAR NOT NULL,
+    subject VARCHAR NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error VARCHAR,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+
 -- Índices para mejorar rendimiento
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_google_id ON users(google_id);
-CREATE INDEX idx_addresses_user_id ON addresses(user_id);
+CREATE INDEX ix_addresses_user_id_id ON addresses(user_id, id);
 CREATE INDEX idx_action_tokens_user_id ON action_tokens(user_id);
 CREATE INDEX idx_action_tokens_token ON action_tokens(token);
 CREATE INDEX idx_password_restore_tokens_user_id ON password_restore_tokens(user_id);
 CREATE INDEX idx_password_restore_tokens_token ON password_restore_tokens(token);
+CREATE INDEX idx_users_token_version_changed_at ON users(token_version_changed_at);
+CREATE INDEX ix_users_created_at ON users(created_at);
+CREATE INDEX ix_users_updated_at ON users(updated_at);
+CREATE INDEX ix_users_live_id ON users(id) WHERE deleted_at IS NULL;
+CREATE UNIQUE INDEX ux_users_email_live ON users(email) WHERE deleted_at IS NULL;
+CREATE UNIQUE INDEX ux_users_email_normalized_live ON users(email_normalized) WHERE deleted_at IS NULL;
+CREATE INDEX ix_users_deleted_at ON users(deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+CREATE INDEX ix_email_outbox_due ON email_outbox(next_attempt_at) WHERE status = 'pending';
+CREATE INDEX ix_users_search_trgm ON users
+    USING gin ((lower(firstname || ' ' || lastname || ' ' || coalesce(nickname, '') || ' ' || email)) gin_trgm_ops);
 
 -- Comentarios para documentación
 COMMENT ON TABLE users IS 'Tabla principal de usuarios del sistema';
 COMMENT ON TABLE addresses IS 'Direcciones de los usuarios (máximo 5 por usuario según configuración)';
 COMMENT ON TABLE action_tokens IS 'Tokens para acciones como verificación de email';
 COMMENT ON TABLE password_restore_tokens IS 'Tokens para restauración de contraseñas';
+COMMENT ON TABLE revoked_tokens IS 'Tokens de acceso revocados antes de su expiración';
+COMMENT ON TABLE email_outbox IS 'Correos pendientes de envío, con reintentos y dead-letter';
+COMMENT ON TABLE user_stats IS 'Contadores agregados de usuarios mantenidos de forma incremental';
@@ -0,0 +1,13 @@
+-- Revocación de tokens de acceso: versión de token por usuario y tokens revocados.
+ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN token_version_changed_at TIMESTAMPTZ;
+CREATE INDEX idx_users_token_version_changed_at ON users(token_version_changed_at);
+
+CREATE TABLE revoked_tokens (
+    jti VARCHAR PRIMARY KEY,
+    user_id INTEGER,
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
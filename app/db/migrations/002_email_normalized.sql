@@ -0,0 +1,34 @@
+-- Identidad de email sin distinción de mayúsculas: columna normalizada (trim + minúsculas)
+-- con índice único. Las búsquedas por email usan esta columna.
+-- Se ejecuta en una transacción: si hay colisiones no se aplica ningún cambio.
+BEGIN;
+
+ALTER TABLE users ADD COLUMN email_normalized VARCHAR;
+
+UPDATE users SET email_normalized = lower(trim(email)) WHERE email_normalized IS NULL;
+
+-- Cuentas que colisionan tras normalizar (p. ej. User@x.com y user@x.com). Deben
+-- fusionarse o renombrarse a mano antes de crear el índice único; para listarlas:
+--   SELECT email_normalized, array_agg(id ORDER BY id) AS user_ids, array_agg(email ORDER BY id) AS emails
+--   FROM users GROUP BY email_normalized HAVING count(*) > 1;
+DO $$
+DECLARE
+    collisions TEXT;
+BEGIN
+    SELECT string_agg(email_normalized || ' (ids ' || ids || ')', ', ')
+    INTO collisions
+    FROM (
+        SELECT email_normalized, string_agg(id::TEXT, ', ' ORDER BY id) AS ids
+        FROM users
+        GROUP BY email_normalized
+        HAVING count(*) > 1
+    ) duplicated;
+    IF collisions IS NOT NULL THEN
+        RAISE EXCEPTION 'Emails that collide after normalization: %', collisions;
+    END IF;
+END $$;
+
+ALTER TABLE users ALTER COLUMN email_normalized SET NOT NULL;
+CREATE UNIQUE INDEX ix_users_email_normalized ON users(email_normalized);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Bandeja de salida de correos: se escriben en la misma transacción que el cambio
+-- que los origina y los envía el worker (python -m app.utils.email_outbox).
+CREATE TABLE email_outbox (
+    id SERIAL PRIMARY KEY,
+    to_email VARCHAR NOT NULL,
+    subject VARCHAR NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error VARCHAR,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ
+);
+CREATE INDEX ix_email_outbox_due ON email_outbox(next_attempt_at) WHERE status = 'pending';
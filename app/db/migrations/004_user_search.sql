@@ -0,0 +1,8 @@
+-- Búsqueda de usuarios (GET /users/search): índice GIN de trigramas sobre un único
+-- documento en minúsculas con nombre, apellido, nickname y email. La expresión debe
+-- coincidir exactamente con SEARCH_DOCUMENT_SQL en app/models/user_model.py.
+-- CONCURRENTLY evita bloquear escrituras en users; no puede ir dentro de una transacción.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_search_trgm ON users
+    USING gin ((lower(firstname || ' ' || lastname || ' ' || coalesce(nickname, '') || ' ' || email)) gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- Paginación de GET /addresses/user/{user_id}: índice compuesto (user_id, id) que sirve
+-- el filtro por usuario y el orden por id sin ordenar en memoria. Reemplaza al índice
+-- simple sobre user_id, que queda cubierto por el compuesto.
+-- CONCURRENTLY evita bloquear escrituras en addresses; no puede ir dentro de una transacción.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_addresses_user_id_id ON addresses(user_id, id);
+DROP INDEX CONCURRENTLY IF EXISTS idx_addresses_user_id;
@@ -0,0 +1,26 @@
+-- Contadores de GET /users/stats, mantenidos de forma incremental en cada alta,
+-- verificación, cambio de rol y baja. Una fila por (dimensión, bucket):
+--   role / <user_rol>, verified / '' y signup_day / 'YYYY-MM-DD' (UTC).
+-- La carga inicial equivale a python -m app.utils.user_stats, que también
+-- sirve para reparar desajustes más adelante.
+BEGIN;
+
+CREATE TABLE user_stats (
+    dimension VARCHAR NOT NULL,
+    bucket VARCHAR NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- Bloquea las escrituras en users durante la carga para no perder altas concurrentes.
+LOCK TABLE users IN SHARE MODE;
+
+INSERT INTO user_stats (dimension, bucket, count)
+SELECT 'role', coalesce(user_rol, ''), count(*) FROM users GROUP BY coalesce(user_rol, '')
+UNION ALL
+SELECT 'verified', '', count(*) FROM users WHERE is_verified HAVING count(*) > 0
+UNION ALL
+SELECT 'signup_day', to_char(coalesce(created_at, now()) AT TIME ZONE 'UTC', 'YYYY-MM-DD'), count(*)
+FROM users GROUP BY 2;
+
+COMMIT;
@@ -0,0 +1,9 @@
+-- Borrado lógico de usuarios: DELETE /users/{id} solo marca deleted_at y el purgador
+-- (python -m app.utils.user_purge) elimina después, por lotes, direcciones, tokens y
+-- la fila del usuario. Ambos índices son parciales: uno para leer usuarios vivos y
+-- otro, pequeño, con la cola de usuarios pendientes de purgar.
+-- CONCURRENTLY evita bloquear escrituras en users; no puede ir dentro de una transacción.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_live_id ON users(id) WHERE deleted_at IS NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_deleted_at ON users(deleted_at) WHERE deleted_at IS NOT NULL;
@@ -0,0 +1,7 @@
+-- El filtro de emails conocidos (app.core.known_emails) relee cada pocos segundos los
+-- usuarios creados o actualizados desde la última lectura, para enterarse de los
+-- registros y cambios de email hechos por otros procesos; sin índices, esas consultas
+-- recorrerían toda la tabla.
+-- CONCURRENTLY evita bloquear escrituras en users; no puede ir dentro de una transacción.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at ON users(created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_updated_at ON users(updated_at);
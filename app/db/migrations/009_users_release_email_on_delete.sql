@@ -0,0 +1,12 @@
+-- Un usuario borrado (deleted_at) libera su email al momento, sin esperar al purgador:
+-- la unicidad de email y email_normalized pasa a aplicarse solo a usuarios vivos.
+-- Los índices parciales se crean antes de quitar los antiguos, así nunca hay un
+-- intervalo sin unicidad. CONCURRENTLY no puede ir dentro de una transacción.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_users_email_live ON users(email) WHERE deleted_at IS NULL;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_users_email_normalized_live ON users(email_normalized) WHERE deleted_at IS NULL;
+
+-- Restricciones de init_db.sql y de la migración 002, e índices únicos creados por la aplicación.
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_email_key;
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_email_normalized_key;
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_normalized;
+DROP INDEX CONCURRENTLY IF EXISTS ix_users_email;
@@ -0,0 +1,51 @@
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+# Single-statement writes by primary key. Where the database supports
+# RETURNING (Postgres, SQLite >= 3.35) an update or delete is one statement
+# that also hands back the row, instead of a SELECT to load it, the write and
+# a SELECT to refresh it. Other backends fall back to loading the object and
+# flushing through the ORM. Inserts need no helper: flushing a new object
+# already uses INSERT ... RETURNING for its primary key and server defaults.
+
+def supports_returning(db: Session, statement: str) -> bool:
+    # statement is "insert", "update" or "delete".
+    return getattr(db.get_bind().dialect, f"{statement}_returning", False)
+
+def update_returning(db: Session, model, pk, values: dict, where=()):
+    """
+    UPDATE the row of `model` with primary key `pk` and return it as an ORM
+    object, or None if there is no such row (or it does not match the extra
+    `where` criteria). Values may be SQL expressions (e.g. `Model.counter + 1`).
+    """
+    if not values:
+        return db.query(model).filter(model.id == pk, *where).first()
+    if supports_returning(db, "update"):
+        statement = update(model).where(model.id == pk, *where).values(**values).returning(model)
+        # populate_existing refreshes the object if this session already holds it.
+        return db.scalars(
+            statement,
+            execution_options={"synchronize_session": False, "populate_existing": True}
+        ).first()
+    obj = db.query(model).filter(model.id == pk, *where).first()
+    if obj is not None:
+        for key, value in values.items():
+            setattr(obj, key, value)
+        db.flush()
+    return obj
+
+def delete_returning(db: Session, model, pk):
+    """
+    DELETE the row of `model` with primary key `pk` and return its last
+    state as a detached ORM object, or None if there was no such row.
+    """
+    if supports_returning(db, "delete"):
+        obj = db.scalars(delete(model).where(model.id == pk).returning(model)).first()
+    else:
+        obj = db.get(model, pk)
+        if obj is not None:
+            db.delete(obj)
+            db.flush()
+    if obj is not None and obj in db:
+        db.expunge(obj)
+    return obj
@@ -1,7 +1,88 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.known_emails import known_emails
+from app.core.metrics import instrument_engine
+from app.core.query_stats import instrument_query_stats
+
+def background_connections() -> int:
+    """
+    Connections each worker process gives its background threads (outbox
+    sender, user purger, known-emails refresher), one per thread: each holds
+    at most one connection at a time.
+    """
+    return sum((
+        settings.EMAIL_OUTBOX_WORKER_ENABLED,
+        settings.USER_PURGE_WORKER_ENABLED,
+        known_emails.enabled,
+    ))
+
+def pool_options(database_url: str, workers: int, max_connections: int, background: int = 0) -> dict:
+    """
+    Request pool sizing for one process: the DB_MAX_CONNECTIONS budget split
+    evenly across the WEB_CONCURRENCY worker processes, so N workers together
+    never open more connections than the database allows. `background`
+    connections of each share go to the background pool (see
+    background_pool_options); a quarter of the rest is overflow, only opened
+    under bursts. Raises ValueError when the budget cannot give every worker
+    those plus one connection for requests.
+    """
+    if database_url.startswith("sqlite"):
+        return {}
+    workers = max(1, workers)
+    per_worker = max_connections // workers
+    if per_worker < background + 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} is too small for {workers} workers: "
+            f"each needs {background + 1} connections ({background} for its background threads "
+            f"and 1 for requests), {workers * (background + 1)} in total."
+        )
+    for_requests = per_worker - background
+    max_overflow = for_requests // 4
+    return {
+        "pool_size": for_requests - max_overflow,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+def background_pool_options(database_url: str, background: int) -> dict:
+    """
+    Sizing of the pool the background threads use, apart from the request
+    pool, so a burst of requests never makes them wait for a connection.
+    """
+    if database_url.startswith("sqlite"):
+        return {}
+    return {"pool_size": background, "max_overflow": 0, "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS}
 
 #Allows to create a new session for each request
-engine = create_engine(settings.db_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+engine = create_engine(
+    settings.db_url,
+    **pool_options(settings.db_url, settings.WEB_CONCURRENCY, settings.DB_MAX_CONNECTIONS, background_connections())
+)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+if settings.QUERY_STATS_ENABLED:
+    instrument_query_stats(engine, settings.SLOW_QUERY_THRESHOLD_MS)
+# Background threads get their own pool. SQLite has no connection budget, and
+# an in-memory database is only visible through one engine, so they share it.
+background_engine = engine
+if background_connections() and not settings.db_url.startswith("sqlite"):
+    background_engine = create_engine(
+        settings.db_url, **background_pool_options(settings.db_url, background_connections())
+    )
+# uvicorn spawns its workers, so each one imports this module and builds its
+# own engines. A server that forks after import (e.g. gunicorn --preload) would
+# share the parent's pooled connections; the child drops them and opens its own.
+def _drop_inherited_connections():
+    engine.dispose(close=False)
+    background_engine.dispose(close=False)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_drop_inherited_connections)
+# Routes commit once at the end of a workflow and then serialize what they just
+# wrote, so objects are not expired (and re-selected) on commit.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+# For the background threads (outbox, purge, known emails), bound to their pool.
+BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=background_engine)
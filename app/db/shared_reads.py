@@ -0,0 +1,47 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.single_flight import SingleFlight
+
+# Coalesced ORM reads. ORM objects belong to the session that loaded them, so
+# what callers share is a snapshot of the column values; each follower gets
+# its own copy merged into its session without another query. The leader
+# keeps the objects it loaded.
+
+def _snapshot(obj):
+    if obj is None:
+        return None
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+def _attach(db: Session, model, values):
+    if values is None:
+        return None
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return db.merge(obj, load=False)
+
+def can_share(db: Session) -> bool:
+    # A session with its own pending writes must see them: it reads alone.
+    return not (db.new or db.dirty or db.deleted or db.info.get("on_commit"))
+
+def coalesced_read(db: Session, flight: SingleFlight, model, key, load, many: bool = False):
+    """
+    Run `load()` (a query in `db` returning a `model` object, None, or a list
+    of them if `many`) through `flight`, so concurrent reads with the same
+    `key` issue a single query.
+    """
+    if not can_share(db):
+        return load()
+    own = []
+
+    def leader():
+        result = load()
+        own.append(result)
+        return [_snapshot(obj) for obj in result] if many else _snapshot(result)
+
+    shared = flight.do(key, leader)
+    if own:
+        return own[0]
+    if many:
+        return [_attach(db, model, values) for values in shared]
+    return _attach(db, model, shared)
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Unit of work: CRUD helpers only flush, and the caller (a route) owns the
+# transaction and commits once per workflow through `transaction(db)`.
+# Side effects that must only happen once the data is durable, such as cache
+# invalidation, are registered with `on_commit`; a rollback discards them.
+# Writes to hot rows that every transaction touches (counters) can be left to
+# `before_commit`, so their row locks are held only for the commit itself.
+
+@contextmanager
+def transaction(db: Session):
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def on_commit(db: Session, callback):
+    db.info.setdefault("on_commit", []).append(callback)
+
+def before_commit(db: Session, callback):
+    db.info.setdefault("before_commit", []).append(callback)
+
+@event.listens_for(Session, "before_commit")
+def _run_before_commit_callbacks(session):
+    for callback in session.info.pop("before_commit", []):
+        callback()
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit_callbacks(session):
+    for callback in session.info.pop("on_commit", []):
+        callback()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_commit_callbacks(session):
+    session.info.pop("on_commit", None)
+    session.info.pop("before_commit", None)
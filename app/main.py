@@ -1,12 +1,25 @@
+from contextlib import asynccontextmanager
 from datetime import time
 from sqlite3 import OperationalError
 from fastapi import FastAPI
 from app.api.auth_routes import router as auth_router
 from app.api.user_routes import router as user_router
 from app.api.address_routes import router as address_router
+from app.api.metrics_routes import router as metrics_router
+from app.api.well_known_routes import router as well_known_router
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.idempotency import IdempotencyMiddleware, idempotency_store
+from app.core.known_emails import KnownEmailsRefresher, known_emails
+from app.core.metrics import MetricsMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.rate_limit import RateLimitMiddleware, rate_limit_store
+from app.core.responses import FastJSONResponse
+from app.utils.email_outbox import OutboxWorker
+from app.utils.user_purge import UserPurgeWorker
 
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import background_engine, engine
 
 for _ in range(10):
     try:
@@ -17,12 +30,51 @@ for _ in range(10):
         time.sleep(2)
 else:
     raise RuntimeError("No se pudo conectar a la base de datos después de varios intentos.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sends the emails the routes queue in the outbox. Disable it when the
+    # worker runs as its own process (python -m app.utils.email_outbox).
+    # The purger removes soft-deleted users; same opt-out for its own process
+    # (python -m app.utils.user_purge). The known-emails filter is per process,
+    # so its refresher always runs here.
+    workers = []
+    if settings.EMAIL_OUTBOX_WORKER_ENABLED:
+        workers.append(OutboxWorker())
+    if settings.USER_PURGE_WORKER_ENABLED:
+        workers.append(UserPurgeWorker())
+    if known_emails.enabled:
+        workers.append(KnownEmailsRefresher())
+    for worker in workers:
+        worker.start()
+    yield
+    for worker in workers:
+        worker.stop(timeout=10)
+    # In-flight requests have finished by now; close this process's connections.
+    engine.dispose()
+    background_engine.dispose()
+
 app = FastAPI(
     title="Ghosts: Auth User - API",
     description="API for user authentication and users with addresses.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+app.add_middleware(RateLimitMiddleware, store=rate_limit_store, enabled=settings.RATE_LIMIT_ENABLED)
+# Outside the rate limiter: a replayed retry costs no rate-limit tokens.
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store, enabled=settings.IDEMPOTENCY_ENABLED)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+if settings.METRICS_ENABLED:
+    # Added last so it is the outermost middleware and also sees rate-limited requests.
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router, tags=["Metrics"])
+
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 app.include_router(user_router, prefix="/users", tags=["Users"])
-app.include_router(address_router, prefix="/addresses", tags=["Addresses"])
\ No newline at end of file
+app.include_router(address_router, prefix="/addresses", tags=["Addresses"])
+app.include_router(well_known_router, prefix="/.well-known", tags=["Auth"])
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -7,6 +7,8 @@ from app.db.base import Base
 
 class Address(Base):
     __tablename__ = "addresses"
+    # Serves "addresses of a user ordered by id" (keyset pagination) from the index alone.
+    __table_args__ = (Index("ix_addresses_user_id_id", "user_id", "id"),)
 
     # Define the columns for the addresses table in the database
     id = Column(Integer, primary_key=True, index=True)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import DDL, Column, Index, Integer, String, Boolean, DateTime, event, text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from app.db.base import Base
+from app.utils.email_utils import normalize_email
 
 # Define the User class that maps to the users table in the database
 class User(Base):
@@ -10,7 +11,11 @@ class User(Base):
 
     # Define the columns for the users table in the database
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    # Unique among live users only (see __table_args__): deleting a user
+    # releases its email right away, before the purger removes the row.
+    email = Column(String, nullable=False)
+    # Set from `email` on every ORM write; lookups and uniqueness go through it.
+    email_normalized = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     nickname = Column(String, nullable=True, unique=False)
     firstname = Column(String, nullable=False)
@@ -19,13 +24,81 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     user_rol = Column(String, default="customer")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Both indexed for known_emails, which re-reads recently created and updated users.
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     address = Column(String, nullable=True)
     birthdate = Column(String, nullable=True)
     gender = Column(String, nullable=True)
     avatar_url = Column(String, nullable=True)
     stripe_customer_id = Column(String, nullable=True, unique=True)
     google_id = Column(String, unique=True, nullable=True)
+    # Embedded in access tokens; bumping it revokes every token issued before.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    token_version_changed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Set by DELETE /users/{id}; the purger (app.utils.user_purge) removes the
+    # row and its data later. Reads in user_crud skip soft-deleted users.
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
-    addresses = relationship("Address", back_populates="user")
\ No newline at end of file
+    addresses = relationship("Address", back_populates="user")
+
+    __table_args__ = (
+        Index(
+            "ux_users_email_live", "email", unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL")
+        ),
+        Index(
+            "ux_users_email_normalized_live", "email_normalized", unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL")
+        ),
+        # Listing live users in id order, without the soft-deleted ones.
+        Index(
+            "ix_users_live_id", "id",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL")
+        ),
+        # The purger's queue: only soft-deleted users are indexed.
+        Index(
+            "ix_users_deleted_at", "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL")
+        ),
+    )
+
+    @validates("email")
+    def _normalize_email(self, key, value):
+        self.email_normalized = normalize_email(value) if value is not None else None
+        return value
+
+
+# Search index for GET /users/search (see user_crud.search_users).
+# Postgres: trigram GIN index over one lower-cased document built from the
+# searchable columns; queries must use the exact same expression.
+SEARCH_DOCUMENT_SQL = "lower(firstname || ' ' || lastname || ' ' || coalesce(nickname, '') || ' ' || email)"
+
+for statement in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)",
+):
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# SQLite: FTS5 table over the same columns, kept in sync by triggers.
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "firstname, lastname, nickname, email, content='users', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, firstname, lastname, nickname, email) "
+    "VALUES (new.id, new.firstname, new.lastname, new.nickname, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, firstname, lastname, nickname, email) "
+    "VALUES ('delete', old.id, old.firstname, old.lastname, old.nickname, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF firstname, lastname, nickname, email ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, firstname, lastname, nickname, email) "
+    "VALUES ('delete', old.id, old.firstname, old.lastname, old.nickname, old.email); "
+    "INSERT INTO users_fts(rowid, firstname, lastname, nickname, email) "
+    "VALUES (new.id, new.firstname, new.lastname, new.nickname, new.email); END",
+):
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(User.__table__, "before_drop", DDL("DROP TABLE IF EXISTS users_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.base import Base
+
+# Running counters behind GET /users/stats, kept up to date by user_crud and
+# auth_crud in the same transaction as the change they count. One row per
+# (dimension, bucket):
+#   role        / <user_rol>    users with that role (their sum is the total)
+#   verified    / ""            users with a verified email
+#   signup_day  / "YYYY-MM-DD"  users created that day (UTC)
+# `python -m app.utils.user_stats` rebuilds them from the users table.
+class UserStat(Base):
+    __tablename__ = "user_stats"
+
+    dimension = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
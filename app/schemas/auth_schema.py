@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, EmailStr, Field
 
 class UserLogin(BaseModel, extra="forbid"):
@@ -27,5 +29,16 @@ class TokenReset(BaseModel):
 class TokenVerify(BaseModel):
     token: str
 
+class TokenBatchVerify(BaseModel, extra="forbid"):
+    tokens: List[str] = Field(..., min_length=1, max_length=100, examples=[["jwt.token.one", "jwt.token.two"]], description="Access tokens to verify (1-100).")
+
+class TokenVerifyResult(BaseModel):
+    valid: bool = Field(..., examples=[True], description="Whether the token is valid.")
+    payload: Optional[dict] = Field(None, examples=[{"sub": "1", "rol": "customer", "exp": 1767225600}], description="Decoded claims when the token is valid.")
+    error: Optional[str] = Field(None, examples=["Token expired"], description="Reason when the token is invalid.")
+
+class TokenBatchVerifyResponse(BaseModel):
+    results: List[TokenVerifyResult] = Field(..., description="One result per submitted token, in the same order.")
+
 class UndoPasswordChangeRequest(BaseModel):
     token: str
\ No newline at end of file
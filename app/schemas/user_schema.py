@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.schemas.address_schema import AddressOut
 
@@ -43,4 +43,47 @@ class UserOut(BaseModel):
     stripe_customer_id: Optional[str] = Field(None, examples=["cus_N1a2b3c4d5e6f7"], description="Stripe customer ID.")
 
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class UserSearchResult(BaseModel):
+    id: int = Field(..., examples=[1], description="Unique user ID.")
+    email: EmailStr = Field(..., examples=["user@example.com"], description="User's email address.")
+    firstname: str = Field(..., examples=["john"], description="User's first name.")
+    lastname: str = Field(..., examples=["doe"], description="User's last name.")
+    nickname: Optional[str] = Field(None, examples=["ghosty"], description="User's nickname.")
+    user_rol: str = Field(..., examples=["customer"], description="User's role in the system.")
+
+    model_config = ConfigDict(from_attributes=True)
+
+class UserSearchPage(BaseModel):
+    items: List[UserSearchResult] = Field(..., description="Matching users, best match first.")
+    next_cursor: Optional[str] = Field(None, description="Pass as 'cursor' to get the next page; absent on the last page.")
+
+class UserStats(BaseModel):
+    total_users: int = Field(..., examples=[120], description="Number of registered users.")
+    verified_users: int = Field(..., examples=[90], description="Users with a verified email.")
+    verified_ratio: float = Field(..., examples=[0.75], description="verified_users / total_users (0 when there are no users).")
+    users_by_role: Dict[str, int] = Field(..., examples=[{"customer": 118, "admin": 2}], description="Number of users per role.")
+    signups_per_day: Dict[str, int] = Field(..., examples=[{"2024-05-01": 4}], description="Users created per day (UTC), for the requested days that had signups.")
+
+class UserBulkPatch(UserUpdate, extra="forbid"):
+    is_active: Optional[bool] = Field(None, examples=[False], description="Activate or deactivate the users (deactivation revokes their tokens).")
+    is_verified: Optional[bool] = Field(None, examples=[True], description="Mark the users' emails as verified or not.")
+    user_rol: Optional[str] = Field(None, examples=["customer"], description="New role for the users.")
+
+class UserBulkFilter(BaseModel, extra="forbid"):
+    user_rol: Optional[str] = Field(None, examples=["customer"], description="Only users with this role.")
+    is_active: Optional[bool] = Field(None, examples=[True], description="Only active (or inactive) users.")
+    is_verified: Optional[bool] = Field(None, examples=[False], description="Only verified (or unverified) users.")
+    created_before: Optional[datetime] = Field(None, examples=["2024-01-01T00:00:00Z"], description="Only users created before this instant.")
+    created_after: Optional[datetime] = Field(None, examples=["2023-01-01T00:00:00Z"], description="Only users created at or after this instant.")
+
+class UserBulkUpdate(BaseModel, extra="forbid"):
+    ids: Optional[List[int]] = Field(None, max_length=10000, examples=[[1, 2, 3]], description="Users to update. Give either 'ids' or 'filter'.")
+    filter: Optional[UserBulkFilter] = Field(None, description="Update every user matching all the given conditions. Give either 'ids' or 'filter'.")
+    patch: UserBulkPatch = Field(..., description="Fields to set on every selected user.")
+
+class UserBulkUpdateResult(BaseModel):
+    updated: int = Field(..., examples=[3], description="Number of users updated.")
+    not_found: List[int] = Field(default_factory=list, description="Requested ids that do not exist or are deleted (ids mode only).")
+
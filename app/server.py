@@ -0,0 +1,55 @@
+"""
+Production server.
+
+Serves the API with uvicorn and WEB_CONCURRENCY worker processes, so the
+sync handlers use more than one core:
+
+    python -m app.server
+    python -m app.server --workers 4 --port 8000
+
+Each worker is a separate process with its own engine and connection pool,
+sized from DB_MAX_CONNECTIONS / WEB_CONCURRENCY, of which its background
+threads get a pool of their own, one connection each (see app.db.session). On
+SIGTERM or SIGINT the server stops accepting connections, waits up to
+GRACEFUL_SHUTDOWN_SECONDS for in-flight requests, then runs the lifespan
+shutdown of every worker: background workers stop and the pool is closed.
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY,
+                        help="Worker processes (default: WEB_CONCURRENCY).")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    # Fail here, not in every worker, when the connection budget is too small.
+    from app.db.session import background_connections, pool_options
+    try:
+        pool_options(settings.db_url, args.workers, settings.DB_MAX_CONNECTIONS, background_connections())
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    # Workers read their pool share from WEB_CONCURRENCY when they import the app.
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
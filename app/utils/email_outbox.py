@@ -0,0 +1,124 @@
+"""
+Email outbox worker.
+
+Drains the email_outbox table in batches: claims due rows with
+SELECT ... FOR UPDATE SKIP LOCKED, sends them through one reused SMTP
+session and records the outcome, retrying failures with exponential backoff
+and dead-lettering them after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+Runs inside the API process when EMAIL_OUTBOX_WORKER_ENABLED is true, or
+standalone (any number of instances can run side by side):
+
+    python -m app.utils.email_outbox
+    python -m app.utils.email_outbox --once
+"""
+import argparse
+import logging
+import sys
+import threading
+
+from app.core.config import settings
+from app.core.metrics import email_outbox_dead_letters_total
+from app.crud.email_outbox_crud import claim_pending_emails, mark_email_failed, mark_email_sent
+from app.db.unit_of_work import transaction
+from app.utils.email_utils import SMTPSession
+
+logger = logging.getLogger("app.email.outbox")
+
+
+def drain_once(session_factory=None, sender_factory=SMTPSession, batch_size: int = None) -> int:
+    """Claim, send and record one batch. Returns the number of emails processed."""
+    if session_factory is None:
+        from app.db.session import BackgroundSessionLocal
+        session_factory = BackgroundSessionLocal
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    db = session_factory()
+    try:
+        with transaction(db):
+            emails = claim_pending_emails(db, batch_size, settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        if not emails:
+            return 0
+
+        # No transaction is open while talking to the mail server.
+        outcomes = []
+        try:
+            with sender_factory() as sender:
+                for email in emails:
+                    try:
+                        sender.send(email.to_email, email.subject, email.body)
+                        outcomes.append((email, None))
+                    except Exception as e:
+                        outcomes.append((email, e))
+        except Exception as e:
+            # The connection itself failed: the remaining emails were not sent.
+            sent = len(outcomes)
+            outcomes += [(email, e) for email in emails[sent:]]
+
+        with transaction(db):
+            for email, error in outcomes:
+                if error is None:
+                    mark_email_sent(db, email)
+                    continue
+                mark_email_failed(
+                    db, email, f"{type(error).__name__}: {error}",
+                    settings.EMAIL_OUTBOX_MAX_ATTEMPTS, settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS
+                )
+                if email.status == "dead":
+                    email_outbox_dead_letters_total.inc()
+                    logger.error("Email %s to %s dead-lettered after %d attempts: %s",
+                                 email.id, email.to_email, email.attempts, email.last_error)
+        return len(emails)
+    finally:
+        db.close()
+
+
+class OutboxWorker(threading.Thread):
+    """Drains the outbox until stopped, sleeping between polls when it is empty."""
+
+    def __init__(self, poll_seconds: float = None, batch_size: int = None, session_factory=None, sender_factory=SMTPSession):
+        super().__init__(daemon=True, name="email-outbox")
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.EMAIL_OUTBOX_POLL_SECONDS
+        self.session_factory = session_factory
+        self.sender_factory = sender_factory
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                processed = drain_once(self.session_factory, self.sender_factory, self.batch_size)
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                processed = 0
+            # A full batch means there may be more waiting.
+            if processed < self.batch_size:
+                self.stop_event.wait(self.poll_seconds)
+
+    def stop(self, timeout: float = None):
+        self.stop_event.set()
+        self.join(timeout)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Send the emails queued in the outbox.")
+    parser.add_argument("--once", action="store_true", help="Drain one batch and exit.")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.once:
+        print(f"{drain_once(batch_size=args.batch_size)} email(s) processed")
+        return 0
+    worker = OutboxWorker(batch_size=args.batch_size)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(1)
+    except KeyboardInterrupt:
+        worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
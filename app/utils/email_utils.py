@@ -1,14 +1,22 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
 import os
 from string import Template
 
+from app.core.metrics import email_send_duration_seconds, email_send_failures_total
+
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 EMAIL_FROM = os.getenv("EMAIL_FROM")
 
+def normalize_email(email: str) -> str:
+    # Canonical form used for lookups and uniqueness: "User@X.com " and
+    # "user@x.com" are the same account. The address as typed is kept in `email`.
+    return email.strip().lower()
+
 def load_template(template_name: str, context: dict):
     template_path = os.path.join(os.path.dirname(__file__), "email_templates", template_name)
     with open(template_path, "r", encoding="utf-8") as f:
@@ -16,17 +24,57 @@ def load_template(template_name: str, context: dict):
     return template.safe_substitute(context)
 
 
-def send_email(to_email: str, subject: str, body: str):
-    msg = MIMEText(body, "html")
-    msg["Subject"] = subject
-    msg["From"] = EMAIL_FROM
-    msg["To"] = to_email
+class SMTPSession:
+    """
+    One authenticated SMTP connection reused for several emails, so a batch
+    pays for the connect, STARTTLS and login once. A dropped connection is
+    reopened on the next send.
+    """
+
+    def __init__(self):
+        self.server = None
+
+    def _connect(self):
+        self.server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        self.server.starttls()
+        self.server.login(SMTP_USER, SMTP_PASSWORD)
+
+    def __enter__(self):
+        self._connect()
+        return self
 
+    def __exit__(self, *exc_info):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                pass
+            self.server = None
+
+    def send(self, to_email: str, subject: str, body: str):
+        msg = MIMEText(body, "html")
+        msg["Subject"] = subject
+        msg["From"] = EMAIL_FROM
+        msg["To"] = to_email
+
+        start = time.perf_counter()
+        try:
+            try:
+                self.server.sendmail(EMAIL_FROM, [to_email], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                self._connect()
+                self.server.sendmail(EMAIL_FROM, [to_email], msg.as_string())
+        except Exception:
+            email_send_failures_total.inc()
+            raise
+        finally:
+            email_send_duration_seconds.observe(time.perf_counter() - start)
+
+
+def send_email(to_email: str, subject: str, body: str):
     try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(EMAIL_FROM, [to_email], msg.as_string())
+        with SMTPSession() as session:
+            session.send(to_email, subject, body)
     except Exception as e:
         print(f"An error occurred while sending email: {e}")
         raise
\ No newline at end of file
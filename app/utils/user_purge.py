@@ -0,0 +1,100 @@
+"""
+Deleted user purger.
+
+DELETE /users/{id} only marks the user as deleted. This worker removes
+soft-deleted users, their addresses and their tokens in bounded batches,
+USER_PURGE_DELAY_SECONDS after the delete, so a request never pays for how
+much data a user has. Keep the delay above REVOCATION_REFRESH_SECONDS: every
+instance must see the token revocation that comes with the delete before
+the row is gone.
+
+Runs inside the API process when USER_PURGE_WORKER_ENABLED is true, or
+standalone (any number of instances can run side by side):
+
+    python -m app.utils.user_purge
+    python -m app.utils.user_purge --once
+"""
+import argparse
+import logging
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.crud.user_crud import purge_deleted_users
+from app.db.unit_of_work import transaction
+
+logger = logging.getLogger("app.users.purge")
+
+
+def purge_once(session_factory=None, batch_size: int = None, delay_seconds: float = None) -> int:
+    """Purge one batch in its own transaction. Returns the number of rows deleted."""
+    if session_factory is None:
+        from app.db.session import BackgroundSessionLocal
+        session_factory = BackgroundSessionLocal
+    batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+    if delay_seconds is None:
+        delay_seconds = settings.USER_PURGE_DELAY_SECONDS
+
+    deleted_before = datetime.now(timezone.utc) - timedelta(seconds=delay_seconds)
+    db = session_factory()
+    try:
+        with transaction(db):
+            return purge_deleted_users(db, deleted_before, batch_size)
+    finally:
+        db.close()
+
+
+class UserPurgeWorker(threading.Thread):
+    """Purges batch after batch until nothing is left, then sleeps between polls."""
+
+    def __init__(self, poll_seconds: float = None, batch_size: int = None, session_factory=None):
+        super().__init__(daemon=True, name="user-purge")
+        self.batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.USER_PURGE_POLL_SECONDS
+        self.session_factory = session_factory
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                removed = purge_once(self.session_factory, self.batch_size)
+            except Exception:
+                logger.exception("User purge batch failed")
+                removed = 0
+            if not removed:
+                self.stop_event.wait(self.poll_seconds)
+
+    def stop(self, timeout: float = None):
+        self.stop_event.set()
+        self.join(timeout)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Permanently remove soft-deleted users and their data.")
+    parser.add_argument("--once", action="store_true", help="Purge everything that is due and exit.")
+    parser.add_argument("--batch-size", type=int, default=settings.USER_PURGE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.once:
+        total = 0
+        while True:
+            removed = purge_once(batch_size=args.batch_size)
+            if not removed:
+                break
+            total += removed
+        print(f"{total} row(s) purged")
+        return 0
+    worker = UserPurgeWorker(batch_size=args.batch_size)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(1)
+    except KeyboardInterrupt:
+        worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
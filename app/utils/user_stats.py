@@ -0,0 +1,42 @@
+"""
+Rebuild the user statistics counters (user_stats) from the users table.
+
+The counters are maintained incrementally on every write; run this after
+writes that bypassed the application (manual SQL, imports) to repair drift:
+
+    python -m app.utils.user_stats
+    python -m app.utils.user_stats --dry-run
+"""
+import argparse
+import sys
+
+from app.crud.user_stats_crud import rebuild_user_stats
+from app.db.unit_of_work import transaction
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the user statistics from the users table.")
+    parser.add_argument("--dry-run", action="store_true", help="Report the drift without fixing it.")
+    args = parser.parse_args(argv)
+
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            drift = rebuild_user_stats(db)
+            db.rollback()
+        else:
+            with transaction(db):
+                drift = rebuild_user_stats(db)
+    finally:
+        db.close()
+
+    for (dimension, bucket), (stored, actual) in sorted(drift.items()):
+        print(f"{dimension} {bucket or '-'}: {stored} -> {actual}")
+    action = "found" if args.dry_run else "repaired"
+    print(f"{len(drift)} counter(s) with drift {action}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Concurrency load generator.
+
+Replays a weighted traffic mix at increasing concurrency levels and reports
+throughput and p50/p95/p99 latency per endpoint, plus threadpool and DB pool
+saturation sampled from /metrics:
+
+    python -m benchmarks.load --mix read-heavy --concurrency 1 8 32 64 --duration 15
+    python -m benchmarks.load --target http://localhost:8000 --mix login-heavy --output load.json
+
+Without --target the app is served in-process by uvicorn on a free local port,
+against a freshly seeded database (see benchmarks.run.seed_database).
+Against a running instance, test accounts are registered through the API,
+so the target should run with RATE_LIMIT_ENABLED=false (and, to keep the
+registration emails unsent, EMAIL_OUTBOX_WORKER_ENABLED=false).
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.run import DEFAULT_DATABASE_URL, PASSWORD, configure_environment, seed_database
+
+# Traffic mixes: operation name -> relative weight.
+MIXES = {
+    "login-heavy": {"login": 60, "verify_token": 25, "get_user": 15},
+    "read-heavy": {"get_user": 35, "get_addresses": 30, "list_users": 20, "verify_token": 15},
+    "registration-burst": {"register": 70, "login": 20, "get_user": 10},
+}
+
+SATURATION_GAUGES = (
+    "threadpool_tokens_borrowed", "threadpool_tokens_total",
+    "db_pool_checked_out", "db_pool_overflow", "db_pool_size",
+)
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    # Nearest-rank percentile on an already sorted list.
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Accounts:
+    """Test accounts the traffic mix logs in as and reads."""
+
+    def __init__(self, users: list):
+        # Each entry is (user_id, email, access_token).
+        self.users = users
+
+    def pick(self, rng: random.Random):
+        return self.users[rng.randrange(len(self.users))]
+
+
+def operation(name: str, client: httpx.Client, accounts: Accounts, rng: random.Random):
+    user_id, email, token = accounts.pick(rng)
+    if name == "login":
+        return client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    if name == "verify_token":
+        return client.post("/auth/verify-token", json={"token": token})
+    if name == "get_user":
+        return client.get(f"/users/{user_id}")
+    if name == "get_addresses":
+        return client.get(f"/addresses/user/{user_id}")
+    if name == "list_users":
+        return client.get("/users/", params={"skip": rng.randrange(0, 50), "limit": 20})
+    if name == "register":
+        suffix = uuid.uuid4().hex[:12]
+        return client.post("/auth/register", json={
+            "email": f"load-{suffix}@example.com",
+            "nickname": f"load{suffix}",
+            "firstname": "Load",
+            "lastname": "Test",
+            "phone": "+1234567890",
+            "password": PASSWORD
+        })
+    raise ValueError(f"Unknown operation: {name}")
+
+
+def parse_gauges(text: str) -> dict:
+    values = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in SATURATION_GAUGES:
+            values[name] = float(value)
+    return values
+
+
+class SaturationSampler(threading.Thread):
+    """Polls /metrics while a level runs and keeps the peak and mean of each gauge."""
+
+    def __init__(self, base_url: str, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.client = httpx.Client(base_url=base_url, timeout=5)
+        self.interval = interval
+        self.samples = defaultdict(list)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                gauges = parse_gauges(self.client.get("/metrics").text)
+            except httpx.HTTPError:
+                gauges = {}
+            for name, value in gauges.items():
+                self.samples[name].append(value)
+            self.stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self.stop_event.set()
+        self.join()
+        self.client.close()
+        return {
+            name: {"max": max(values), "mean": sum(values) / len(values)}
+            for name, values in self.samples.items() if values
+        }
+
+
+def run_level(base_url: str, accounts: Accounts, mix: dict, concurrency: int, duration: float, seed: int) -> dict:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = operation(name, client, accounts, rng)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                local_latencies[name].append(time.perf_counter() - start)
+                if failed:
+                    local_errors[name] += 1
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, value in local_errors.items():
+                errors[name] += value
+
+    sampler = SaturationSampler(base_url)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    saturation = sampler.stop()
+
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        ordered = sorted(values)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": errors[name],
+            "throughput_rps": len(ordered) / elapsed,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "throughput_rps": total / elapsed,
+        "endpoints": endpoints,
+        "saturation": saturation,
+    }
+
+
+def print_level(level: dict):
+    print(f"\nconcurrency {level['concurrency']}: {level['throughput_rps']:.1f} req/s")
+    print(f"  {'endpoint':<16}{'reqs':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, endpoint in level["endpoints"].items():
+        print(
+            f"  {name:<16}{endpoint['requests']:>8}{endpoint['errors']:>8}{endpoint['throughput_rps']:>9.1f}"
+            f"{endpoint['p50_ms']:>10.2f}{endpoint['p95_ms']:>10.2f}{endpoint['p99_ms']:>10.2f}"
+        )
+    saturation = level["saturation"]
+    if saturation:
+        parts = [f"{name} max {values['max']:.0f} mean {values['mean']:.1f}" for name, values in saturation.items()]
+        print("  " + "; ".join(parts))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_accounts(database_url: str, users: int) -> Accounts:
+    """Seed a fresh database and return its users with ready-made access tokens."""
+    configure_environment(database_url)
+    from app.core.security import create_access_token
+
+    user_ids = seed_database(users)
+    return Accounts([
+        (user_id, f"bench{i}@example.com", create_access_token({"sub": str(user_id)}, "customer"))
+        for i, user_id in enumerate(user_ids)
+    ])
+
+
+def start_in_process_server(database_url: str, users: int):
+    """Seed the database and serve the app with uvicorn in a background thread."""
+    accounts = seed_accounts(database_url, users)
+    import uvicorn
+
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", accounts, server
+
+
+def register_remote_accounts(base_url: str, users: int) -> Accounts:
+    entries = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        for i in range(users):
+            suffix = uuid.uuid4().hex[:12]
+            email = f"loadtest-{suffix}@example.com"
+            response = client.post("/auth/register", json={
+                "email": email, "nickname": f"loadtest{i}", "firstname": "Load",
+                "lastname": "Test", "phone": "+1234567890", "password": PASSWORD
+            })
+            response.raise_for_status()
+            body = response.json()
+            entries.append((body["id"], email, body["access_token"]))
+    return Accounts(entries)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrency load generator.")
+    parser.add_argument("--target", help="Base URL of a running instance. Defaults to an in-process server.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help="Database for the in-process server. Its tables are dropped and recreated.")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="read-heavy")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level.")
+    parser.add_argument("--users", type=int, default=50, help="Number of test accounts.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the full report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+        accounts = register_remote_accounts(base_url, args.users)
+    else:
+        base_url, accounts, server = start_in_process_server(args.database_url, args.users)
+
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            level = run_level(base_url, accounts, MIXES[args.mix], concurrency, args.duration, args.seed)
+            print_level(level)
+            levels.append(level)
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"target": args.target or "in-process", "mix": args.mix, "levels": levels}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
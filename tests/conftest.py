@@ -16,7 +16,6 @@ def mock_email_sending():
     """Mock email sending for all tests automatically"""
     patches = [
         patch('app.utils.email_utils.send_email'),
-        patch('app.api.auth_routes.send_email'),  # Si se importa directamente en auth_routes
         patch('smtplib.SMTP'),  # Mock directo de SMTP
     ]
     
@@ -57,10 +56,43 @@ def clean_tables():
     db.execute(text("DELETE FROM addresses"))
     db.execute(text("DELETE FROM action_tokens"))
     db.execute(text("DELETE FROM password_restore_tokens"))
+    db.execute(text("DELETE FROM revoked_tokens"))
+    db.execute(text("DELETE FROM email_outbox"))
     db.execute(text("DELETE FROM users"))
+    db.execute(text("DELETE FROM user_stats"))
     db.commit()
     db.close()
 
+@pytest.fixture(scope="function", autouse=True)
+def reset_rate_limits():
+    from app.core.rate_limit import rate_limit_store
+    rate_limit_store.reset()
+    yield
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_idempotency_keys():
+    from app.core.idempotency import idempotency_store
+    idempotency_store.reset()
+    yield
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_revocation_state():
+    from app.core.revocation import revocation_state
+    revocation_state.reset()
+    yield
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_known_emails():
+    from app.core.known_emails import known_emails
+    known_emails.reset()
+    yield
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_principal_cache():
+    from app.core.principal_cache import principal_cache
+    principal_cache.reset()
+    yield
+
 @pytest.fixture(scope="function")
 def db_session():
     from sqlalchemy.orm import sessionmaker
@@ -143,4 +143,16 @@ def test_address_exists_for_user_with_invalid_data(db_session, test_user):
         zip_code = "Z"
         country = "P"
     exists = address_exists_for_user(db_session, test_user.id, DummyInvalid)
-    assert exists is False
\ No newline at end of file
+    assert exists is False
+
+def test_get_address_page_with_total(db_session, test_user):
+    from app.crud.address_crud import get_address_page_with_total
+    ids = [
+        create_address(db_session, Address(user_id=test_user.id, street=f"S{i}", city="B", state="C", zip_code="111", country="X")).id
+        for i in range(4)
+    ]
+    page, total = get_address_page_with_total(db_session, test_user.id, 2)
+    assert [a.id for a in page] == ids[:2] and total == 4
+    page, total = get_address_page_with_total(db_session, test_user.id, 2, after_id=ids[1])
+    assert [a.id for a in page] == ids[2:] and total == 4
+    assert get_address_page_with_total(db_session, test_user.id, 2, after_id=ids[3]) == ([], 4)
@@ -97,4 +97,32 @@ def test_update_nonexistent_address(client, test_user):
 
 def test_delete_nonexistent_address(client, test_user):
     response = client.delete("/addresses/99999")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_list_addresses_paginated(client, db_session, test_user):
+    from app.models.address_model import Address
+    for i in range(7):
+        db_session.add(Address(user_id=test_user.id, street=f"Street {i}", city="City", state="ST", zip_code="12345", country="USA"))
+    db_session.commit()
+
+    seen = []
+    params = {"limit": 3, "include_total": "true"}
+    while True:
+        response = client.get(f"/addresses/user/{test_user.id}", params=params)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == "7"
+        seen += [address["id"] for address in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == sorted(seen)
+    assert len(seen) == 7 == len(set(seen))
+
+    response = client.get(f"/addresses/user/{test_user.id}", params={"limit": 7})
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Total-Count" not in response.headers
+
+def test_list_addresses_invalid_cursor(client, test_user):
+    response = client.get(f"/addresses/user/{test_user.id}", params={"cursor": "garbage"})
+    assert response.status_code == 422
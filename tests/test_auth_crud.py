@@ -116,6 +116,8 @@ def test_register_rollback_on_error(db_session, mocker):
         user_rol="user",
         phone="+1234567892"
     )
-    mocker.patch.object(db_session, "commit", side_effect=Exception)
+    mocker.patch.object(db_session, "flush", side_effect=Exception)
+    rollback = mocker.spy(db_session, "rollback")
     with pytest.raises(Exception):
-        auth_crud.register(db_session, user)
\ No newline at end of file
+        auth_crud.register(db_session, user)
+    rollback.assert_called_once()
\ No newline at end of file
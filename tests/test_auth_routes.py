@@ -25,6 +25,43 @@ def test_register_duplicate_email(client, test_user):
     assert response.status_code == 400
     assert "already registered" in response.json()["detail"]
 
+def test_register_stores_password_hash(client, db_session):
+    from app.core.security import verify_password
+    from app.models.user_model import User
+    data = {
+        "email": "hashed@example.com", "firstname": "John", "lastname": "Doe",
+        "nickname": "hashed", "phone": "+1234567891", "password": "Password2"
+    }
+    assert client.post("/auth/register", json=data).status_code == 200
+    user = db_session.query(User).filter(User.email == "hashed@example.com").first()
+    assert verify_password("Password2", user.hashed_password)
+
+def test_register_inserts_the_hash_in_one_statement(client):
+    from sqlalchemy import event
+    from app.db.session import engine
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        data = {
+            "email": "oneshot@example.com", "firstname": "John", "lastname": "Doe",
+            "nickname": "oneshot", "phone": "+1234567891", "password": "Password2"
+        }
+        assert client.post("/auth/register", json=data).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not [statement for statement in statements if statement.startswith("UPDATE users")]
+
+def test_register_concurrent_duplicates(client):
+    from concurrent.futures import ThreadPoolExecutor
+    data = {
+        "email": "race@example.com", "firstname": "John", "lastname": "Doe",
+        "nickname": "racer", "phone": "+1234567891", "password": "Password2"
+    }
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        statuses = sorted(pool.map(lambda _: client.post("/auth/register", json=data).status_code, range(4)))
+    assert statuses == [200, 400, 400, 400]
+
 @pytest.mark.parametrize(
     "field,value,expected_status",
     [
@@ -121,6 +158,7 @@ def test_reset_password_invalid_token(client):
 def test_reset_password_same_as_old(client, db_session, test_user):
     from app.crud.auth_crud import create_action_token
     token_obj = create_action_token(db_session, test_user.id, "reset", expires_minutes=5)
+    db_session.commit()
     data = {"token": token_obj.token, "new_password": "Password1"}
     response = client.post("/auth/reset-password", json=data)
     assert response.status_code == 422
@@ -128,6 +166,7 @@ def test_reset_password_same_as_old(client, db_session, test_user):
 def test_reset_password_success(client, db_session, test_user):
     from app.crud.auth_crud import create_action_token
     token_obj = create_action_token(db_session, test_user.id, "reset", expires_minutes=5)
+    db_session.commit()
     data = {"token": token_obj.token, "new_password": "Password2"}
     response = client.post("/auth/reset-password", json=data)
     assert response.status_code == 200
@@ -141,4 +180,46 @@ def test_undo_password_change_invalid_token(client):
 def test_verify_token_invalid(client):
     data = {"token": "invalidtoken"}
     response = client.post("/auth/verify-token", json=data)
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_verify_tokens_batch(client, mocker):
+    from app.core.security import create_access_token, decode_access_token
+    valid = create_access_token({"sub": "1"}, "customer")
+    decode = mocker.patch("app.api.auth_routes.decode_access_token", wraps=decode_access_token)
+    response = client.post("/auth/verify-tokens", json={"tokens": [valid, "invalidtoken", valid]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["valid"] is True
+    assert results[0]["payload"]["sub"] == "1"
+    assert results[1] == {"valid": False, "error": "Invalid token"}
+    assert results[2] == results[0]
+    assert decode.call_count == 2
+
+def test_verify_tokens_batch_limits(client):
+    assert client.post("/auth/verify-tokens", json={"tokens": []}).status_code == 422
+    assert client.post("/auth/verify-tokens", json={"tokens": ["t"] * 101}).status_code == 422
+
+def test_reset_password_commits_once(client, db_session, test_user, mocker):
+    from sqlalchemy.orm import Session
+    from app.crud.auth_crud import create_action_token
+    token_obj = create_action_token(db_session, test_user.id, "reset", expires_minutes=5)
+    db_session.commit()
+    commit = mocker.spy(Session, "commit")
+    response = client.post("/auth/reset-password", json={"token": token_obj.token, "new_password": "Password2"})
+    assert response.status_code == 200
+    assert commit.call_count == 1
+
+def test_register_duplicate_email_different_case(client, test_user):
+    data = {
+        "email": "Test@Example.COM", "firstname": "John", "lastname": "Doe",
+        "nickname": "johndoe3", "phone": "+1234567890", "password": "Password2"
+    }
+    response = client.post("/auth/register", json=data)
+    assert response.status_code == 400
+    assert "already registered" in response.json()["detail"]
+
+def test_login_is_case_insensitive(client, test_user):
+    response = client.post("/auth/login", json={"email": "TEST@example.com", "password": "Password1"})
+    assert response.status_code == 200
+    assert response.json()["id"] == test_user.id
@@ -0,0 +1,36 @@
+from benchmarks.run import compare_reports, main, summarize
+
+
+def test_summarize():
+    summary = summarize([0.001, 0.002, 0.003, 0.004])
+    assert summary["iterations"] == 4
+    assert summary["median_ms"] == 2.5
+    assert summary["min_ms"] == 1.0
+    assert summary["p95_ms"] == 4.0
+
+def test_compare_reports_flags_regressions_beyond_tolerance():
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "c": {"median_ms": 1.0}}}
+    current = {"results": {"a": {"median_ms": 10.5}, "b": {"median_ms": 12.0}}}
+    rows = {name: regressed for name, _, _, _, regressed in compare_reports(baseline, current, tolerance=0.10)}
+    assert rows == {"a": False, "b": True}
+
+def test_compare_command_exit_code(tmp_path):
+    import json
+    baseline = tmp_path / "baseline.json"
+    current = tmp_path / "current.json"
+    baseline.write_text(json.dumps({"results": {"a": {"median_ms": 10.0}}}))
+    current.write_text(json.dumps({"results": {"a": {"median_ms": 20.0}}}))
+    assert main(["compare", str(baseline), str(current), "--tolerance", "0.5"]) == 1
+    assert main(["compare", str(baseline), str(current), "--tolerance", "1.5"]) == 0
+
+def test_load_percentile_nearest_rank():
+    from benchmarks.load import percentile
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 0.50) == 50.0
+    assert percentile(ordered, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+def test_load_parses_saturation_gauges():
+    from benchmarks.load import parse_gauges
+    text = "# TYPE db_pool_checked_out gauge\ndb_pool_checked_out 3\nthreadpool_tokens_borrowed 7\nother 1\n"
+    assert parse_gauges(text) == {"db_pool_checked_out": 3.0, "threadpool_tokens_borrowed": 7.0}
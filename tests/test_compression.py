@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding, skip_compression
+from app.core.responses import FastJSONResponse
+
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    def big():
+        return {"items": [{"id": i, "name": f"user{i}"} for i in range(100)]}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/binary")
+    def binary():
+        return Response(b"\0" * 1000, media_type="application/octet-stream")
+
+    @app.get("/opted-out")
+    @skip_compression
+    def opted_out():
+        return PlainTextResponse("x" * 1000)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((b"line %d\n" % i for i in range(200)), media_type="text/plain")
+
+    return TestClient(app)
+
+def get(client, path, encoding="gzip"):
+    # httpx would decode the body transparently; read the raw bytes instead.
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+def test_large_json_is_gzipped():
+    response, raw = get(make_client(), "/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw).startswith(b'{"items":[{"id":0,"name":"user0"}')
+
+@pytest.mark.parametrize("path", ["/small", "/binary", "/opted-out"])
+def test_ineligible_responses_are_untouched(path):
+    response, raw = get(make_client(), path)
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == len(raw)
+
+def test_identity_clients_get_plain_bodies():
+    response, raw = get(make_client(), "/big", encoding="identity")
+    assert "content-encoding" not in response.headers
+    assert raw.startswith(b'{"items"')
+
+def test_streaming_responses_are_compressed_incrementally():
+    response, raw = get(make_client(), "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b"".join(b"line %d\n" % i for i in range(200))
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") == ""
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("") == ""
+
+def test_app_compresses_user_listing(client, db_session):
+    from app.models.user_model import User
+    db_session.add_all(
+        User(firstname="Page", lastname=f"User{i}", email=f"page{i}@example.com", hashed_password="x")
+        for i in range(30)
+    )
+    db_session.commit()
+    response, raw = get(client, "/users/?limit=100")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(gzip.decompress(raw)) > 2 * len(raw)
+
+def test_jwks_is_never_compressed(client):
+    response, _ = get(client, "/.well-known/jwks.json")
+    assert "content-encoding" not in response.headers
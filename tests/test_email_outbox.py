@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.crud.email_outbox_crud import enqueue_email
+from app.models.email_outbox_model import EmailOutbox
+from app.utils.email_outbox import drain_once
+
+
+class FakeSender:
+    """Stands in for SMTPSession and records how it is used."""
+
+    def __init__(self, fail_for=(), fail_connect=False):
+        self.fail_for = set(fail_for)
+        self.fail_connect = fail_connect
+        self.sessions = 0
+        self.sent = []
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        if self.fail_connect:
+            raise ConnectionRefusedError("smtp down")
+        self.sessions += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send(self, to_email, subject, body):
+        if to_email in self.fail_for:
+            raise RuntimeError("mailbox unavailable")
+        self.sent.append(to_email)
+
+def queue(db_session, *recipients):
+    for to_email in recipients:
+        enqueue_email(db_session, to_email, "Subject", "<p>Body</p>")
+    db_session.commit()
+
+def outbox(db_session):
+    db_session.expire_all()
+    return {email.to_email: email for email in db_session.query(EmailOutbox)}
+
+def test_register_queues_verification_email(client):
+    response = client.post("/auth/register", json={
+        "email": "queued@example.com", "firstname": "John", "lastname": "Doe",
+        "nickname": "queued", "phone": "+1234567891", "password": "Password2"
+    })
+    assert response.status_code == 200
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        email = db.query(EmailOutbox).one()
+        assert email.to_email == "queued@example.com"
+        assert email.status == "pending"
+        assert "confirm-email?token=" in email.body
+    finally:
+        db.close()
+
+def test_password_reset_request_is_queued_not_sent(client, test_user, mock_email_sending):
+    response = client.post("/auth/request-password-reset", json={"email": test_user.email})
+    assert response.status_code == 200
+    for mock in mock_email_sending:
+        mock.assert_not_called()
+
+def test_drain_sends_batch_over_one_session(db_session):
+    queue(db_session, "a@example.com", "b@example.com", "c@example.com")
+    sender = FakeSender()
+    assert drain_once(sender_factory=sender) == 3
+    assert sender.sessions == 1
+    assert sender.sent == ["a@example.com", "b@example.com", "c@example.com"]
+    emails = outbox(db_session)
+    assert all(email.status == "sent" and email.sent_at for email in emails.values())
+    assert drain_once(sender_factory=sender) == 0
+
+def test_drain_respects_batch_size(db_session):
+    queue(db_session, "a@example.com", "b@example.com", "c@example.com")
+    sender = FakeSender()
+    assert drain_once(sender_factory=sender, batch_size=2) == 2
+    assert drain_once(sender_factory=sender, batch_size=2) == 1
+
+def test_failed_send_is_retried_with_backoff(db_session):
+    queue(db_session, "ok@example.com", "bad@example.com")
+    before = datetime.now(timezone.utc)
+    assert drain_once(sender_factory=FakeSender(fail_for={"bad@example.com"})) == 2
+    emails = outbox(db_session)
+    assert emails["ok@example.com"].status == "sent"
+    failed = emails["bad@example.com"]
+    assert failed.status == "pending"
+    assert failed.attempts == 1
+    assert "mailbox unavailable" in failed.last_error
+    next_attempt = failed.next_attempt_at.replace(tzinfo=failed.next_attempt_at.tzinfo or timezone.utc)
+    assert next_attempt >= before + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS)
+    # Not due yet, so the next drain leaves it alone.
+    assert drain_once(sender_factory=FakeSender()) == 0
+
+def test_email_is_dead_lettered_after_max_attempts(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 0)
+    queue(db_session, "bad@example.com")
+    sender = FakeSender(fail_connect=True)
+    assert drain_once(sender_factory=sender) == 1
+    assert outbox(db_session)["bad@example.com"].status == "pending"
+    assert drain_once(sender_factory=sender) == 1
+    dead = outbox(db_session)["bad@example.com"]
+    assert dead.status == "dead"
+    assert dead.attempts == 2
+    assert "smtp down" in dead.last_error
+    assert drain_once(sender_factory=sender) == 0
+
+def test_claimed_emails_are_leased(db_session):
+    from app.crud.email_outbox_crud import claim_pending_emails
+    queue(db_session, "a@example.com")
+    claimed = claim_pending_emails(db_session, 10, lease_seconds=300)
+    db_session.commit()
+    assert len(claimed) == 1
+    # Another worker finds nothing due while the lease holds.
+    assert drain_once(sender_factory=FakeSender()) == 0
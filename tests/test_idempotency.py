@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.idempotency import IdempotencyMiddleware, MemoryIdempotencyStore
+from app.models.address_model import Address
+from app.models.user_model import User
+
+REGISTER = {
+    "email": "retry@example.com",
+    "password": "Password1",
+    "firstname": "Retry",
+    "lastname": "User",
+    "nickname": "retry",
+    "phone": "+1234567890",
+}
+
+ADDRESS = {"user_id": 1, "street": "Main St", "city": "City", "state": "ST", "zip_code": "12345", "country": "USA"}
+
+
+def test_register_retry_is_replayed(client, db_session):
+    headers = {"Idempotency-Key": "register-1"}
+    first = client.post("/auth/register", json=REGISTER, headers=headers)
+    second = client.post("/auth/register", json=REGISTER, headers=headers)
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert db_session.query(User).filter(User.email == REGISTER["email"]).count() == 1
+
+
+def test_address_retry_creates_one_address(client, db_session, test_user):
+    headers = {"Idempotency-Key": "address-1"}
+    first = client.post("/addresses/", json=ADDRESS, headers=headers)
+    second = client.post("/addresses/", json=ADDRESS, headers=headers)
+    assert first.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert db_session.query(Address).filter(Address.user_id == test_user.id).count() == 1
+
+
+def test_without_key_the_retry_runs_again(client, test_user):
+    assert client.post("/addresses/", json=ADDRESS).status_code == 200
+    response = client.post("/addresses/", json=ADDRESS)
+    assert response.status_code == 400
+    assert "already exists" in response.json()["detail"]
+
+
+def test_key_is_scoped_per_route(client, db_session, test_user):
+    headers = {"Idempotency-Key": "shared"}
+    assert client.post("/addresses/", json=ADDRESS, headers=headers).status_code == 200
+    response = client.post("/auth/register", json=REGISTER, headers=headers)
+    assert response.status_code == 200
+    assert "idempotent-replayed" not in response.headers
+
+
+def test_key_reused_with_different_body(client, test_user):
+    headers = {"Idempotency-Key": "address-2"}
+    client.post("/addresses/", json=ADDRESS, headers=headers)
+    response = client.post("/addresses/", json={**ADDRESS, "street": "Other St"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_invalid_key(client):
+    response = client.post("/auth/register", json=REGISTER, headers={"Idempotency-Key": "x" * 256})
+    assert response.status_code == 400
+
+
+def test_client_errors_are_replayed(client, test_user):
+    headers = {"Idempotency-Key": "register-2"}
+    data = {**REGISTER, "email": test_user.email}
+    first = client.post("/auth/register", json=data, headers=headers)
+    second = client.post("/auth/register", json=data, headers=headers)
+    assert first.status_code == 400
+    assert second.status_code == 400
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_concurrent_duplicates_run_once(client, db_session):
+    headers = {"Idempotency-Key": "register-3"}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.post("/auth/register", json=REGISTER, headers=headers), range(4)))
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.text for response in responses}) == 1
+    assert sum("idempotent-replayed" in response.headers for response in responses) == 3
+    assert db_session.query(User).filter(User.email == REGISTER["email"]).count() == 1
+
+
+def _call(middleware, body=b"{}", key=b"k"):
+    scope = {"type": "http", "method": "POST", "path": "/auth/register", "headers": [(b"idempotency-key", key)]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_server_errors_release_the_key():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(1)
+        await send({"type": "http.response.start", "status": 503 if len(calls) == 1 else 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = IdempotencyMiddleware(app, store=MemoryIdempotencyStore())
+    assert _call(middleware)[0]["status"] == 503
+    assert _call(middleware)[0]["status"] == 200
+    assert _call(middleware)[0]["status"] == 200
+    assert len(calls) == 2
+
+
+def test_keys_are_scoped_per_caller(client, test_user):
+    first = client.post("/addresses/", json=ADDRESS, headers={"Idempotency-Key": "k", "Authorization": "Bearer a"})
+    assert first.status_code == 200
+    # Same key from another caller: neither a replay nor a 422 for the other body.
+    other = client.post(
+        "/addresses/", json={**ADDRESS, "street": "Other St"}, headers={"Idempotency-Key": "k", "Authorization": "Bearer b"}
+    )
+    assert other.status_code == 200
+    assert "idempotent-replayed" not in other.headers
+    assert other.json()["id"] != first.json()["id"]
+
+
+def test_route_caps_how_long_a_response_is_kept():
+    now = [0.0]
+    store = MemoryIdempotencyStore(clock=lambda: now[0])
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"token"})
+
+    middleware = IdempotencyMiddleware(app, store=store, routes={"/auth/register": 10})
+    _call(middleware)
+    now[0] = 9
+    assert _call(middleware)[0]["headers"] == [(b"idempotent-replayed", b"true")]
+    now[0] = 11
+    _call(middleware)
+    assert len(calls) == 2
+
+
+def test_memory_store_is_bounded_and_expires():
+    now = [0.0]
+    store = MemoryIdempotencyStore(max_entries=2, clock=lambda: now[0])
+    record = {"status": 200, "headers": [], "body": "", "fingerprint": "f"}
+    for key in ("a", "b", "c"):
+        assert store.begin(key, "f", 60) == ("started", None)
+        store.complete(key, record, ttl=10)
+    assert len(store) == 2
+    assert store.begin("a", "f", 60) == ("started", None)
+    assert store.begin("c", "f", 60) == ("done", record)
+    now[0] = 11
+    assert store.begin("c", "f", 60) == ("started", None)
+
+
+def test_memory_store_keeps_in_flight_keys():
+    store = MemoryIdempotencyStore(max_entries=1)
+    store.begin("a", "f", 60)
+    store.begin("b", "f", 60)
+    assert store.begin("a", "f", 60) == ("in_flight", "f")
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import jwt
+
+from app.core import security
+from app.core.config import settings
+from app.core.jwt_keys import KeyRing, SigningKey, generate_private_key, rotate_keys
+
+
+@pytest.fixture
+def use_key_ring():
+    previous = security.key_ring
+
+    def configure(*keys, clock=None):
+        ring = KeyRing(list(keys), clock=clock)
+        security.configure_key_ring(ring)
+        return ring
+
+    yield configure
+    security.configure_key_ring(previous)
+
+@pytest.fixture
+def rsa_signing_key(use_key_ring):
+    key = SigningKey("RS256", generate_private_key("RS256"))
+    legacy = SigningKey("HS256", settings.SECRET_KEY, kid="legacy-hs256",
+                        retires_at=datetime.min.replace(tzinfo=timezone.utc))
+    use_key_ring(key, legacy)
+    return key
+
+def test_rs256_tokens_roundtrip_with_kid(rsa_signing_key):
+    token = security.create_access_token({"sub": "1"}, "customer")
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == "RS256"
+    assert header["kid"] == rsa_signing_key.kid
+    result = security.decode_access_token(token)
+    assert result["valid"] is True
+    assert result["payload"]["sub"] == "1"
+
+def test_public_key_verifies_token_locally(rsa_signing_key):
+    token = security.create_access_token({"sub": "7"})
+    payload = jwt.decode(token, rsa_signing_key.verifying_key, algorithms=["RS256"])
+    assert payload["sub"] == "7"
+
+def test_legacy_hs256_tokens_without_kid_still_accepted(rsa_signing_key):
+    legacy = jwt.encode({"sub": "1"}, settings.SECRET_KEY, algorithm="HS256")
+    assert security.decode_access_token(legacy)["valid"] is True
+
+def test_hs256_rejected_when_not_in_ring(use_key_ring):
+    use_key_ring(SigningKey("RS256", generate_private_key("RS256")))
+    legacy = jwt.encode({"sub": "1"}, settings.SECRET_KEY, algorithm="HS256")
+    assert security.decode_access_token(legacy) == {"valid": False, "error": "Invalid token"}
+
+def test_algorithm_must_match_key(rsa_signing_key):
+    # An HS256 token claiming the RSA key's kid must not be verified with it.
+    import base64, hashlib, hmac, json
+
+    def b64(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+    signing_input = b64(json.dumps({"alg": "HS256", "kid": rsa_signing_key.kid}).encode()) + "." + b64(b'{"sub":"1"}')
+    signature = hmac.new(rsa_signing_key.verifying_key.encode(), signing_input.encode(), hashlib.sha256).digest()
+    forged = signing_input + "." + b64(signature)
+    assert security.decode_access_token(forged)["valid"] is False
+
+def test_es256_signing():
+    key = SigningKey("ES256", generate_private_key("ES256"))
+    token = jwt.encode({"sub": "1"}, key.signing_key, algorithm="ES256")
+    assert jwt.decode(token, key.verifying_key, algorithms=["ES256"])["sub"] == "1"
+    assert key.jwks_entry()["kty"] == "EC"
+
+def test_scheduled_rollover_keeps_old_key_verifying(use_key_ring):
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    clock = {"now": now}
+    switch = now + timedelta(hours=1)
+    old = SigningKey("HS256", "old-secret", kid="old", retires_at=switch, expires_at=switch + timedelta(days=28))
+    new = SigningKey("HS256", "new-secret", kid="new", activates_at=switch)
+    ring = use_key_ring(old, new, clock=lambda: clock["now"])
+
+    assert ring.signing_key().kid == "old"
+    old_token = security.create_access_token({"sub": "1"}, expires_delta=timedelta(days=3650))
+
+    clock["now"] = switch + timedelta(minutes=1)
+    assert ring.signing_key().kid == "new"
+    new_token = security.create_access_token({"sub": "2"}, expires_delta=timedelta(days=3650))
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert security.decode_access_token(old_token)["valid"] is True
+    assert security.decode_access_token(new_token)["valid"] is True
+
+    clock["now"] = switch + timedelta(days=29)
+    assert security.decode_access_token(old_token)["valid"] is False
+    assert security.decode_access_token(new_token)["valid"] is True
+
+def test_key_ring_rejects_duplicate_kids():
+    with pytest.raises(ValueError):
+        KeyRing([SigningKey("HS256", "a", kid="x"), SigningKey("HS256", "b", kid="x")])
+
+def test_rotate_keys_retires_current_and_prunes_expired():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    entries = [
+        {"kid": "expired", "algorithm": "RS256", "private_key_file": "expired.pem",
+         "retires_at": "2025-01-01T00:00:00+00:00", "expires_at": "2025-02-01T00:00:00+00:00"},
+        {"kid": "current", "algorithm": "RS256", "private_key_file": "current.pem"},
+    ]
+    activates_at = now + timedelta(hours=24)
+    rotated = rotate_keys(entries, "RS256", "next", "next.pem", activates_at, timedelta(hours=672), now)
+    assert [entry["kid"] for entry in rotated] == ["current", "next"]
+    assert rotated[0]["retires_at"] == activates_at.isoformat()
+    assert rotated[0]["expires_at"] == (activates_at + timedelta(hours=672)).isoformat()
+    assert rotated[1]["activates_at"] == activates_at.isoformat()
+
+def test_jwks_endpoint_is_cacheable(client, rsa_signing_key):
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    keys = response.json()["keys"]
+    assert len(keys) == 1
+    assert keys[0]["kid"] == rsa_signing_key.kid
+    assert keys[0]["alg"] == "RS256"
+    assert "d" not in keys[0]
+    assert "max-age" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    cached = client.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+def test_jwks_empty_for_hs256(client):
+    response = client.get("/.well-known/jwks.json")
+    assert response.json() == {"keys": []}
+
+def test_first_rotation_keeps_the_configured_key_signing(tmp_path, monkeypatch):
+    import json
+    from app.core import jwt_keys
+
+    old_token = security.create_access_token({"sub": "1", "ver": 0}, "customer")
+    keys_file = tmp_path / "jwt_keys.json"
+    assert jwt_keys.main(["rotate", "--keys-file", str(keys_file), "--algorithm", "RS256", "--kid", "next"]) == 0
+    entries = json.loads(keys_file.read_text())["keys"]
+    assert [entry["kid"] for entry in entries] == [security.key_ring.signing_key().kid, "next"]
+
+    # Switching to the keys file boots, keeps signing with the current key and
+    # still accepts the tokens it signed.
+    monkeypatch.setattr(settings, "JWT_KEYS_FILE", str(keys_file))
+    ring = jwt_keys.load_key_ring()
+    assert ring.signing_key().kid == entries[0]["kid"]
+    header = jwt.get_unverified_header(old_token)
+    assert ring.verification_key(header.get("kid"), header["alg"]) is not None
+
+def test_has_signing_key():
+    from app.core.jwt_keys import has_signing_key
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert has_signing_key([], now) is False
+    assert has_signing_key([{"kid": "next", "activates_at": "2026-01-02T00:00:00+00:00"}], now) is False
+    assert has_signing_key([{"kid": "current"}], now) is True
@@ -0,0 +1,197 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.core.known_emails import (
+    KnownEmails, KnownEmailsRefresher, RedisKnownEmailsStore, build_known_emails, known_emails
+)
+from app.core.metrics import cache_lookups_total, db_queries_total, password_hash_duration_seconds
+from app.core.security import hash_password
+from app.crud import auth_crud
+from app.crud.user_crud import update_user_by_id
+from app.db.session import engine
+from app.db.unit_of_work import transaction
+from app.models.user_model import User
+
+REGISTER = {
+    "email": "New.User@Example.com",
+    "password": "Password1",
+    "firstname": "New",
+    "lastname": "User",
+    "nickname": "newuser",
+    "phone": "+1234567890",
+}
+
+
+class FakeRedis:
+    """Minimal local stand-in for a Redis-protocol client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.data)
+
+
+@pytest.fixture
+def loaded(test_user):
+    # What KnownEmailsRefresher does when the app starts.
+    known_emails.refresh()
+    return known_emails
+
+
+def _insert_user(email: str, user_id: int):
+    # As another process would: straight to the database, bypassing this one's filter.
+    with engine.begin() as connection:
+        connection.execute(
+            User.__table__.insert().values(
+                id=user_id, email=email, email_normalized=email.lower(), hashed_password=hash_password("Password1"),
+                firstname="Other", lastname="User", is_active=True
+            )
+        )
+
+
+def test_not_loaded_filter_asks_the_database(test_user):
+    assert known_emails.might_exist("nobody@example.com") is True
+
+
+def test_unknown_email_skips_the_database(client, loaded):
+    assert loaded.might_exist("test@example.com") is True
+    before = db_queries_total.value()
+    response = client.post("/auth/request-password-reset", json={"email": "nobody@example.com"})
+    assert response.status_code == 404
+    assert db_queries_total.value() == before
+    assert cache_lookups_total.value("known_emails_bloom", "miss") >= 1
+
+
+def test_unknown_email_login_costs_a_password_check(client, loaded):
+    before = password_hash_duration_seconds.count("verify")
+    response = client.post("/auth/login", json={"email": "nobody@example.com", "password": "Password1"})
+    assert response.status_code == 401
+    assert password_hash_duration_seconds.count("verify") == before + 1
+
+
+def test_registered_email_is_known_right_away(client, loaded):
+    assert loaded.might_exist("new.user@example.com") is False
+    assert client.post("/auth/register", json=REGISTER).status_code == 200
+    response = client.post("/auth/login", json={"email": REGISTER["email"], "password": "Password1"})
+    assert response.status_code == 200
+    response = client.post("/auth/request-email-verification", json={"email": REGISTER["email"]})
+    assert response.status_code == 200
+
+
+def test_email_change_is_known_once_committed(db_session, loaded, test_user):
+    assert loaded.might_exist("changed@example.com") is False
+    with transaction(db_session):
+        update_user_by_id(db_session, test_user.id, {"email": "changed@example.com"})
+        assert loaded.might_exist("changed@example.com") is False
+    assert loaded.might_exist("changed@example.com") is True
+
+
+def test_refresh_picks_up_users_from_other_processes(test_user):
+    state = KnownEmails(refresh_seconds=5)
+    state.refresh()
+    assert state.might_exist("other@example.com") is False
+    _insert_user("other@example.com", 2)
+    assert state.might_exist("other@example.com") is False
+    state.refresh()
+    assert state.might_exist("other@example.com") is True
+
+
+def test_refresh_picks_up_lower_ids_committed_late(test_user):
+    # Ids are taken at INSERT time; a registration that commits later can
+    # have a lower id than one already seen by a refresh.
+    state = KnownEmails(refresh_seconds=5)
+    state.refresh()
+    _insert_user("fast@example.com", 3)
+    state.refresh()
+    _insert_user("slow@example.com", 2)
+    state.refresh()
+    assert state.might_exist("fast@example.com") is True
+    assert state.might_exist("slow@example.com") is True
+
+
+def test_refresh_picks_up_email_changes_from_other_processes(test_user):
+    state = KnownEmails(refresh_seconds=5)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE users SET updated_at = :now WHERE id = :id"),
+                           {"now": datetime.now(timezone.utc), "id": test_user.id})
+    state.refresh()
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE users SET email = 'moved@example.com', email_normalized = 'moved@example.com', "
+                 "updated_at = :now WHERE id = :id"),
+            {"now": datetime.now(timezone.utc), "id": test_user.id}
+        )
+    state.refresh()
+    assert state.might_exist("moved@example.com") is True
+
+
+def test_rebuild_forgets_deleted_users(test_user):
+    clock = [0.0]
+    state = KnownEmails(refresh_seconds=5, rebuild_seconds=60, clock=lambda: clock[0])
+    state.refresh()
+    assert state.might_exist("test@example.com") is True
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE users SET deleted_at = :now WHERE id = :id"),
+                           {"now": datetime.now(timezone.utc), "id": test_user.id})
+    clock[0] = 61.0
+    state.refresh()
+    assert state.might_exist("test@example.com") is False
+
+
+def test_stale_filter_asks_the_database(test_user):
+    clock = [0.0]
+    state = KnownEmails(refresh_seconds=5, clock=lambda: clock[0])
+    state.refresh()
+    assert state.might_exist("nobody@example.com") is False
+    clock[0] = 16.0
+    assert state.might_exist("nobody@example.com") is True
+
+
+def test_refresher_loads_the_filter(test_user):
+    state = KnownEmails(refresh_seconds=60)
+    refresher = KnownEmailsRefresher(state)
+    refresher.start()
+    try:
+        for _ in range(100):
+            if state.might_exist("nobody@example.com") is False:
+                break
+            refresher.join(0.05)
+        assert state.might_exist("nobody@example.com") is False
+    finally:
+        refresher.stop(timeout=5)
+    assert not refresher.is_alive()
+
+
+def test_disabled_filter_always_asks_the_database(test_user):
+    state = KnownEmails(enabled=False)
+    state.refresh()
+    assert state.might_exist("nobody@example.com") is True
+
+
+def test_registration_is_known_to_other_processes_right_away(client, loaded, monkeypatch):
+    shared = RedisKnownEmailsStore(FakeRedis())
+    monkeypatch.setattr(loaded, "shared", shared)
+    other = KnownEmails(refresh_seconds=5, shared=shared)
+    other.refresh()
+    assert other.might_exist("new.user@example.com") is False
+    assert client.post("/auth/register", json=REGISTER).status_code == 200
+    # The next request lands on the other process, before it has refreshed.
+    monkeypatch.setattr(auth_crud, "known_emails", other)
+    response = client.post("/auth/login", json={"email": REGISTER["email"], "password": "Password1"})
+    assert response.status_code == 200
+    assert other.might_exist("nobody@example.com") is False
+
+
+def test_several_workers_need_a_shared_store(monkeypatch):
+    monkeypatch.setattr("app.core.known_emails.settings.WEB_CONCURRENCY", 4)
+    assert build_known_emails().enabled is False
+    monkeypatch.setattr("app.core.known_emails.settings.KNOWN_EMAILS_REDIS_URL", "redis://cache:6379/0")
+    monkeypatch.setattr(RedisKnownEmailsStore, "from_url", classmethod(lambda cls, url: cls(FakeRedis())))
+    assert build_known_emails().enabled is True
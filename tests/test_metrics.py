@@ -0,0 +1,55 @@
+from app.core.metrics import Counter, Histogram, REGISTRY, generate_latest, http_requests_total
+
+
+def test_histogram_exposition_is_cumulative():
+    histogram = Histogram("test_latency_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5, "/a")
+        output = "\n".join(histogram.collect())
+        assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+        assert 'test_latency_seconds_bucket{route="/a",le="1.0"} 2' in output
+        assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+        assert 'test_latency_seconds_count{route="/a"} 3' in output
+        assert histogram.count("/a") == 3
+    finally:
+        REGISTRY.remove(histogram)
+
+def test_counter_labels_are_escaped():
+    counter = Counter("test_total", "Test counter.", ("name",))
+    try:
+        counter.inc('a"b')
+        assert 'test_total{name="a\\"b"} 1' in "\n".join(counter.collect())
+    finally:
+        REGISTRY.remove(counter)
+
+def test_metrics_endpoint_reports_route_templates(client, test_user):
+    before = http_requests_total.value("GET", "/users/{user_id}", "200")
+    client.get(f"/users/{test_user.id}")
+    assert http_requests_total.value("GET", "/users/{user_id}", "200") == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}"' in body
+    assert "db_queries_total" in body
+    assert "# TYPE password_hash_duration_seconds histogram" in body
+    assert "threadpool_tokens_total " in body
+
+def test_route_template_when_a_segment_equals_a_parameter():
+    from types import SimpleNamespace
+    from app.core.metrics import route_template
+    scope = {
+        "route": SimpleNamespace(path_format="/items/{name}"),
+        "path": "/items/items",
+        "path_params": {"name": "items"},
+    }
+    assert route_template(scope) == "/items/{name}"
+    assert route_template({"path": "/nowhere"}) == "unmatched"
+
+def test_generate_latest_includes_help_and_type():
+    output = generate_latest()
+    assert "# HELP http_requests_total" in output
+    assert "# TYPE http_requests_total counter" in output
@@ -0,0 +1,114 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user, require_roles
+from app.core.principal_cache import Principal, PrincipalCache, principal_cache
+from app.core.security import create_access_token
+from app.crud.user_crud import delete_user, update_user_by_id
+
+
+def auth_header(user_id=1, **claims):
+    token = create_access_token({"sub": str(user_id), "ver": 0, **claims}, "user")
+    return {"Authorization": f"Bearer {token}"}
+
+def test_me_returns_authenticated_user(client, test_user):
+    response = client.get("/users/me", headers=auth_header())
+    assert response.status_code == 200
+    assert response.json()["email"] == "test@example.com"
+
+def test_me_requires_valid_bearer_token(client, test_user):
+    assert client.get("/users/me").status_code == 401
+    response = client.get("/users/me", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid token"
+
+def test_action_tokens_are_not_access_tokens(client, test_user):
+    response = client.get("/users/me", headers=auth_header(type="verification"))
+    assert response.status_code == 401
+
+def test_principal_is_cached_between_requests(client, test_user):
+    loads = []
+    cache = PrincipalCache(ttl=30)
+
+    def loader(user_id):
+        loads.append(user_id)
+        return Principal(id=user_id, role="user", is_active=True)
+
+    assert cache.get(1, loader) == cache.get(1, loader)
+    assert loads == [1]
+
+    client.get("/users/me", headers=auth_header())
+    client.get("/users/me", headers=auth_header())
+    assert len(principal_cache) == 1
+
+def test_cache_entries_expire():
+    now = [0.0]
+    cache = PrincipalCache(ttl=5, clock=lambda: now[0])
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return Principal(id=user_id, role="user", is_active=True)
+
+    cache.get(1, loader)
+    now[0] = 6.0
+    cache.get(1, loader)
+    assert loads == [1, 1]
+
+def test_cache_evicts_least_recently_used():
+    cache = PrincipalCache(ttl=30, max_size=2)
+    loader = lambda user_id: Principal(id=user_id, role="user", is_active=True)
+    for user_id in (1, 2, 1, 3):
+        cache.get(user_id, loader)
+    assert len(cache) == 2
+    assert 2 not in cache._entries
+
+def test_update_invalidates_principal(client, test_user, db_session):
+    headers = auth_header()
+    assert client.get("/users/me", headers=headers).status_code == 200
+    update_user_by_id(db_session, test_user.id, {"user_rol": "admin"})
+    db_session.commit()
+    assert len(principal_cache) == 0
+
+    app = FastAPI()
+
+    @app.get("/admin")
+    def admin_only(principal: Principal = Depends(require_roles("admin"))):
+        return {"id": principal.id}
+
+    assert TestClient(app).get("/admin", headers=headers).json() == {"id": test_user.id}
+
+def test_require_roles_rejects_other_roles(test_user):
+    app = FastAPI()
+
+    @app.get("/admin")
+    def admin_only(principal: Principal = Depends(require_roles("admin"))):
+        return {"id": principal.id}
+
+    response = TestClient(app).get("/admin", headers=auth_header())
+    assert response.status_code == 403
+
+def test_deleted_user_is_rejected(client, test_user, db_session):
+    headers = auth_header()
+    assert client.get("/users/me", headers=headers).status_code == 200
+    delete_user(db_session, test_user.id)
+    db_session.commit()
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+def test_get_current_user_decodes_once_per_request(test_user, monkeypatch):
+    from app.api import deps
+
+    calls = []
+    original = deps.decode_access_token
+    monkeypatch.setattr(deps, "decode_access_token", lambda token: calls.append(token) or original(token))
+    app = FastAPI()
+
+    @app.get("/both")
+    def both(
+        principal: Principal = Depends(get_current_user),
+        same: Principal = Depends(require_roles("user"))
+    ):
+        return {"same": principal is same}
+
+    assert TestClient(app).get("/both", headers=auth_header()).json() == {"same": True}
+    assert len(calls) == 1
@@ -0,0 +1,45 @@
+import logging
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.query_stats import (
+    QueryStatsMiddleware, RequestQueryStats, current_query_stats, instrument_query_stats, normalize_sql
+)
+from app.db.session import engine
+from app.main import app
+
+
+def test_normalize_sql():
+    statement = "SELECT *\n  FROM users WHERE email = 'a@b.com' AND id IN (?, ?, ?) LIMIT 10"
+    assert normalize_sql(statement) == "SELECT * FROM users WHERE email = ? AND id IN (...) LIMIT ?"
+
+def test_slow_queries_are_logged_with_route(caplog):
+    local_engine = create_engine("sqlite://")
+    instrument_query_stats(local_engine, slow_query_threshold_ms=0)
+    route = SimpleNamespace(path_format="/users/{user_id}")
+    stats = RequestQueryStats({"path": "/users/1", "route": route, "path_params": {"user_id": "1"}})
+    token = current_query_stats.set(stats)
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+            with local_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+    finally:
+        current_query_stats.reset(token)
+    assert stats.count == 2
+    assert stats.duration > 0
+    assert "/users/{user_id}" in caplog.text
+    assert "SELECT ?" in caplog.text
+
+def test_server_timing_header_reports_queries(test_user):
+    instrument_query_stats(engine, slow_query_threshold_ms=10_000)
+    client = TestClient(QueryStatsMiddleware(app))
+    response = client.get(f"/users/{test_user.id}")
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("db;dur=")
+    count = int(server_timing.split('desc="')[1].split(" ")[0])
+    assert count >= 1
+    assert "app;dur=" in server_timing
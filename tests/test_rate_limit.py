@@ -0,0 +1,96 @@
+import pytest
+
+from app.core.rate_limit import MemoryRateLimitStore, RedisRateLimitStore, RATE_LIMIT_RULES
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Minimal local stand-in for a Redis-protocol client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def expire(self, key, seconds):
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_memory_store_allows_up_to_limit_then_rejects():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(clock=clock)
+    for _ in range(3):
+        assert store.hit("k", 3, 60) == 0
+    retry_after = store.hit("k", 3, 60)
+    assert retry_after == pytest.approx(20)
+
+def test_memory_store_refills_over_time():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(clock=clock)
+    for _ in range(3):
+        store.hit("k", 3, 60)
+    assert store.hit("k", 3, 60) > 0
+    clock.now += 20
+    assert store.hit("k", 3, 60) == 0
+
+def test_memory_store_evicts_idle_buckets():
+    clock = FakeClock()
+    store = MemoryRateLimitStore(eviction_interval=10, clock=clock)
+    store.hit("a", 3, 60)
+    store.hit("b", 3, 5)
+    clock.now += 11
+    store.hit("c", 3, 60)
+    assert len(store) == 2
+
+def test_redis_store_sliding_window():
+    clock = FakeClock(now=600.0)
+    store = RedisRateLimitStore(FakeRedis(), clock=clock)
+    for _ in range(3):
+        assert store.hit("k", 3, 60) == 0
+    assert store.hit("k", 3, 60) > 0
+    # Halfway through the next window the previous one still weighs in.
+    clock.now = 690.0
+    assert store.hit("k", 3, 60) == 0
+    assert store.hit("k", 3, 60) > 0
+
+def test_login_rate_limited_by_email(client, mocker):
+    login = mocker.patch("app.api.auth_routes.login", return_value=None)
+    limit = next(rule.limit for rule in RATE_LIMIT_RULES["/auth/login"] if rule.key == "email")
+    data = {"email": "Spray@Example.com", "password": "Password1"}
+    for _ in range(limit):
+        assert client.post("/auth/login", json=data).status_code == 401
+    response = client.post("/auth/login", json={**data, "email": "spray@example.com"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert login.call_count == limit
+
+def test_register_rate_limited_by_ip(client, mocker):
+    hash_password = mocker.patch("app.api.auth_routes.hash_password", return_value="hashed")
+    limit = RATE_LIMIT_RULES["/auth/register"][0].limit
+    data = {"firstname": "John", "lastname": "Doe", "phone": "+1234567890", "password": "Password2"}
+    for i in range(limit):
+        response = client.post("/auth/register", json={**data, "email": f"john{i}@example.com", "nickname": f"john{i}"})
+        assert response.status_code == 200
+    response = client.post("/auth/register", json={**data, "email": "john@example.com", "nickname": "john"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert hash_password.call_count == limit
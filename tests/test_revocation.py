@@ -0,0 +1,143 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.core.revocation import BloomFilter, RevocationState, revocation_state
+from app.core.security import decode_access_token
+from app.crud.user_crud import update_user_by_id
+from app.db.session import SessionLocal, engine
+
+
+def login(client, password="Password1"):
+    response = client.post("/auth/login", json={"email": "test@example.com", "password": password})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_tokens_embed_version_and_jti(client, test_user):
+    payload = decode_access_token(login(client))["payload"]
+    assert payload["ver"] == 0
+    assert payload["jti"]
+
+def test_password_change_revokes_older_tokens(client, test_user, db_session):
+    token = login(client)
+    assert decode_access_token(token)["valid"] is True
+
+    update_user_by_id(db_session, test_user.id, {"hashed_password": test_user.hashed_password})
+    db_session.commit()
+
+    assert decode_access_token(token) == {"valid": False, "error": "Token revoked"}
+    response = client.post("/auth/verify-token", json={"token": token})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token revoked"
+    # Tokens issued after the bump carry the new version.
+    assert decode_access_token(login(client))["valid"] is True
+
+def test_deactivation_revokes_tokens(client, test_user, db_session):
+    token = login(client)
+    update_user_by_id(db_session, test_user.id, {"is_active": False})
+    db_session.commit()
+    assert decode_access_token(token)["valid"] is False
+
+def test_profile_update_keeps_tokens_valid(client, test_user, db_session):
+    token = login(client)
+    update_user_by_id(db_session, test_user.id, {"firstname": "Renamed"})
+    db_session.commit()
+    assert decode_access_token(token)["valid"] is True
+
+def test_revoke_token_endpoint(client, test_user):
+    token = login(client)
+    other = login(client)
+
+    response = client.post("/auth/revoke-token", json={"token": token})
+    assert response.status_code == 200
+
+    assert decode_access_token(token)["error"] == "Token revoked"
+    assert decode_access_token(other)["valid"] is True
+    response = client.post("/auth/revoke-token", json={"token": token})
+    assert response.status_code == 401
+
+def test_refresh_picks_up_changes_from_other_processes(client, test_user):
+    token = login(client)
+    payload = decode_access_token(token)["payload"]
+    clock = [0.0]
+    state = RevocationState(refresh_seconds=5, clock=lambda: clock[0])
+    assert state.is_revoked(payload) is False
+
+    # Another instance bumps the version directly in the database.
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE users SET token_version = 1, token_version_changed_at = :now WHERE id = :id"),
+            {"now": datetime.now(timezone.utc), "id": test_user.id}
+        )
+    assert state.is_revoked(payload) is False
+    clock[0] = 6.0
+    assert state.is_revoked(payload) is True
+
+def test_refresh_loads_revoked_jtis(client, test_user):
+    token = login(client)
+    payload = decode_access_token(token)["payload"]
+    client.post("/auth/revoke-token", json={"token": token})
+
+    # A fresh state (e.g. another worker) learns about it from the database.
+    revocation_state.reset()
+    assert revocation_state.is_revoked(payload) is True
+
+def test_rolled_back_change_does_not_revoke(client, test_user, db_session):
+    token = login(client)
+    update_user_by_id(db_session, test_user.id, {"hashed_password": test_user.hashed_password})
+    db_session.rollback()
+    assert decode_access_token(token)["valid"] is True
+
+def test_first_load_is_waited_for(client, test_user):
+    token = login(client)
+    payload = decode_access_token(token)["payload"]
+    client.post("/auth/revoke-token", json={"token": token})
+
+    loading, release = threading.Event(), threading.Event()
+    def session_factory():
+        if not loading.is_set():
+            loading.set()
+            release.wait(5)
+        return SessionLocal()
+    state = RevocationState(session_factory=session_factory)
+    results = []
+    first = threading.Thread(target=lambda: results.append(state.is_revoked(payload)))
+    first.start()
+    assert loading.wait(5)
+    # A request arriving while the first load runs must not see an empty view.
+    second = threading.Thread(target=lambda: results.append(state.is_revoked(payload)))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert results == [True, True]
+
+def test_failed_first_load_is_retried(client, test_user):
+    token = login(client)
+    payload = decode_access_token(token)["payload"]
+    client.post("/auth/revoke-token", json={"token": token})
+
+    calls = []
+    def session_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return SessionLocal()
+    state = RevocationState(session_factory=session_factory)
+    with pytest.raises(RuntimeError):
+        state.is_revoked(payload)
+    # Still not loaded: the next check loads it rather than answering from an empty view.
+    assert state.is_revoked(payload) is True
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+from app.db.session import background_pool_options, pool_options
+from app.server import main
+
+
+def test_pool_budget_is_split_across_workers():
+    url = "postgresql+psycopg2://user:pass@db/app"
+    single = pool_options(url, workers=1, max_connections=80)
+    assert single["pool_size"] + single["max_overflow"] == 80
+    for workers in (2, 4, 8, 12):
+        options = pool_options(url, workers=workers, max_connections=80)
+        assert options["pool_size"] >= 1
+        assert (options["pool_size"] + options["max_overflow"]) * workers <= 80
+
+def test_background_threads_get_their_own_pool(tmp_path):
+    url = "postgresql://db/app"
+    requests = pool_options(url, workers=4, max_connections=80, background=3)
+    background = background_pool_options(url, 3)
+    assert requests["pool_size"] + requests["max_overflow"] == 20 - 3
+    assert background == {"pool_size": 3, "max_overflow": 0, "pool_timeout": background["pool_timeout"]}
+
+    # Engines built from those options: with every request connection in use,
+    # the background threads still get theirs.
+    database = f"sqlite:///{tmp_path / 'pool.db'}"
+    request_engine = create_engine(database, poolclass=QueuePool, **{**requests, "pool_timeout": 0.1})
+    background_engine = create_engine(database, poolclass=QueuePool, **{**background, "pool_timeout": 0.1})
+    busy = [request_engine.connect() for _ in range(17)]
+    try:
+        with pytest.raises(PoolTimeout):
+            request_engine.connect()
+        connections = [background_engine.connect() for _ in range(3)]
+        for connection in connections:
+            connection.close()
+    finally:
+        for connection in busy:
+            connection.close()
+        request_engine.dispose()
+        background_engine.dispose()
+
+def test_pool_budget_too_small_is_an_error():
+    with pytest.raises(ValueError, match="DB_MAX_CONNECTIONS=80"):
+        pool_options("postgresql://db/app", workers=200, max_connections=80)
+    with pytest.raises(ValueError, match="4 connections"):
+        pool_options("postgresql://db/app", workers=40, max_connections=80, background=3)
+
+def test_server_refuses_workers_beyond_the_budget(monkeypatch):
+    monkeypatch.setattr("app.server.settings.DATABASE_URL", "postgresql://db/app")
+    monkeypatch.setattr("app.server.settings.DB_MAX_CONNECTIONS", 8)
+    with pytest.raises(SystemExit):
+        main(["--workers", "8"])
+
+def test_sqlite_keeps_default_pool():
+    assert pool_options("sqlite:////tmp/app.db", workers=4, max_connections=80) == {}
+    assert background_pool_options("sqlite:////tmp/app.db", 3) == {}
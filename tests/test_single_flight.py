@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.core.metrics import single_flight_calls_total
+from app.core.single_flight import SingleFlight
+from app.db.session import engine
+from app.db.shared_reads import can_share, coalesced_read
+from app.models.address_model import Address
+from app.models.user_model import User
+
+
+def _run_concurrently(flight, key, fn, followers):
+    """Start a leader blocked in `fn`, then `followers` callers of the same key."""
+    results = []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except RuntimeError:
+            pass
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    while len(flight) == 0:
+        time.sleep(0.001)
+    for _ in range(followers):
+        thread = threading.Thread(target=call)
+        thread.start()
+        threads.append(thread)
+    return threads, results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_shared")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    threads, results = _run_concurrently(flight, "k", fn, followers=3)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert len(flight) == 0
+    assert single_flight_calls_total.value("test_shared", "leader") == 1
+    assert single_flight_calls_total.value("test_shared", "coalesced") == 3
+
+
+def test_sequential_calls_are_not_shared():
+    flight = SingleFlight("test_sequential")
+    calls = []
+    assert flight.do("k", lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do("k", lambda: calls.append(1) or len(calls)) == 2
+
+
+def test_follower_runs_itself_after_timeout():
+    flight = SingleFlight("test_timeout", timeout=0.05)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+        return len(calls)
+
+    threads, results = _run_concurrently(flight, "k", fn, followers=1)
+    threads[1].join()
+    release.set()
+    threads[0].join()
+    assert len(calls) == 2
+    assert single_flight_calls_total.value("test_timeout", "timeout") == 1
+
+
+def test_followers_retry_when_the_leader_fails():
+    flight = SingleFlight("test_fallback")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            raise RuntimeError("boom")
+        return "value"
+
+    threads, results = _run_concurrently(flight, "k", fn, followers=1)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"]
+    assert single_flight_calls_total.value("test_fallback", "fallback") == 1
+
+
+def test_forget_starts_a_new_call():
+    flight = SingleFlight("test_forget")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        number = len(calls)
+        if number == 1:
+            release.wait(5)
+        return number
+
+    threads, results = _run_concurrently(flight, "k", fn, followers=0)
+    flight.forget("k")
+    assert flight.do("k", fn) == 2
+    release.set()
+    threads[0].join()
+    assert results == [1]
+
+
+def test_disabled_flight_always_calls():
+    flight = SingleFlight("test_disabled", enabled=False)
+    calls = []
+    flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 1 and len(flight) == 0
+
+
+@pytest.fixture
+def sessions():
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    first, second = Session(), Session()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_coalesced_orm_read_attaches_a_copy(sessions, test_user):
+    leader_db, follower_db = sessions
+    flight = SingleFlight("test_orm")
+    release = threading.Event()
+    leader_result = []
+
+    def leader_load():
+        user = leader_db.get(User, test_user.id)
+        release.wait(5)
+        return user
+
+    thread = threading.Thread(
+        target=lambda: leader_result.append(coalesced_read(leader_db, flight, User, test_user.id, leader_load))
+    )
+    thread.start()
+    while len(flight) == 0:
+        time.sleep(0.001)
+    follower = []
+    follower_thread = threading.Thread(target=lambda: follower.append(
+        coalesced_read(follower_db, flight, User, test_user.id, lambda: pytest.fail("follower queried"))
+    ))
+    follower_thread.start()
+    time.sleep(0.05)
+    release.set()
+    thread.join()
+    follower_thread.join()
+
+    user = follower[0]
+    assert user is not leader_result[0]
+    assert user.email == test_user.email
+    assert inspect(user).persistent and user in follower_db
+    # The copy behaves like a loaded row: changes to it are written normally.
+    user.firstname = "Changed"
+    follower_db.commit()
+    leader_db.expire_all()
+    assert leader_db.get(User, test_user.id).firstname == "Changed"
+
+
+def test_session_with_pending_writes_reads_alone(db_session, test_user):
+    assert can_share(db_session)
+    db_session.add(Address(user_id=test_user.id, street="s", city="c", state="st", zip_code="1", country="x"))
+    assert not can_share(db_session)
+    flight = SingleFlight("test_pending")
+    coalesced_read(db_session, flight, User, test_user.id, lambda: None)
+    assert single_flight_calls_total.value("test_pending", "leader") == 0
+
+
+def test_user_routes_use_the_flight(client, test_user):
+    before = single_flight_calls_total.value("get_user_by_id", "leader")
+    assert client.get(f"/users/{test_user.id}").json()["email"] == test_user.email
+    assert single_flight_calls_total.value("get_user_by_id", "leader") == before + 1
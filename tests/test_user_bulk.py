@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import event
+
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token, decode_access_token
+from app.crud.user_crud import bulk_update_users
+from app.db.session import engine
+from app.models.user_model import User
+
+
+@pytest.fixture
+def admin(db_session):
+    user = User(
+        firstname="Admin", lastname="User", email="admin@example.com",
+        hashed_password="x", user_rol="admin", phone="+1234567890"
+    )
+    db_session.add(user)
+    db_session.commit()
+    token = create_access_token({"sub": str(user.id), "ver": 0}, "admin")
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def customers(db_session):
+    users = [
+        User(firstname=f"Cust{i}", lastname="Omer", email=f"cust{i}@example.com",
+             hashed_password="x", user_rol="customer", phone="+1234567890")
+        for i in range(5)
+    ]
+    db_session.add_all(users)
+    db_session.commit()
+    return [user.id for user in users]
+
+def test_bulk_update_by_ids(client, db_session, admin, customers):
+    missing = max(customers) + 100
+    response = client.patch(
+        "/users/bulk", headers=admin,
+        json={"ids": customers[:3] + [missing], "patch": {"is_verified": True, "lastname": "Bulk"}}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"updated": 3, "not_found": [missing]}
+    rows = db_session.query(User.id, User.is_verified, User.lastname).filter(User.id.in_(customers)).order_by(User.id).all()
+    assert [(row.is_verified, row.lastname) for row in rows] == [(True, "Bulk")] * 3 + [(False, "Omer")] * 2
+
+def test_bulk_update_by_filter_in_chunks(client, db_session, admin, customers, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "USER_BULK_UPDATE_CHUNK_SIZE", 2)
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE users"):
+            updates.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.patch(
+            "/users/bulk", headers=admin,
+            json={"filter": {"user_rol": "customer"}, "patch": {"user_rol": "vip"}}
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert response.json() == {"updated": 5, "not_found": []}
+    assert len(updates) == 3
+    assert db_session.query(User).filter(User.user_rol == "vip").count() == 5
+    assert db_session.query(User).filter(User.user_rol == "admin").count() == 1
+
+def test_bulk_deactivation_revokes_tokens_and_caches(client, db_session, admin, customers):
+    token = create_access_token({"sub": str(customers[0]), "ver": 0}, "customer")
+    principal_cache.get(customers[0], lambda key: "stale")
+    response = client.patch("/users/bulk", headers=admin, json={"ids": customers[:1], "patch": {"is_active": False}})
+    assert response.json()["updated"] == 1
+    assert decode_access_token(token)["valid"] is False
+    assert len(principal_cache) == 1  # only the admin, loaded by this request
+
+def test_bulk_update_maintains_stats(client, db_session, customers):
+    from app.crud.user_stats_crud import rebuild_user_stats
+    rebuild_user_stats(db_session)
+    db_session.commit()
+    bulk_update_users(db_session, {"user_rol": "vip", "is_verified": True}, ids=customers[:2], chunk_size=1)
+    db_session.commit()
+    body = client.get("/users/stats").json()
+    assert body["users_by_role"] == {"customer": 3, "vip": 2}
+    assert body["verified_users"] == 2
+    assert rebuild_user_stats(db_session) == {}
+
+@pytest.mark.parametrize("body", [
+    {"patch": {"is_active": False}},
+    {"ids": [1], "filter": {"user_rol": "customer"}, "patch": {"is_active": False}},
+    {"ids": [], "patch": {"is_active": False}},
+    {"filter": {}, "patch": {"is_active": False}},
+    {"ids": [1], "patch": {}},
+    {"ids": [1], "patch": {"firstname": ""}},
+    {"ids": [1], "patch": {"is_active": None}},
+    {"ids": [1], "patch": {"email": "x@example.com"}},
+])
+def test_bulk_update_validation(client, admin, body):
+    assert client.patch("/users/bulk", headers=admin, json=body).status_code == 422
+
+def test_bulk_update_requires_admin(client, test_user):
+    token = create_access_token({"sub": str(test_user.id), "ver": 0}, "user")
+    response = client.patch(
+        "/users/bulk", headers={"Authorization": f"Bearer {token}"},
+        json={"ids": [test_user.id], "patch": {"user_rol": "admin"}}
+    )
+    assert response.status_code == 403
+    assert client.patch("/users/bulk", json={"ids": [1], "patch": {"user_rol": "admin"}}).status_code == 401
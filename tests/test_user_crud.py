@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import event
+
+from app.crud.user_crud import delete_user, get_user_by_id, update_user_by_id
+from app.db.session import engine
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture(params=[True, False], ids=["returning", "fallback"])
+def returning(request, monkeypatch):
+    # The fallback path is what backends without RETURNING go through.
+    if not request.param:
+        monkeypatch.setattr(engine.dialect, "update_returning", False)
+        monkeypatch.setattr(engine.dialect, "delete_returning", False)
+    return request.param
+
+def test_update_user_by_id(db_session, test_user, returning):
+    user_id = test_user.id
+    db_session.expunge_all()
+    user = update_user_by_id(db_session, user_id, {"firstname": "Updated"})
+    db_session.commit()
+    assert user.firstname == "Updated"
+    assert user.lastname == "User"
+    assert user.updated_at is not None
+
+def test_update_is_a_single_statement(db_session, test_user, statements):
+    user_id = test_user.id
+    db_session.expunge_all()
+    statements.clear()
+    update_user_by_id(db_session, user_id, {"firstname": "Updated", "hashed_password": "x"})
+    assert statements == ["UPDATE"]
+
+def test_update_refreshes_loaded_user(db_session, test_user, returning):
+    user = update_user_by_id(db_session, test_user.id, {"lastname": "Changed"})
+    assert user is test_user
+    assert test_user.lastname == "Changed"
+
+def test_update_bumps_token_version(db_session, test_user, returning):
+    user = update_user_by_id(db_session, test_user.id, {"hashed_password": "new-hash"})
+    assert user.token_version == 1
+    assert user.token_version_changed_at is not None
+
+def test_update_missing_user(db_session, returning):
+    assert update_user_by_id(db_session, 9999, {"firstname": "Nobody"}) is None
+
+def test_delete_user(db_session, test_user, returning):
+    user_id = test_user.id
+    deleted = delete_user(db_session, user_id)
+    db_session.commit()
+    assert deleted.email == "test@example.com"
+    assert get_user_by_id(db_session, user_id) is None
+    assert delete_user(db_session, user_id) is None
+
+def test_get_user_by_email_ignores_case(db_session, test_user):
+    from app.crud.user_crud import get_user_by_email
+    assert get_user_by_email(db_session, "Test@Example.com").id == test_user.id
+    assert test_user.email_normalized == "test@example.com"
+
+def test_update_email_renormalizes(db_session, test_user, returning):
+    user = update_user_by_id(db_session, test_user.id, {"email": "New.Address@Example.com"})
+    assert user.email == "New.Address@Example.com"
+    assert user.email_normalized == "new.address@example.com"
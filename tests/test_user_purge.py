@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+from app.crud.auth_crud import create_action_token
+from app.crud.user_crud import delete_user, purge_deleted_users
+from app.models.address_model import Address
+from app.models.auth_model import ActionToken
+from app.models.user_model import User
+from app.utils.user_purge import purge_once
+
+
+def add_addresses(db_session, user_id, count):
+    for i in range(count):
+        db_session.add(Address(user_id=user_id, street=f"Street {i}", city="City", state="ST", zip_code="12345", country="USA"))
+    db_session.commit()
+
+def test_delete_hides_user_immediately(client, db_session, test_user):
+    token = client.post("/auth/login", json={"email": "test@example.com", "password": "Password1"}).json()["access_token"]
+    add_addresses(db_session, test_user.id, 3)
+
+    response = client.delete(f"/users/{test_user.id}")
+    assert response.status_code == 204
+    assert client.delete(f"/users/{test_user.id}").status_code == 404
+
+    assert client.get(f"/users/{test_user.id}").status_code == 404
+    assert client.get("/users/").json() == []
+    assert client.get("/users/search", params={"q": "test"}).json()["items"] == []
+    assert client.post("/auth/login", json={"email": "test@example.com", "password": "Password1"}).status_code == 401
+    assert client.post("/auth/verify-token", json={"token": token}).status_code == 401
+    assert client.patch(f"/users/{test_user.id}", json={"firstname": "Ghost"}).status_code == 404
+
+    # The row and its data stay until the purger runs.
+    db_session.expire_all()
+    assert db_session.get(User, test_user.id).deleted_at is not None
+    assert db_session.query(Address).filter(Address.user_id == test_user.id).count() == 3
+
+def test_delete_releases_the_email(client, db_session, test_user):
+    assert client.delete(f"/users/{test_user.id}").status_code == 204
+    data = {
+        "email": "Test@Example.com", "firstname": "John", "lastname": "Doe",
+        "nickname": "again", "phone": "+1234567891", "password": "Password2"
+    }
+    response = client.post("/auth/register", json=data)
+    assert response.status_code == 200
+    assert response.json()["id"] != test_user.id
+    login = client.post("/auth/login", json={"email": "test@example.com", "password": "Password2"})
+    assert login.json()["id"] == response.json()["id"]
+    # Only one live user per email.
+    assert client.post("/auth/register", json=data).status_code == 400
+
+    purge_once(delay_seconds=0)
+    assert db_session.query(User).filter(User.email_normalized == "test@example.com").count() == 1
+
+def test_purge_in_bounded_batches(db_session, test_user):
+    user_id = test_user.id
+    add_addresses(db_session, test_user.id, 5)
+    create_action_token(db_session, test_user.id, "verification", expires_minutes=5)
+    delete_user(db_session, test_user.id)
+    db_session.commit()
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=1)
+    assert purge_deleted_users(db_session, later, batch_size=2) == 3
+    assert purge_deleted_users(db_session, later, batch_size=2) == 2
+    # Fewer than a batch left in every table: the user row goes too.
+    assert purge_deleted_users(db_session, later, batch_size=2) == 2
+    assert purge_deleted_users(db_session, later, batch_size=2) == 0
+    db_session.commit()
+
+    db_session.expunge_all()
+    assert db_session.get(User, user_id) is None
+    assert db_session.query(Address).count() == 0
+    assert db_session.query(ActionToken).count() == 0
+
+def test_purge_waits_for_delay(db_session, test_user):
+    user_id = test_user.id
+    delete_user(db_session, test_user.id)
+    db_session.commit()
+    assert purge_once(batch_size=10, delay_seconds=3600) == 0
+    assert purge_once(batch_size=10, delay_seconds=0) == 1
+    db_session.expunge_all()
+    assert db_session.get(User, user_id) is None
@@ -0,0 +1,27 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.user_routes import update_user
+from app.models.user_model import User
+
+
+def test_update_email_conflict(db_session, test_user):
+    # The update schemas do not accept "email" yet; the conflict mapping is
+    # exercised through the helper both update routes share.
+    db_session.add(User(
+        firstname="Other", lastname="User", email="other@example.com",
+        hashed_password="x", phone="+1234567899"
+    ))
+    db_session.commit()
+    with pytest.raises(HTTPException) as excinfo:
+        update_user(db_session, test_user.id, {"email": "other@example.com"})
+    assert excinfo.value.status_code == 409
+    assert excinfo.value.detail == "The 'email' is already in use by another user."
+
+def test_update_own_email(db_session, test_user):
+    user = update_user(db_session, test_user.id, {"email": "test@example.com", "firstname": "Same"})
+    assert user.firstname == "Same"
+
+def test_update_missing_user(client):
+    response = client.patch("/users/9999", json={"firstname": "Nobody"})
+    assert response.status_code == 404
@@ -0,0 +1,81 @@
+from app.models.user_model import User
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def add_users(db_session, *people):
+    for firstname, lastname, nickname, email in people:
+        db_session.add(User(
+            firstname=firstname, lastname=lastname, nickname=nickname, email=email,
+            hashed_password="x", phone="+1234567890"
+        ))
+    db_session.commit()
+
+def emails(response):
+    return [user["email"] for user in response.json()["items"]]
+
+def test_search_by_name_prefix(client, db_session):
+    add_users(
+        db_session,
+        ("Maria", "Lopez", "mlopez", "maria@example.com"),
+        ("Mario", "Rossi", None, "mario@example.com"),
+        ("Juan", "Perez", "jp", "juan@example.com"),
+    )
+    response = client.get("/users/search", params={"q": "mari"})
+    assert response.status_code == 200
+    assert sorted(emails(response)) == ["maria@example.com", "mario@example.com"]
+    assert "next_cursor" not in response.json()
+
+def test_search_by_email_and_nickname(client, db_session):
+    add_users(
+        db_session,
+        ("Ana", "Diaz", "ghosty", "ana@ghosts.dev"),
+        ("Luis", "Diaz", None, "luis@example.com"),
+    )
+    assert emails(client.get("/users/search", params={"q": "ghosts.dev"})) == ["ana@ghosts.dev"]
+    assert emails(client.get("/users/search", params={"q": "GHOST"})) == ["ana@ghosts.dev"]
+    assert sorted(emails(client.get("/users/search", params={"q": "diaz"}))) == ["ana@ghosts.dev", "luis@example.com"]
+
+def test_search_keyset_pagination(client, db_session):
+    add_users(db_session, *[(f"Pat{i}", "Smith", None, f"pat{i}@example.com") for i in range(5)])
+    seen = []
+    params = {"q": "smith", "limit": 2}
+    while True:
+        body = client.get("/users/search", params=params).json()
+        seen += [user["email"] for user in body["items"]]
+        if "next_cursor" not in body:
+            break
+        params["cursor"] = body["next_cursor"]
+    assert sorted(seen) == [f"pat{i}@example.com" for i in range(5)]
+    assert len(seen) == len(set(seen))
+
+def test_search_reflects_updates_and_deletes(client, db_session, test_user):
+    from app.crud.user_crud import delete_user, update_user_by_id
+    update_user_by_id(db_session, test_user.id, {"lastname": "Renamed"})
+    db_session.commit()
+    assert emails(client.get("/users/search", params={"q": "renamed"})) == ["test@example.com"]
+    delete_user(db_session, test_user.id)
+    db_session.commit()
+    assert emails(client.get("/users/search", params={"q": "renamed"})) == []
+
+def test_search_validation(client):
+    assert client.get("/users/search", params={"q": "a"}).status_code == 422
+    assert client.get("/users/search", params={"q": "abc", "cursor": "garbage"}).status_code == 422
+    assert client.get("/users/search", params={"q": "%%"}).json()["items"] == []
+
+def test_search_rejects_crafted_cursors(client):
+    for values in [({"a": 1}, [1]), (None, None), (-0.5, "1"), (-0.5, True), (True, 1), ("rank", 1), (-0.5, 1.5)]:
+        response = client.get("/users/search", params={"q": "abc", "cursor": encode_cursor(*values)})
+        assert response.status_code == 422
+        assert response.json()["detail"] == "Invalid cursor."
+    assert client.get("/users/search", params={"q": "abc", "cursor": encode_cursor(-0.5, 1)}).status_code == 200
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(-1.5, 42), 2) == [-1.5, 42]
+
+def test_postgres_rank_is_compared_as_double():
+    from sqlalchemy import literal_column
+    from sqlalchemy.dialects import postgresql
+    from app.crud.user_crud import _similarity_rank
+    sql = str(_similarity_rank("mar", literal_column("doc")).compile(dialect=postgresql.dialect()))
+    assert "CAST(word_similarity(" in sql
+    assert "AS FLOAT(53))" in sql
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.crud.user_crud import delete_user, update_user_by_id
+from app.crud.user_stats_crud import rebuild_user_stats
+from app.utils.user_stats import main as user_stats_main
+
+
+def register(client, email):
+    data = {
+        "email": email, "firstname": "John", "lastname": "Doe",
+        "nickname": "johndoe", "phone": "+1234567891", "password": "Password2"
+    }
+    response = client.post("/auth/register", json=data)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def stats(client, **params):
+    response = client.get("/users/stats", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def test_stats_empty(client):
+    assert stats(client) == {
+        "total_users": 0, "verified_users": 0, "verified_ratio": 0.0,
+        "users_by_role": {}, "signups_per_day": {}
+    }
+
+def test_stats_follow_writes(client, db_session):
+    today = datetime.now(timezone.utc).date().isoformat()
+    first = register(client, "one@example.com")
+    second = register(client, "two@example.com")
+    register(client, "three@example.com")
+
+    update_user_by_id(db_session, first, {"is_verified": True})
+    update_user_by_id(db_session, second, {"user_rol": "admin"})
+    db_session.commit()
+    assert stats(client) == {
+        "total_users": 3, "verified_users": 1, "verified_ratio": 1 / 3,
+        "users_by_role": {"customer": 2, "admin": 1}, "signups_per_day": {today: 3}
+    }
+
+    delete_user(db_session, first)
+    db_session.commit()
+    body = stats(client)
+    assert body["total_users"] == 2
+    assert body["verified_users"] == 0
+    assert body["users_by_role"] == {"customer": 1, "admin": 1}
+    assert body["signups_per_day"] == {today: 2}
+
+def test_stats_unchanged_by_rolled_back_write(client, db_session):
+    user_id = register(client, "one@example.com")
+    update_user_by_id(db_session, user_id, {"user_rol": "admin"})
+    db_session.rollback()
+    assert stats(client)["users_by_role"] == {"customer": 1}
+
+def test_stats_days_window(client, db_session):
+    register(client, "one@example.com")
+    db_session.execute(text(
+        "INSERT INTO user_stats (dimension, bucket, count) VALUES ('signup_day', '2000-01-01', 5)"
+    ))
+    db_session.commit()
+    assert list(stats(client, days=1)["signups_per_day"]) == [datetime.now(timezone.utc).date().isoformat()]
+    assert client.get("/users/stats", params={"days": 0}).status_code == 422
+
+def test_rebuild_repairs_drift(client, db_session, test_user, capsys):
+    # test_user is inserted directly, bypassing the counters.
+    assert stats(client)["total_users"] == 0
+
+    assert user_stats_main(["--dry-run"]) == 0
+    assert "counter(s) with drift found" in capsys.readouterr().out
+    assert stats(client)["total_users"] == 0
+
+    assert user_stats_main([]) == 0
+    assert stats(client)["users_by_role"] == {"user": 1}
+    assert rebuild_user_stats(db_session) == {}
+
+def test_counters_are_written_last(client):
+    from sqlalchemy import event
+    from app.db.session import engine
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        register(client, "last@example.com")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # The hot counter rows are locked only once the rest of the workflow is done.
+    assert statements[-1].startswith("INSERT INTO user_stats")
+    assert sum(statement.startswith("INSERT INTO user_stats") for statement in statements) == 1
+
+def test_rolled_back_changes_leave_counters_alone(client, db_session):
+    user_id = register(client, "rollback@example.com")
+    update_user_by_id(db_session, user_id, {"is_verified": True})
+    db_session.rollback()
+    delete_user(db_session, user_id)
+    db_session.rollback()
+    db_session.commit()
+    assert stats(client)["total_users"] == 1
+    assert stats(client)["verified_users"] == 0